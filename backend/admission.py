@@ -0,0 +1,263 @@
+"""Admission control for the load the backend puts on vCenter, ESXi hosts and datastores.
+
+Every vCenter operation belongs to a class ("read", "provision" or "power") and is
+admitted through one gate per scope it touches (the vCenter, the ESXi host, the
+datastore). Each gate has a concurrency limit and a token bucket; callers over the
+limit wait in FIFO order instead of failing, and only give up with a 503 after
+ADMISSION_MAX_WAIT_SECONDS. Gates are always taken narrowest first (datastore, ESXi
+host, vCenter) so two operations can never hold each other's gates.
+
+Background jobs that may queue for hours (clones) use acquire_deferred() instead:
+one dispatcher thread retries them as gates free up, so a job only takes a worker
+thread once it has been admitted.
+"""
+import collections
+import contextlib
+import logging
+import os
+import threading
+import time
+
+from fastapi import HTTPException
+
+from observability import ADMISSION_ACTIVE, ADMISSION_QUEUED, ADMISSION_WAIT_SECONDS, trace_span
+
+OP_CLASSES = ("read", "provision", "power")
+SCOPE_ORDER = ("datastore", "esxi", "vcenter")
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "900"))
+
+# (scope, class) -> (max concurrent, tokens per second or None, burst); pairs not listed are unlimited
+ADMISSION_LIMITS = {
+    ("vcenter", "read"): (16, 20.0, 40),
+    ("vcenter", "provision"): (8, 1.0, 4),
+    ("vcenter", "power"): (16, 5.0, 10),
+    # vCenter's own default is 8 provisioning operations per host and per datastore; stay under it
+    ("esxi", "provision"): (4, None, None),
+    ("esxi", "power"): (8, 2.0, 8),
+    ("datastore", "provision"): (4, None, None),
+}
+ADMISSION_MAX_DEFERRED = 1000  # waiters queued through acquire_deferred()
+ADMISSION_RETRY_SECONDS = 1.0  # deferred waiters retry at least this often, and whenever a gate is released
+
+gates = {}  # (scope, target, class) -> AdmissionGate
+gates_lock = threading.Lock()
+
+class AdmissionGate:
+    """Concurrency slots plus a token bucket, handed out to waiters in arrival order."""
+
+    def __init__(self, scope, target, op_class, concurrency, rate, burst):
+        self.scope, self.target, self.op_class = scope, target, op_class
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst if rate else None
+        self.active = 0
+        self.admitted = 0
+        self._updated = time.monotonic()
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._labels = {"scope": scope, "target": target, "op_class": op_class}
+
+    def _refill(self, now):
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, deadline):
+        ticket = object()
+        with self._cond:
+            self._queue.append(ticket)
+            ADMISSION_QUEUED.labels(**self._labels).inc()
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = deadline - now
+                    if self._queue[0] is ticket and self.active < self.concurrency:
+                        if not self.rate or self.tokens >= 1:
+                            break
+                        wait = min(wait, (1 - self.tokens) / self.rate)
+                    if deadline - now <= 0:
+                        raise HTTPException(status_code=503, headers={"Retry-After": "30"},
+                                            detail=f"{self.scope} {self.target} is busy: {len(self._queue)} "
+                                                   f"{self.op_class} operation(s) queued.")
+                    self._cond.wait(wait)
+                self.active += 1
+                self.admitted += 1
+                if self.rate:
+                    self.tokens -= 1
+            finally:
+                self._queue.remove(ticket)
+                ADMISSION_QUEUED.labels(**self._labels).dec()
+                self._cond.notify_all()
+        ADMISSION_ACTIVE.labels(**self._labels).inc()
+
+    def try_acquire(self):
+        """Take a slot (and a token) if one is free now and nobody is queued ahead; never waits."""
+        with self._cond:
+            self._refill(time.monotonic())
+            if self._queue or self.active >= self.concurrency or (self.rate and self.tokens < 1):
+                return False
+            self.active += 1
+            self.admitted += 1
+            if self.rate:
+                self.tokens -= 1
+        ADMISSION_ACTIVE.labels(**self._labels).inc()
+        return True
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+        ADMISSION_ACTIVE.labels(**self._labels).dec()
+        _gate_released.set()
+
+    def snapshot(self):
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "scope": self.scope,
+                "target": self.target,
+                "opClass": self.op_class,
+                "active": self.active,
+                "queued": len(self._queue),
+                "admitted": self.admitted,
+                "concurrency": self.concurrency,
+                "ratePerSecond": self.rate,
+                "tokens": round(self.tokens, 2) if self.rate else None,
+            }
+
+def _gate(scope, target, op_class):
+    limits = ADMISSION_LIMITS.get((scope, op_class))
+    if limits is None:
+        return None
+    key = (scope, target, op_class)
+    with gates_lock:
+        gate = gates.get(key)
+        if gate is None:
+            gate = gates[key] = AdmissionGate(scope, target, op_class, *limits)
+        return gate
+
+def acquire(op_class, vcenter=None, esxi=None, datastore=None, max_wait=None):
+    """Wait for admission on every given scope; returns the gates to pass to release().
+
+    `max_wait` overrides ADMISSION_MAX_WAIT_SECONDS, for background jobs that may queue longer than a request.
+    """
+    if op_class not in OP_CLASSES:
+        raise ValueError(f"Unknown admission class '{op_class}'")
+    targets = {"vcenter": vcenter, "esxi": esxi, "datastore": datastore}
+    deadline = time.monotonic() + (ADMISSION_MAX_WAIT_SECONDS if max_wait is None else max_wait)
+    held = []
+    try:
+        for scope in SCOPE_ORDER:
+            gate = _gate(scope, targets[scope], op_class) if targets[scope] else None
+            if gate is None:
+                continue
+            started = time.perf_counter()
+            with trace_span("admission.wait", scope=scope, target=targets[scope], opClass=op_class):
+                gate.acquire(deadline)
+            ADMISSION_WAIT_SECONDS.labels(scope=scope, op_class=op_class).observe(time.perf_counter() - started)
+            held.append(gate)
+    except BaseException:
+        release(held)
+        raise
+    return held
+
+def release(held):
+    for gate in reversed(held):
+        gate.release()
+
+# --- Deferred admission ---
+
+_deferred = []  # (queued at, deadline, op class, targets, callback), in arrival order
+_deferred_lock = threading.Lock()
+_gate_released = threading.Event()
+_dispatcher = None
+
+def acquire_deferred(op_class, callback, vcenter=None, esxi=None, datastore=None, max_wait=None):
+    """Queue for admission without waiting in the calling thread.
+
+    `callback(held, None)` runs on the dispatcher thread once every gate is admitted, or
+    `callback(None, error)` with a 503 after `max_wait`; it must return quickly, e.g. by
+    submitting a job. Raises a 503 when ADMISSION_MAX_DEFERRED waiters are already queued.
+    """
+    global _dispatcher
+    if op_class not in OP_CLASSES:
+        raise ValueError(f"Unknown admission class '{op_class}'")
+    targets = {"vcenter": vcenter, "esxi": esxi, "datastore": datastore}
+    now = time.monotonic()
+    deadline = now + (ADMISSION_MAX_WAIT_SECONDS if max_wait is None else max_wait)
+    with _deferred_lock:
+        if len(_deferred) >= ADMISSION_MAX_DEFERRED:
+            raise HTTPException(status_code=503, headers={"Retry-After": "60"},
+                                detail=f"{len(_deferred)} {op_class} operations are already queued for admission.")
+        _deferred.append((now, deadline, op_class, targets, callback))
+        if _dispatcher is None:
+            _dispatcher = threading.Thread(target=_dispatch, name="admission-dispatcher", daemon=True)
+            _dispatcher.start()
+    _gate_released.set()
+
+def _try_acquire_all(op_class, targets):
+    held = []
+    for scope in SCOPE_ORDER:
+        gate = _gate(scope, targets[scope], op_class) if targets[scope] else None
+        if gate is None:
+            continue
+        if not gate.try_acquire():
+            release(held)
+            return None
+        held.append(gate)
+    return held
+
+def _dispatch():
+    while True:
+        _gate_released.wait(ADMISSION_RETRY_SECONDS)
+        # Cleared before the pass, so a release during it triggers another one
+        _gate_released.clear()
+        with _deferred_lock:
+            pending = list(_deferred)
+        for entry in pending:
+            queued_at, deadline, op_class, targets, callback = entry
+            held = _try_acquire_all(op_class, targets)
+            now = time.monotonic()
+            if held is None and now < deadline:
+                continue
+            with _deferred_lock:
+                _deferred.remove(entry)
+            error = None
+            if held is None:
+                error = HTTPException(status_code=503, detail=f"Not admitted for {op_class} on "
+                                                             f"{', '.join(filter(None, targets.values()))} within "
+                                                             f"{deadline - queued_at:.0f} seconds.")
+            for gate in held or []:
+                ADMISSION_WAIT_SECONDS.labels(scope=gate.scope, op_class=op_class).observe(now - queued_at)
+            try:
+                callback(held, error)
+            except Exception:
+                logging.exception(f"Deferred {op_class} admission callback failed")
+                if held:
+                    release(held)
+
+@contextlib.contextmanager
+def admit(op_class, vcenter=None, esxi=None, datastore=None):
+    """Hold admission for `op_class` on the given vCenter / ESXi host / datastore for the block."""
+    held = acquire(op_class, vcenter=vcenter, esxi=esxi, datastore=datastore)
+    try:
+        yield
+    finally:
+        release(held)
+
+def vm_scopes(vm, vcenter):
+    """The vCenter, ESXi host and first datastore a VM operation lands on."""
+    host = vm.runtime.host
+    datastores = vm.datastore
+    return {
+        "vcenter": vcenter,
+        "esxi": host.name if host is not None else None,
+        "datastore": datastores[0].name if datastores else None,
+    }
+
+def admission_snapshot():
+    with gates_lock:
+        current = list(gates.values())
+    return sorted((gate.snapshot() for gate in current), key=lambda g: (g["scope"], g["target"], g["opClass"]))
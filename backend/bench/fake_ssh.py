@@ -0,0 +1,302 @@
+"""Local paramiko SSH server that stands in for KVM hosts and guest VMs.
+
+It answers the commands the backend sends during conversions, live sync and IP
+reassignment: virt-v2v (with progress output at a configurable pace, in the
+foreground or as a detached systemd-run unit whose log is replayed against the clock), virsh,
+openssl, lsyncd/systemctl, the SSH key bootstrap, ip/nmcli and netsh. One
+listener serves every fake host; install_redirect() points backend connections for
+the fake address range at it.
+"""
+import re
+import shlex
+import socket
+import threading
+import time
+from io import BytesIO
+
+import paramiko
+
+FAKE_FINGERPRINT = "SHA1 Fingerprint=" + ":".join(["AB"] * 20)
+FAKE_DOMAIN_XML = (
+    "<domain type='kvm'><name>{name}</name><devices>"
+    "<disk type='file' device='disk'><source file='/var/lib/libvirt/images/{name}-sda'/><target dev='sda'/></disk>"
+    "<interface type='bridge'><source bridge='VM Network'/></interface>"
+    "</devices></domain>"
+)
+
+
+class CommandProfile:
+    """Timing knobs for the emulated commands."""
+
+    def __init__(self, v2v_seconds=30.0, v2v_steps=20, command_latency=0.01, disk_bytes=20 * 1024 ** 3,
+                 unavailable_transports=("san", "hotadd")):
+        self.v2v_seconds = v2v_seconds
+        self.v2v_steps = v2v_steps
+        self.command_latency = command_latency
+        self.disk_bytes = disk_bytes
+        # VDDK modes a KVM host outside the vSphere cluster cannot use; virt-v2v fails fast on them
+        self.unavailable_transports = set(unavailable_transports)
+
+
+class DetachedUnits:
+    """Transient units started with systemd-run; their log and exit file are replayed from emulate() by elapsed time."""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.units = {}  # unit -> {"started", "events", "exitCode", "log", "exit"}
+        self._lock = threading.Lock()
+
+    def start(self, command, source_ip):
+        unit = re.search(r"--unit=(\S+)", command).group(1)
+        script = shlex.split(command)[-1]
+        inner, log_file, exit_file = re.match(r"(.*) > (\S+) 2>&1; echo \$\? > (\S+)$", script).groups()
+        events, elapsed, exit_code = [], 0.0, 0
+        for chunk in emulate(inner, self.profile, source_ip):
+            if isinstance(chunk, int):
+                exit_code = chunk
+                break
+            elapsed += chunk[0]
+            events.append((elapsed, chunk[1]))
+        with self._lock:
+            self.units[unit] = {"started": time.monotonic(), "events": events, "exitCode": exit_code,
+                                "log": log_file, "exit": exit_file}
+
+    def _find(self, key, path):
+        with self._lock:
+            return next((u for u in self.units.values() if u[key] == path), None)
+
+    def _elapsed(self, unit):
+        return time.monotonic() - unit["started"]
+
+    def is_active(self, name):
+        unit = self.units.get(name)
+        return unit is not None and self._elapsed(unit) < unit["events"][-1][0]
+
+    def log(self, path):
+        unit = self._find("log", path)
+        if unit is None:
+            return ""
+        elapsed = self._elapsed(unit)
+        return "".join(text for at, text in unit["events"] if at <= elapsed)
+
+    def exit_status(self, path):
+        unit = self._find("exit", path)
+        if unit is None or self._elapsed(unit) < unit["events"][-1][0]:
+            return None
+        return unit["exitCode"]
+
+
+def emulate(command, profile, source_ip, units=None):
+    """Yield (delay_seconds, output) chunks for a command and finally its exit code as an int."""
+    yield profile.command_latency, ""
+    if "systemd-run --unit=" in command and units is not None:
+        unit = re.search(r"--unit=(\S+)", command).group(1)
+        if not units.is_active(unit) and units.exit_status(re.search(r"test -e (\S+)", command).group(1)) is None:
+            units.start(command, source_ip)
+    elif "tail -c +" in command and units is not None:
+        # The conversion poll: unit state, exit status file and the log from an offset, split by markers
+        marker = re.search(r"echo (---[A-Z0-9-]+---)", command).group(1)
+        unit = re.search(r"is-active --quiet (\S+)", command).group(1)
+        exit_status = units.exit_status(re.search(r"cat (\S+) 2>", command).group(1))
+        offset, log_file = re.search(r"tail -c \+(\d+) (\S+)", command).groups()
+        yield 0, ("active\n" if units.is_active(unit) else "") + f"{marker}\n"
+        yield 0, ("" if exit_status is None else f"{exit_status}\n") + f"{marker}\n"
+        yield 0, units.log(log_file)[int(offset) - 1:]
+    elif command.startswith("tail -n") and units is not None:
+        count, log_file = re.search(r"tail -n (\d+) (\S+)", command).groups()
+        yield 0, "".join(units.log(log_file).splitlines(keepends=True)[-int(count):])
+    elif "vme-live-sync" in command:
+        stage = re.search(r"sh \$f ([\w-]+)", command).group(1)
+        results = {
+            "source-prepare": [("sshd", "active"), ("lsyncd", "/usr/bin/lsyncd"),
+                               ("public_key", "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABAQbench bench@fake")],
+            "target-prepare": [("sshd", "active"), ("rsync", "/usr/bin/rsync"), ("authorized_key", "")],
+            "source-start": [("passwordless_ssh", "ok"), ("config", ""), ("exclude_list", ""), ("start", "")],
+            "stop": [("stop", "")],
+        }.get(stage, [])
+        yield 0, "".join(f"VME-RESULT\t{step}\tok\t{detail}\n" for step, detail in results)
+    elif command.startswith("virt-v2v"):
+        name = re.search(r'-on "([^"]+)"', command)
+        step = profile.v2v_seconds / profile.v2v_steps
+        yield 0, f"[   0.0] Setting up the source: {name.group(1) if name else 'vm'}\r\n"
+        transport = re.search(r"vddk-transports=(\w+)", command)
+        if transport and transport.group(1) in profile.unavailable_transports:
+            yield step, (f"nbdkit: vddk[1]: error: VixDiskLib_Open: Cannot use mode {transport.group(1)} "
+                         "to access disk: Transport mode not available\r\n")
+            yield 1
+            return
+        for i in range(1, profile.v2v_steps + 1):
+            yield step, f"    ({i * 100 / profile.v2v_steps:.2f}/100%)\r\n"
+        yield 0, "[ 100.0] Finishing off\r\n"
+    elif command == "id -u":
+        yield 0, "0\n"
+    elif command.startswith("openssl s_client"):
+        yield 0, FAKE_FINGERPRINT + "\n"
+    elif command.startswith("cat ") and command.endswith(".xml"):
+        name = command.rsplit("/", 1)[-1][:-4]
+        yield 0, FAKE_DOMAIN_XML.format(name=name)
+    elif command.endswith("| wc -c"):
+        yield 0, "184467\n"
+    elif command.startswith("du -sb"):
+        yield 0, f"{profile.disk_bytes}\n"
+    elif "systemctl is-active" in command:
+        yield 0, "active\n"
+    elif "[ -f ~/.ssh/id_rsa ]" in command:
+        yield 0, "yes\n"
+    elif "cat ~/.ssh/id_rsa.pub" in command:
+        yield 0, "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABAQbench bench@fake\n"
+    elif "echo ok" in command:
+        yield 0, "ok\n"
+    elif "command -v lsyncd" in command:
+        yield 0, "/usr/bin/lsyncd\n"
+    elif "command -v rsync" in command:
+        yield 0, "/usr/bin/rsync\n"
+    elif "lsyncd.log" in command:
+        yield 0, "Mon Jan  1 00:00:00 2024 Normal: Calling rsync with filter-list of new/modified files/dirs\n"
+    elif "/etc/os-release" in command:
+        yield 0, ('NAME="Red Hat Enterprise Linux"\nID="rhel"\n---VME-NET---\n'
+                  "default via 10.99.255.254 dev ens192 proto static\n---VME-NET---\n"
+                  f"2: ens192    inet {source_ip}/24 brd 10.99.255.255 scope global ens192\n")
+    elif "netsh.exe interface ip show config" in command:
+        yield 0, ('Configuration for interface "Ethernet0"\r\n    DHCP enabled: No\r\n'
+                  f"    IP Address: {source_ip}\r\n    Subnet Prefix: 10.99.0.0/24 (mask 255.255.255.0)\r\n"
+                  "    Default Gateway: 10.99.255.254\r\n")
+    yield 0
+
+
+class _InMemoryHandle(paramiko.SFTPHandle):
+    def __init__(self, flags=0):
+        super().__init__(flags)
+        self.buffer = BytesIO()
+
+    def write(self, offset, data):
+        self.buffer.seek(offset)
+        self.buffer.write(data)
+        return paramiko.SFTP_OK
+
+    def read(self, offset, length):
+        return self.buffer.getvalue()[offset:offset + length]
+
+    def stat(self):
+        attrs = paramiko.SFTPAttributes()
+        attrs.st_size = len(self.buffer.getvalue())
+        return attrs
+
+    def chattr(self, attr):
+        return paramiko.SFTP_OK
+
+
+class _StubSFTPServer(paramiko.SFTPServerInterface):
+    def open(self, path, flags, attr):
+        return _InMemoryHandle(flags)
+
+    def stat(self, path):
+        return paramiko.SFTPAttributes()
+
+    lstat = stat
+
+    def rename(self, oldpath, newpath):
+        return paramiko.SFTP_OK
+
+
+class _FakeHost(paramiko.ServerInterface):
+    def __init__(self, server):
+        self.server = server
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_exec_request(self, channel, command):
+        threading.Thread(target=self.server.run_command, args=(channel, command.decode(errors="replace")),
+                         daemon=True).start()
+        return True
+
+
+class FakeSSHServer:
+    """Accepts SSH connections on a local port and emulates every fake host behind it."""
+
+    def __init__(self, profile=None, host="127.0.0.1"):
+        self.profile = profile or CommandProfile()
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, 0))
+        self.sock.listen(512)
+        self.port = self.sock.getsockname()[1]
+        self.commands = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._peer_ips = {}
+        self.units = DetachedUnits(self.profile)
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def _accept_loop(self):
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except OSError:
+                return
+            with self._lock:
+                self.connections += 1
+            transport = paramiko.Transport(client)
+            transport.add_server_key(self.host_key)
+            transport.set_subsystem_handler("sftp", paramiko.SFTPServer, _StubSFTPServer)
+            transport.start_server(server=_FakeHost(self))
+
+    def run_command(self, channel, command):
+        with self._lock:
+            self.commands += 1
+        source_ip = self._peer_ips.get(channel.get_transport().getpeername()[1], "10.99.0.1")
+        try:
+            for chunk in emulate(command, self.profile, source_ip, self.units):
+                if isinstance(chunk, int):
+                    channel.send_exit_status(chunk)
+                    break
+                delay, output = chunk
+                if delay:
+                    time.sleep(delay)
+                if output:
+                    channel.sendall(output.encode())
+        except (OSError, EOFError):
+            pass
+        finally:
+            channel.close()
+
+    def remember_peer(self, local_port, fake_ip):
+        self._peer_ips[local_port] = fake_ip
+
+    def close(self):
+        self.sock.close()
+
+
+def install_redirect(server, prefix="10.99."):
+    """Send backend SSH connections for hosts under `prefix` to the fake server; returns a restore callable."""
+    original = paramiko.SSHClient.connect
+
+    def connect(self, hostname, port=22, *args, **kwargs):
+        if not hostname.startswith(prefix):
+            return original(self, hostname, port, *args, **kwargs)
+        result = original(self, "127.0.0.1", server.port, *args, **kwargs)
+        # Let the fake report the guest's own address in ip/netsh output
+        server.remember_peer(self.get_transport().sock.getsockname()[1], hostname)
+        return result
+
+    paramiko.SSHClient.connect = connect
+
+    def restore():
+        paramiko.SSHClient.connect = original
+    return restore
@@ -0,0 +1,244 @@
+"""In-process vCenter stand-in for benchmarks.
+
+Mimics the slice of pyVmomi the backend touches (SmartConnect, RetrieveContent,
+ContainerView, PropertyCollector, VirtualMachine properties, CloneVM_Task). Every access
+that would be a SOAP round trip against a real vCenter counts as one RPC and sleeps for
+the injected latency, so endpoint cost scales the way it does against a live server.
+"""
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+from pyVmomi import vim
+
+
+class RpcCounter:
+    def __init__(self, latency_seconds=0.0):
+        self.latency_seconds = latency_seconds
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def call(self):
+        with self._lock:
+            self.count += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+
+class FakeDatastore(vim.Datastore):
+    # A real vim.Datastore subclass so it can be assigned to RelocateSpec.datastore
+    def __init__(self, moid, name, rpc):
+        super().__init__(moid)
+        self._name = name
+        self._rpc = rpc
+
+    @property
+    def name(self):
+        self._rpc.call()
+        return self._name
+
+
+class FakeHostSystem(vim.HostSystem):
+    def __init__(self, moid, name, rpc):
+        super().__init__(moid)
+        self._name = name
+        self._rpc = rpc
+
+    @property
+    def name(self):
+        self._rpc.call()
+        return self._name
+
+
+class FakeTask:
+    def __init__(self, moid):
+        self._moId = moid
+        self.info = SimpleNamespace(state="success", progress=100, error=None)
+
+
+class FakeVirtualMachine:
+    def __init__(self, index, host, datastore, rpc):
+        self._moId = f"vm-{index}"
+        self._rpc = rpc
+        self._name = f"bench-vm-{index:06d}"
+        self._datastore = datastore
+        windows = index % 3 == 0
+        powered_on = index % 10 != 0
+        guest = SimpleNamespace(
+            ipAddress=f"10.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}" if powered_on else None,
+            hostName=self._name,
+            guestFullName="Microsoft Windows Server 2019 (64-bit)" if windows else "Red Hat Enterprise Linux 8 (64-bit)",
+            toolsRunningStatus="guestToolsRunning" if powered_on else "guestToolsNotRunning",
+        )
+        power_state = "poweredOn" if powered_on else "poweredOff"
+        self._summary = SimpleNamespace(
+            config=SimpleNamespace(name=self._name, numCpu=random.choice([2, 4, 8]), guestFullName=guest.guestFullName,
+                                   memorySizeMB=random.choice([4096, 8192, 16384])),
+            runtime=SimpleNamespace(powerState=power_state),
+            quickStats=SimpleNamespace(overallCpuUsage=random.randint(0, 4000),
+                                       guestMemoryUsage=random.randint(256, 8192)),
+            storage=SimpleNamespace(committed=random.randint(10, 200) * 1024 ** 3,
+                                    uncommitted=random.randint(0, 50) * 1024 ** 3),
+            guest=guest,
+        )
+        self._runtime = SimpleNamespace(powerState=power_state, host=host)
+        self._config = SimpleNamespace(instanceUuid=f"50{index:030x}")
+        self._guest = guest
+
+    @property
+    def name(self):
+        self._rpc.call()
+        return self._name
+
+    @property
+    def summary(self):
+        self._rpc.call()
+        return self._summary
+
+    @property
+    def runtime(self):
+        self._rpc.call()
+        return self._runtime
+
+    @property
+    def guest(self):
+        self._rpc.call()
+        return self._guest
+
+    @property
+    def config(self):
+        self._rpc.call()
+        return self._config
+
+    @property
+    def datastore(self):
+        self._rpc.call()
+        return [self._datastore]
+
+    @property
+    def parent(self):
+        self._rpc.call()
+        return SimpleNamespace(name="vm")
+
+    def CloneVM_Task(self, folder, name, spec):
+        self._rpc.call()
+        return FakeTask(f"task-clone-{self._moId}")
+
+
+class FakeContainerView(vim.view.ContainerView):
+    # A real ContainerView subclass so it can be the root of a PropertyCollector ObjectSpec
+    def __init__(self, vms, rpc):
+        super().__init__("session[fake]view")
+        self._vms = vms
+        self._rpc = rpc
+
+    @property
+    def view(self):
+        self._rpc.call()
+        return list(self._vms)
+
+    def Destroy(self):
+        self._rpc.call()
+
+
+class FakePropertyCollector:
+    """Serves RetrievePropertiesEx from the fake objects' backing data, one RPC per page."""
+
+    def __init__(self, rpc):
+        self._rpc = rpc
+        self._pending = {}
+
+    @staticmethod
+    def _resolve(obj, path):
+        value = obj
+        for i, part in enumerate(path.split(".")):
+            value = getattr(value, f"_{part}" if i == 0 and hasattr(value, f"_{part}") else part, None)
+            if value is None:
+                return None
+        return value
+
+    def _page(self, objects, paths, max_objects):
+        page, rest = objects[:max_objects], objects[max_objects:]
+        token = None
+        if rest:
+            token = f"token-{id(rest)}"
+            self._pending[token] = (rest, paths, max_objects)
+        content = [SimpleNamespace(obj=obj, propSet=[SimpleNamespace(name=p, val=v) for p in paths
+                                                     if (v := self._resolve(obj, p)) is not None])
+                   for obj in page]
+        return SimpleNamespace(objects=content, token=token)
+
+    def RetrievePropertiesEx(self, specSet, options):
+        self._rpc.call()
+        spec = specSet[0]
+        root = spec.objectSet[0].obj
+        objects = list(root._vms) if isinstance(root, FakeContainerView) else [o.obj for o in spec.objectSet]
+        return self._page(objects, list(spec.propSet[0].pathSet), options.maxObjects or len(objects) or 1)
+
+    def ContinueRetrievePropertiesEx(self, token):
+        self._rpc.call()
+        objects, paths, max_objects = self._pending.pop(token)
+        return self._page(objects, paths, max_objects)
+
+
+class FakeServiceInstance:
+    def __init__(self, host, inventory):
+        self._stub = SimpleNamespace(host=f"{host}:443")
+        self._inventory = inventory
+
+    def RetrieveContent(self):
+        self._inventory.rpc.call()
+        return SimpleNamespace(
+            rootFolder=SimpleNamespace(name="Datacenters"),
+            viewManager=SimpleNamespace(CreateContainerView=self._create_container_view),
+            propertyCollector=FakePropertyCollector(self._inventory.rpc),
+        )
+
+    def _create_container_view(self, container, view_type, recursive):
+        self._inventory.rpc.call()
+        return FakeContainerView(self._inventory.vms, self._inventory.rpc)
+
+
+class FakeInventory:
+    """A synthetic vCenter inventory of `size` VMs spread over ESXi hosts and datastores."""
+
+    def __init__(self, size, rpc_latency_seconds=0.0, seed=42):
+        random.seed(seed)
+        self.rpc = RpcCounter(rpc_latency_seconds)
+        datastores = [FakeDatastore(f"datastore-{i}", f"bench-ds-{i:03d}", self.rpc) for i in range(max(size // 500, 1))]
+        hosts = [FakeHostSystem(f"host-{i}", f"esxi-{i:03d}.bench.local", self.rpc) for i in range(max(size // 100, 1))]
+        self.vms = [
+            FakeVirtualMachine(i, hosts[i % len(hosts)], datastores[i % len(datastores)], self.rpc)
+            for i in range(size)
+        ]
+
+    def vm_names(self):
+        return [vm._name for vm in self.vms]
+
+
+class FakeConnectModule:
+    """Drop-in replacement for pyVim.connect as used by the backend."""
+
+    LOGIN_RPCS = 3  # RetrieveServiceContent, Login, session check
+
+    def __init__(self, inventory):
+        self.inventory = inventory
+
+    def SmartConnect(self, host, user, pwd, sslContext=None, port=443, **kwargs):
+        for _ in range(self.LOGIN_RPCS):
+            self.inventory.rpc.call()
+        return FakeServiceInstance(host, self.inventory)
+
+    def Disconnect(self, si):
+        self.inventory.rpc.call()
+
+
+def install(vcenter_module, inventory):
+    """Point the backend's vCenter connections (vcenter.connect) at the fake inventory; returns a restore callable."""
+    original = vcenter_module.connect
+    vcenter_module.connect = FakeConnectModule(inventory)
+
+    def restore():
+        vcenter_module.connect = original
+    return restore
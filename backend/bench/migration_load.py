@@ -0,0 +1,187 @@
+"""Load harness for the long-running migration jobs.
+
+Starts the backend with uvicorn and a fake SSH server (bench.fake_ssh), then fires
+N concurrent virt-v2v conversions, live sync starts or IP reassignments through the
+real endpoints. While they run it records thread count, event-loop lag, status-poll
+latency and RSS, and repeats for each concurrency level.
+
+Run from the backend directory:
+
+    python -m bench.migration_load --scenarios v2v live-sync ip-reassign --concurrency 10 20 50
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import resource
+import socket
+import threading
+import time
+
+import requests
+import uvicorn
+
+import conversion_jobs
+import main
+from bench import fake_ssh
+from bench.vcenter_bench import percentile
+
+SCENARIOS = ["v2v", "live-sync", "ip-reassign"]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LoopLagMonitor:
+    """Measures how late the server's event loop wakes up from a fixed sleep."""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.samples = []
+
+    async def run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(time.perf_counter() - started - self.interval)
+
+    def reset(self):
+        self.samples = []
+
+
+def start_server(monitor):
+    """Run uvicorn on a loop we own so the lag monitor can be scheduled onto it."""
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_until_complete, args=(server.serve(),), daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    asyncio.run_coroutine_threadsafe(monitor.run(), loop)
+    return f"http://127.0.0.1:{port}", server
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def launch(session, base_url, scenario, index):
+    """Start one job and return the (path, completion check) used to poll it."""
+    if scenario == "v2v":
+        clone = f"load-{index}-VME_Clone_20250101000000"
+        session.post(f"{base_url}/api/vms/create-target-vm", json={
+            "sourceHost": {"id": "vc", "ipAddress": "10.99.0.250", "username": "u", "password": "p"},
+            "targetHost": {"id": "kvm", "ipAddress": "10.99.0.1", "username": "u", "password": "p"},
+            "cloneVmName": clone,
+        })
+        return (f"/api/vms/migration-status/{clone}",
+                lambda body: body.get("status") in ("success", "error"))
+    if scenario == "live-sync":
+        source, target = f"10.99.1.{index}", f"10.99.2.{index}"
+        session.post(f"{base_url}/api/vms/replication/start", json={
+            "source_ip": source, "target_ip": target, "username": "u", "password": "p"})
+        return (f"/api/vms/replication/logs/{source}/{target}",
+                lambda body: "lsyncd service started" in body.get("logs", "") or "error occurred" in body.get("logs", ""))
+    source = f"10.99.3.{index}"
+    session.post(f"{base_url}/api/vms/reassign-ip", json={
+        "source_ip": source, "target_ip": f"10.99.4.{index}", "username": "u", "password": "p",
+        "os_type": "Windows" if index % 2 else "Linux"})
+    return (f"/api/vms/reassign-ip/logs/{source}",
+            lambda body: any(line.startswith(("[SUCCESS]", "[ERROR]")) for line in body.get("logs", [])))
+
+
+def run_level(base_url, scenario, concurrency, monitor, ssh_server, args):
+    session = requests.Session()
+    monitor.reset()
+    commands_before = ssh_server.commands
+    started = time.perf_counter()
+    jobs = [launch(session, base_url, scenario, i) for i in range(concurrency)]
+    submit_seconds = time.perf_counter() - started
+
+    pending = dict(enumerate(jobs))
+    poll_latencies = []
+    peak_threads = threading.active_count()
+    peak_rss = rss_mb()
+    deadline = started + args.timeout
+    while pending and time.perf_counter() < deadline:
+        for index, (path, done) in list(pending.items()):
+            poll_started = time.perf_counter()
+            response = session.get(base_url + path)
+            poll_latencies.append(time.perf_counter() - poll_started)
+            if response.status_code == 200 and done(response.json()):
+                del pending[index]
+        peak_threads = max(peak_threads, threading.active_count())
+        peak_rss = max(peak_rss, rss_mb())
+        time.sleep(args.poll_interval)
+
+    lag = monitor.samples or [0.0]
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "completed": concurrency - len(pending),
+        "timedOut": len(pending),
+        "submitSeconds": round(submit_seconds, 3),
+        "wallSeconds": round(time.perf_counter() - started, 2),
+        "peakThreads": peak_threads,
+        "loopLagP50Ms": round(percentile(lag, 50) * 1000, 2),
+        "loopLagP99Ms": round(percentile(lag, 99) * 1000, 2),
+        "loopLagMaxMs": round(max(lag) * 1000, 2),
+        "pollP50Ms": round(percentile(poll_latencies, 50) * 1000, 2) if poll_latencies else None,
+        "pollP99Ms": round(percentile(poll_latencies, 99) * 1000, 2) if poll_latencies else None,
+        "peakRssMb": round(peak_rss, 1),
+        "sshCommands": ssh_server.commands - commands_before,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[20, 35, 50])
+    parser.add_argument("--v2v-seconds", type=float, default=30.0, help="Emulated duration of one conversion")
+    parser.add_argument("--command-latency-ms", type=float, default=10.0, help="Emulated latency of every other command")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--timeout", type=float, default=900.0, help="Per concurrency level")
+    parser.add_argument("--output", default=f"bench_results_load_{datetime.datetime.now():%Y%m%d%H%M%S}.json")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    # Keep the emulated conversions in memory, out of the real records and away from startup resumption
+    conversion_jobs.CONVERSION_JOBS_PATH = conversion_jobs.CONVERSION_CREDENTIALS_PATH = ""
+    # Clients hanging up on the fake server is expected; keep paramiko's server-side noise out of the report
+    logging.getLogger("paramiko").setLevel(logging.CRITICAL)
+    ssh_server = fake_ssh.FakeSSHServer(fake_ssh.CommandProfile(
+        v2v_seconds=args.v2v_seconds, command_latency=args.command_latency_ms / 1000)).start()
+    restore = fake_ssh.install_redirect(ssh_server)
+    monitor = LoopLagMonitor()
+    base_url, server = start_server(monitor)
+    results = []
+    try:
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                result = run_level(base_url, scenario, concurrency, monitor, ssh_server, args)
+                results.append(result)
+                print(json.dumps(result), flush=True)
+    finally:
+        server.should_exit = True
+        restore()
+        ssh_server.close()
+
+    with open(args.output, "w") as f:
+        json.dump({"meta": {"timestamp": datetime.datetime.now().isoformat(), "args": vars(args)},
+                   "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,162 @@
+"""Benchmark backend start-up: module import time and time to first request.
+
+Every measurement runs in a fresh interpreter so nothing is served from an already
+warm sys.modules. For each run it records:
+
+  * importSeconds     - wall time of `import main`
+  * firstRequestSeconds - from spawning `uvicorn main:app` to the first 200 from GET /
+  * deferredImportSeconds - what each lazily imported SDK costs when a request first needs it
+  * slowestImports    - the largest cumulative entries from `python -X importtime`
+
+Run from the backend directory:
+
+    python -m bench.startup_bench --runs 5 --output bench_results_startup.json
+    python -m bench.startup_bench --compare bench_results_startup.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+from bench.vcenter_bench import git_revision, percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFERRED_MODULES = ["pyVmomi", "pyVim.connect", "paramiko", "yaml", "requests", "reportlab.platypus"]
+
+IMPORT_PROBE = """
+import importlib, json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter() - started
+deferred = {}
+for name in sys.argv[1:]:
+    started = time.perf_counter()
+    importlib.import_module(name)
+    deferred[name] = time.perf_counter() - started
+print(json.dumps({"importSeconds": imported, "deferred": deferred}))
+"""
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import():
+    result = subprocess.run([sys.executable, "-c", IMPORT_PROBE, *DEFERRED_MODULES], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(limit):
+    """Top-level packages ranked by cumulative import time while importing main."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, check=True)
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not cumulative.isdigit():
+            continue
+        top = name.split(".")[0]
+        # A top-level package's own line carries the cumulative time of everything below it
+        if name == top:
+            packages[top] = max(packages.get(top, 0), int(cumulative))
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return [{"module": name, "cumulativeMs": round(us / 1000, 1)} for name, us in ranked]
+
+
+def measure_first_request(timeout):
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                               cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                if requests.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                    return time.perf_counter() - started
+            except requests.ConnectionError:
+                pass
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            time.sleep(0.01)
+        raise TimeoutError(f"No response from uvicorn within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def summarize(values):
+    return {
+        "medianMs": round(statistics.median(values) * 1000, 1),
+        "p90Ms": round(percentile(values, 90) * 1000, 1),
+        "minMs": round(min(values) * 1000, 1),
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    print(f"\nComparison against {baseline_path}:")
+    for key in ("import", "firstRequest"):
+        old, new = baseline.get(key, {}).get("medianMs"), results[key]["medianMs"]
+        if old:
+            print(f"  {key} median: {old} -> {new} ms ({(new - old) / old * 100:+.1f}%)")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Slowest top-level imports to report")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for uvicorn to answer")
+    parser.add_argument("--output", default=f"bench_results_startup_{datetime.datetime.now():%Y%m%d%H%M%S}.json")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    imports, first_requests, deferred = [], [], {name: [] for name in DEFERRED_MODULES}
+    for run in range(args.runs):
+        probe = measure_import()
+        imports.append(probe["importSeconds"])
+        for name, seconds in probe["deferred"].items():
+            deferred[name].append(seconds)
+        first_requests.append(measure_first_request(args.timeout))
+        print(f"run {run + 1}: import {imports[-1] * 1000:.1f} ms, first request {first_requests[-1] * 1000:.1f} ms",
+              flush=True)
+
+    results = {
+        "import": summarize(imports),
+        "firstRequest": summarize(first_requests),
+        "deferredImportMedianMs": {name: round(statistics.median(values) * 1000, 1) for name, values in deferred.items()},
+        "slowestImports": slowest_imports(args.top),
+    }
+    print(json.dumps(results, indent=2))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "gitRevision": git_revision(),
+            "python": platform.python_version(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main_cli()
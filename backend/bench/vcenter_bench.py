@@ -0,0 +1,199 @@
+"""Benchmark the vCenter-backed endpoints against a synthetic inventory.
+
+Run from the backend directory:
+
+    python -m bench.vcenter_bench --sizes 1000 10000 50000 --output bench_results.json
+    python -m bench.vcenter_bench --sizes 1000 --compare bench_results.json
+
+By default the backend talks to the in-process fake in bench.fake_vcenter, with
+--rpc-latency-ms injected per SOAP round trip. Pass --vcenter (e.g. a vcsim instance)
+to benchmark against a real SDK endpoint instead; RPC counts are then not reported.
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import uvicorn
+
+import main
+import vcenter
+from bench import fake_vcenter
+
+ENDPOINTS = ["vms", "precheck-report", "check-vms", "clone"]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server():
+    """Serve the backend app with uvicorn on a background thread; returns (base_url, server)."""
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", server
+
+
+def build_payload(endpoint, host, vm_names, sample_size, iteration):
+    sample = vm_names[:sample_size]
+    if endpoint == "vms":
+        return "/api/vms", host
+    if endpoint == "precheck-report":
+        return "/api/precheck-report", {"host": host, "vmNames": sample}
+    if endpoint == "check-vms":
+        return "/api/vms/replication/check-vms", {"host": host, "vm_names": sample}
+    # Clone a different powered-on VM each time so no request short-circuits on an existing clone
+    powered_on = [name for i, name in enumerate(vm_names) if i % 10 != 0]
+    return "/api/vms/clone", {"host": host, "vmName": powered_on[iteration % len(powered_on)]}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def run_endpoint(base_url, endpoint, host, vm_names, args, rpc):
+    session = requests.Session()
+    latencies = []
+    errors = 0
+
+    def one(iteration):
+        path, payload = build_payload(endpoint, host, vm_names, args.sample_size, iteration)
+        started = time.perf_counter()
+        response = session.post(base_url + path, json=payload, timeout=args.request_timeout)
+        elapsed = time.perf_counter() - started
+        return elapsed, response.status_code
+
+    rpc_before = rpc.count if rpc else 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for elapsed, status in executor.map(one, range(args.requests)):
+            latencies.append(elapsed)
+            if status >= 400:
+                errors += 1
+    wall = time.perf_counter() - started
+    rpc_calls = (rpc.count - rpc_before) if rpc else None
+
+    # Peak memory is measured on a separate request so tracemalloc overhead does not skew latency
+    tracemalloc.start()
+    one(args.requests)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "errors": errors,
+        "throughputRps": round(args.requests / wall, 3),
+        "p50Ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99Ms": round(percentile(latencies, 99) * 1000, 2),
+        "meanMs": round(statistics.mean(latencies) * 1000, 2),
+        "rpcsPerRequest": round(rpc_calls / args.requests, 1) if rpc_calls is not None else None,
+        "peakMemoryMb": round(peak / 1024 ** 2, 2),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    print(f"\nComparison against {baseline_path}:")
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        changes = []
+        for metric in ("throughputRps", "p50Ms", "p99Ms", "rpcsPerRequest", "peakMemoryMb"):
+            old, new = previous.get(metric), current.get(metric)
+            if old and new is not None:
+                changes.append(f"{metric} {old} -> {new} ({(new - old) / old * 100:+.1f}%)")
+        print(f"  {key}: " + ", ".join(changes))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--sample-size", type=int, default=50, help="VM names per precheck/check-vms request")
+    parser.add_argument("--rpc-latency-ms", type=float, default=0.5)
+    parser.add_argument("--request-timeout", type=float, default=600)
+    parser.add_argument("--vcenter", help="Benchmark a real SDK endpoint (e.g. vcsim) instead of the fake")
+    parser.add_argument("--username", default="user")
+    parser.add_argument("--password", default="pass")
+    parser.add_argument("--output", default=f"bench_results_{datetime.datetime.now():%Y%m%d%H%M%S}.json")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    base_url, server = start_server()
+    results = {}
+    try:
+        for size in args.sizes:
+            rpc = None
+            restore = None
+            if args.vcenter:
+                host = {"id": "bench", "ipAddress": args.vcenter, "username": args.username, "password": args.password}
+                vm_names = [vm["name"] for vm in requests.post(base_url + "/api/vms", json=host).json()]
+            else:
+                inventory = fake_vcenter.FakeInventory(size, args.rpc_latency_ms / 1000)
+                restore = fake_vcenter.install(vcenter, inventory)
+                rpc = inventory.rpc
+                host = {"id": "bench", "ipAddress": "fake-vcenter", "username": args.username, "password": args.password}
+                vm_names = inventory.vm_names()
+            try:
+                for endpoint in args.endpoints:
+                    key = f"{endpoint}@{size}"
+                    results[key] = run_endpoint(base_url, endpoint, host, vm_names, args, rpc)
+                    print(f"{key}: {json.dumps(results[key])}", flush=True)
+            finally:
+                if restore:
+                    restore()
+            if args.vcenter:
+                break
+    finally:
+        server.should_exit = True
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "gitRevision": git_revision(),
+            "python": platform.python_version(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main_cli()
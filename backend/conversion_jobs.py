@@ -0,0 +1,113 @@
+"""Persistent records of the virt-v2v conversions running detached on KVM hosts.
+
+A conversion runs as a transient systemd unit on the KVM host that writes to a log
+file there, so neither a dropped SSH session nor a backend restart stops it. The
+record kept here is what the backend needs to pick it up again: where the unit,
+log and exit-status files are, how many log bytes have been read, which transport
+attempt is running and which post-processing step comes next. They are written to
+CONVERSION_JOBS_PATH on every change, except that log progress alone is written at
+most every CONVERSION_JOBS_WRITE_INTERVAL_SECONDS.
+
+Records never hold credentials, since the API returns them. The request needed to
+reattach a running conversion (without the vCenter password, which is already on
+the KVM host) is kept in a separate owner-only file next to them and dropped when
+the conversion finishes, so the backend can resume it on startup.
+"""
+import copy
+import json
+import logging
+import os
+import threading
+import time
+
+CONVERSION_JOBS_PATH = os.getenv("CONVERSION_JOBS_PATH", "conversion_jobs.json")  # empty keeps records in memory only
+CONVERSION_JOB_HISTORY = 500  # finished records kept
+# Losing a little log progress in a crash only means re-reading those lines
+CONVERSION_JOBS_WRITE_INTERVAL_SECONDS = 30
+CONVERSION_CREDENTIALS_PATH = f"{CONVERSION_JOBS_PATH}.credentials" if CONVERSION_JOBS_PATH else ""
+
+conversion_jobs = {}  # clone VM name -> record
+_credentials = {}  # clone VM name -> request to reattach with, for running conversions only
+_lock = threading.Lock()
+_loaded = False
+_last_write = 0.0
+
+def _ensure_loaded():
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if _loaded:
+            return
+        _loaded = True
+        for path, records in ((CONVERSION_JOBS_PATH, conversion_jobs), (CONVERSION_CREDENTIALS_PATH, _credentials)):
+            if not path or not os.path.exists(path):
+                continue
+            try:
+                with open(path) as f:
+                    records.update(json.load(f))
+            except (OSError, ValueError) as e:
+                logging.warning(f"Could not load conversion jobs from {path}: {e}")
+
+def _dump(path, records, mode=0o644):
+    temp_path = f"{path}.tmp"
+    try:
+        with os.fdopen(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode), "w") as f:
+            json.dump(records, f, indent=1)
+        # Replace in one step so a crash mid-write never leaves a truncated file behind
+        os.replace(temp_path, path)
+    except OSError as e:
+        logging.warning(f"Could not write conversion jobs to {path}: {e}")
+
+def _write():
+    global _last_write
+    _last_write = time.monotonic()
+    finished = sorted((job for job in conversion_jobs.values() if job["status"] != "running"), key=lambda job: job["updatedAt"])
+    for job in finished[:max(0, len(finished) - CONVERSION_JOB_HISTORY)]:
+        del conversion_jobs[job["vmName"]]
+    if CONVERSION_JOBS_PATH:
+        _dump(CONVERSION_JOBS_PATH, conversion_jobs)
+
+def save_job(job, progress_only=False):
+    """Store a copy of the record (keyed by its vmName) and persist all records.
+
+    With `progress_only` the write is skipped if the file was written less than
+    CONVERSION_JOBS_WRITE_INTERVAL_SECONDS ago.
+    """
+    _ensure_loaded()
+    job["updatedAt"] = time.time()
+    with _lock:
+        # A copy, so the caller can keep changing its record while another thread dumps them all
+        conversion_jobs[job["vmName"]] = copy.deepcopy(job)
+        if job["status"] != "running" and _credentials.pop(job["vmName"], None) is not None and CONVERSION_CREDENTIALS_PATH:
+            _dump(CONVERSION_CREDENTIALS_PATH, _credentials, mode=0o600)
+        if not progress_only or time.monotonic() - _last_write >= CONVERSION_JOBS_WRITE_INTERVAL_SECONDS:
+            _write()
+    return job
+
+def get_job(vm_name):
+    _ensure_loaded()
+    with _lock:
+        job = conversion_jobs.get(vm_name)
+        return copy.deepcopy(job) if job else None
+
+def save_credentials(vm_name, request):
+    """Keep the request (a dict) that reattaches a running conversion, in the owner-only file."""
+    _ensure_loaded()
+    with _lock:
+        _credentials[vm_name] = copy.deepcopy(request)
+        if CONVERSION_CREDENTIALS_PATH:
+            _dump(CONVERSION_CREDENTIALS_PATH, _credentials, mode=0o600)
+
+def get_credentials(vm_name):
+    _ensure_loaded()
+    with _lock:
+        request = _credentials.get(vm_name)
+        return copy.deepcopy(request) if request else None
+
+def list_jobs():
+    """All records, most recently updated first."""
+    _ensure_loaded()
+    with _lock:
+        jobs = [copy.deepcopy(job) for job in conversion_jobs.values()]
+    return sorted(jobs, key=lambda job: job["updatedAt"], reverse=True)
@@ -0,0 +1,85 @@
+"""Run one command on many hosts over SSH concurrently, yielding each host's result as it finishes.
+
+Used by the validation endpoints so checking a whole wave costs roughly the slowest
+host rather than the sum of all of them. Every host gets its own connection, a short
+deadline for connecting and authenticating and a separate one for the command; a
+host that misses either is reported as "timeout" and its connection is closed under it.
+"""
+import asyncio
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from lazy_imports import paramiko
+from observability import ssh_command_timer, timed_ssh_connect
+
+FANOUT_MAX_OUTPUT_BYTES = 64 * 1024  # per stream and host
+FANOUT_CONNECT_TIMEOUT_SECONDS = 10.0  # connect, banner and authentication, each
+FANOUT_TIMEOUT_GRACE_SECONDS = 2.0
+
+def _read_limited(stream):
+    data = stream.read(FANOUT_MAX_OUTPUT_BYTES + 1)
+    truncated = len(data) > FANOUT_MAX_OUTPUT_BYTES
+    return data[:FANOUT_MAX_OUTPUT_BYTES].decode("utf-8", errors="replace"), truncated
+
+def run_on_host(host, command, timeout, holder, connect_timeout=FANOUT_CONNECT_TIMEOUT_SECONDS):
+    """Run `command` on one host; `holder` receives the client so the caller can close it on timeout."""
+    started = time.perf_counter()
+    result = {"host": host.ip_address, "status": "error", "exitCode": None, "stdout": "", "stderr": ""}
+    client = paramiko.SSHClient()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    holder.append(client)
+    try:
+        timed_ssh_connect(client, host.ip_address, username=host.username, password=host.password,
+                          timeout=connect_timeout, banner_timeout=connect_timeout, auth_timeout=connect_timeout)
+        with ssh_command_timer(host.ip_address):
+            stdin, stdout, stderr = client.exec_command(command, timeout=timeout)
+            result["stdout"], stdout_truncated = _read_limited(stdout)
+            result["stderr"], stderr_truncated = _read_limited(stderr)
+            result["exitCode"] = stdout.channel.recv_exit_status()
+        result["status"] = "ok" if result["exitCode"] == 0 else "failed"
+        if stdout_truncated or stderr_truncated:
+            result["truncated"] = True
+    except (socket.timeout, TimeoutError):
+        result["status"] = "timeout"
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        client.close()
+    result["elapsedMs"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+async def fan_out(hosts, command_for, timeout=30.0, concurrency=64, connect_timeout=FANOUT_CONNECT_TIMEOUT_SECONDS):
+    """Run command_for(host) on every host, at most `concurrency` at once, yielding results as they complete.
+
+    `timeout` bounds the command once connected; `connect_timeout` the connection and login before it.
+    """
+    connect_timeout = min(connect_timeout, timeout)
+    loop = asyncio.get_running_loop()
+    hosts = list({host.ip_address: host for host in hosts}.values())
+    # Own threads so a large wave is not capped by, and does not starve, the default executor
+    executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(hosts) or 1)), thread_name_prefix="fan-out")
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run(host):
+        async with semaphore:
+            holder = []
+            started = time.perf_counter()
+            try:
+                return await asyncio.wait_for(
+                    loop.run_in_executor(executor, run_on_host, host, command_for(host), timeout, holder, connect_timeout),
+                    connect_timeout + timeout + FANOUT_TIMEOUT_GRACE_SECONDS)
+            except asyncio.TimeoutError:
+                for client in holder:
+                    client.close()  # unblocks the worker thread's reads
+                return {"host": host.ip_address, "status": "timeout", "exitCode": None, "stdout": "", "stderr": "",
+                        "elapsedMs": round((time.perf_counter() - started) * 1000, 1)}
+
+    tasks = [asyncio.create_task(run(host)) for host in hosts]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        for task in tasks:
+            task.cancel()
+        executor.shutdown(wait=False)
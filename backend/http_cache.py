@@ -0,0 +1,124 @@
+"""Fast JSON encoding, compression and conditional responses for the polled endpoints.
+
+The UI polls inventory and job status every few seconds and mostly gets back what it
+already has. cached_json() encodes with orjson when it is installed, tags the body with
+an ETag and Last-Modified, answers a matching If-None-Match / If-Modified-Since with a
+bodiless 304, and otherwise compresses according to Accept-Encoding: brotli when the
+optional brotli package is installed, gzip otherwise.
+"""
+import collections
+import gzip
+import hashlib
+import json
+import threading
+import time
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt but stays optional
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 5  # most of the size win of 9 at a fraction of the CPU
+BROTLI_QUALITY = 4
+FIRST_SEEN_HISTORY = 5000
+_INSTANCE = uuid.uuid4().hex[:8]  # state versions restart with the process; keep old ETags from matching
+
+_first_seen = collections.OrderedDict()  # etag -> time the body was first served
+_first_seen_lock = threading.Lock()
+
+def dumps(content):
+    """Serialize to UTF-8 JSON bytes; orjson when available, the stdlib otherwise."""
+    if orjson is not None:
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=str, separators=(",", ":"), ensure_ascii=False).encode()
+
+def _first_seen_at(etag):
+    """When this representation was first served; stands in for Last-Modified of digest-versioned data."""
+    now = time.time()
+    with _first_seen_lock:
+        seen = _first_seen.get(etag)
+        if seen is None:
+            seen = _first_seen[etag] = now
+            while len(_first_seen) > FIRST_SEEN_HISTORY:
+                _first_seen.popitem(last=False)
+        else:
+            _first_seen.move_to_end(etag)
+    return seen
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2); weak comparison
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in candidates or etag.removeprefix("W/") in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def _negotiate_encoding(accept_encoding):
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[coding.strip()] = quality
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+def _compress(body, coding):
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+def cached_json(request, content, version=None, last_modified=None, status_code=200):
+    """Build the JSON response for `content`, or a 304 if the client already holds it.
+
+    `version` is a state counter for the resource (see state.bump_version); when given,
+    the ETag comes from it and unchanged data is answered without serializing anything.
+    Without it the ETag is a digest of the encoded body and Last-Modified is the time
+    that body was first served. Works for the POST read endpoints too, since the UI
+    sends the validators itself.
+    """
+    body = None
+    if version is not None:
+        etag = f'W/"{_INSTANCE}-v{version}"'
+    else:
+        body = dumps(content)
+        etag = f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+        last_modified = _first_seen_at(etag)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    # HTTP dates have whole seconds: a Last-Modified handed out during the second of the change would
+    # also match a second change in that same second, so it is only sent once that second is over
+    if last_modified is not None and time.time() >= int(last_modified) + 1:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    if body is None:
+        body = dumps(content)
+    coding = _negotiate_encoding(request.headers.get("accept-encoding", "")) if len(body) >= COMPRESS_MIN_BYTES else None
+    if coding:
+        body = _compress(body, coding)
+        headers["Content-Encoding"] = coding
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
@@ -0,0 +1,208 @@
+"""Executor for the long-running migration jobs, separate from the request threadpool.
+
+Conversions, preparations, syncs and IP reassignments used to run as FastAPI
+background tasks on Starlette's threadpool, so a handful of hour-long conversions
+took capacity from every sync request handler. Each job class now has its own pool
+of worker threads, started on demand up to its limit. Within a pool, queued jobs
+start in priority order ("critical" cutover steps first, "low" validation last) and
+then in submission order. Priority does not preempt running jobs, so short cutover
+steps get their own class rather than sharing one with hour-long jobs. A pool whose
+queue is full refuses new jobs with a 503 instead of queueing without bound.
+"""
+import asyncio
+import collections
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+from fastapi import HTTPException
+
+from observability import BACKGROUND_JOBS_ACTIVE, BACKGROUND_JOBS_QUEUED, JOB_QUEUE_WAIT_SECONDS
+
+PRIORITIES = ("critical", "high", "normal", "low")
+# job class -> (worker threads, max queued jobs)
+JOB_POOLS = {
+    "clone": (64, 1000),  # admitted clones, waiting on vCenter's clone task while they hold provisioning slots
+    "conversion": (16, 500),
+    "preparation": (16, 500),
+    "sync": (32, 500),
+    "live_sync": (16, 1000),  # short lsyncd start/stop/log steps, kept clear of hour-long robocopy runs
+    "cutover": (32, 1000),
+    "agent": (8, 500),
+    "validation": (4, 50),
+}
+# Overrides as "class=workers,...", e.g. JOB_POOL_WORKERS="conversion=8,sync=64"
+JOB_POOL_WORKERS = os.getenv("JOB_POOL_WORKERS", "")
+JOB_HISTORY = 500  # finished jobs kept for introspection
+
+class Job:
+    """One submitted call and its lifecycle; `future` resolves with its result."""
+
+    def __init__(self, job_class, func, args, priority, label):
+        self.id = uuid.uuid4().hex
+        self.job_class = job_class
+        self.kind = func.__name__
+        self.func = func
+        self.args = args
+        self.priority = priority
+        self.label = label
+        self.state = "queued"
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = Future()
+
+    def snapshot(self):
+        return {
+            "id": self.id,
+            "jobClass": self.job_class,
+            "kind": self.kind,
+            "label": self.label,
+            "priority": self.priority,
+            "state": self.state,
+            "submittedAt": self.submitted_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "error": self.error,
+        }
+
+class JobPool:
+    """Worker threads for one job class, fed from a priority queue."""
+
+    def __init__(self, job_class, workers, max_queued):
+        self.job_class = job_class
+        self.workers = workers
+        self.max_queued = max_queued
+        self.threads = 0
+        self.idle = 0
+        self.running = {}  # job id -> Job
+        self._queue = []  # (priority rank, sequence, Job)
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    def submit(self, job):
+        with self._cond:
+            if len(self._queue) >= self.max_queued:
+                raise HTTPException(status_code=503, headers={"Retry-After": "60"},
+                                    detail=f"The {self.job_class} job queue is full ({self.max_queued} jobs waiting).")
+            heapq.heappush(self._queue, (PRIORITIES.index(job.priority), next(self._sequence), job))
+            BACKGROUND_JOBS_QUEUED.labels(kind=job.kind).inc()
+            # A woken worker only leaves `idle` once it holds the lock again, so compare the
+            # whole queue with the idle workers rather than checking for none idle
+            if len(self._queue) > self.idle and self.threads < self.workers:
+                self.threads += 1
+                threading.Thread(target=self._work, name=f"job-{self.job_class}-{self.threads}", daemon=True).start()
+            else:
+                self._cond.notify()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self.idle += 1
+                    self._cond.wait()
+                    self.idle -= 1
+                _, _, job = heapq.heappop(self._queue)
+                self.running[job.id] = job
+            BACKGROUND_JOBS_QUEUED.labels(kind=job.kind).dec()
+            try:
+                self._run(job)
+            finally:
+                with self._cond:
+                    del self.running[job.id]
+                _finished(job)
+
+    def _run(self, job):
+        job.state, job.started_at = "running", time.time()
+        JOB_QUEUE_WAIT_SECONDS.labels(job_class=self.job_class, priority=job.priority).observe(job.started_at - job.submitted_at)
+        try:
+            with BACKGROUND_JOBS_ACTIVE.labels(kind=job.kind).track_inprogress():
+                if asyncio.iscoroutinefunction(job.func):
+                    result = asyncio.run(job.func(*job.args))
+                else:
+                    result = job.func(*job.args)
+        except BaseException as e:
+            job.state, job.error = "failed", str(e)
+            logging.exception(f"Job {job.kind} ({job.label or job.id}) failed")
+            job.future.set_exception(e)
+        else:
+            job.state = "succeeded"
+            job.future.set_result(result)
+        finally:
+            job.finished_at = time.time()
+
+    def snapshot(self):
+        with self._cond:
+            queued = [job for _, _, job in sorted(self._queue)]
+            return {
+                "jobClass": self.job_class,
+                "workers": self.workers,
+                "threads": self.threads,
+                "busy": len(self.running),
+                "queued": len(queued),
+                "maxQueued": self.max_queued,
+                "queuedByPriority": dict(collections.Counter(job.priority for job in queued)),
+            }
+
+    def jobs(self):
+        with self._cond:
+            return list(self.running.values()) + [job for _, _, job in sorted(self._queue)]
+
+def _pool_workers():
+    workers = {job_class: limits[0] for job_class, limits in JOB_POOLS.items()}
+    for entry in filter(None, (part.strip() for part in JOB_POOL_WORKERS.split(","))):
+        job_class, _, count = entry.partition("=")
+        if job_class in workers and count.isdigit() and int(count) > 0:
+            workers[job_class] = int(count)
+        else:
+            logging.warning(f"Ignoring JOB_POOL_WORKERS entry '{entry}'")
+    return workers
+
+pools = {job_class: JobPool(job_class, workers, JOB_POOLS[job_class][1]) for job_class, workers in _pool_workers().items()}
+finished_jobs = collections.deque(maxlen=JOB_HISTORY)
+_jobs_by_id = {}
+_history_lock = threading.Lock()
+
+def _finished(job):
+    with _history_lock:
+        if len(finished_jobs) == finished_jobs.maxlen:
+            _jobs_by_id.pop(finished_jobs[0].id, None)
+        finished_jobs.append(job)
+
+def submit_job(job_class, func, *args, priority="normal", label=None):
+    """Queue func(*args) on the pool for `job_class`; returns the Job. Raises a 503 when that queue is full."""
+    if job_class not in pools:
+        raise ValueError(f"Unknown job class '{job_class}'")
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown job priority '{priority}'")
+    job = Job(job_class, func, args, priority, label)
+    pools[job_class].submit(job)
+    with _history_lock:
+        _jobs_by_id[job.id] = job
+    return job
+
+async def run_job(job_class, func, *args, priority="normal", label=None):
+    """Submit a job and wait for its result, for request handlers that answer with it."""
+    job = submit_job(job_class, func, *args, priority=priority, label=label)
+    return await asyncio.wrap_future(job.future)
+
+def get_job(job_id):
+    with _history_lock:
+        job = _jobs_by_id.get(job_id)
+    return job.snapshot() if job else None
+
+def list_jobs(state=None, job_class=None):
+    """Running and queued jobs (queued in start order), then finished ones, newest first."""
+    current = [job for pool in pools.values() if job_class in (None, pool.job_class) for job in pool.jobs()]
+    with _history_lock:
+        history = [job for job in reversed(finished_jobs) if job_class in (None, job.job_class)]
+    return [job.snapshot() for job in current + history if state in (None, job.state)]
+
+def pool_snapshot():
+    return [pool.snapshot() for pool in pools.values()]
@@ -0,0 +1,42 @@
+"""Deferred imports for the heavy third-party packages.
+
+pyVmomi, paramiko, yaml and requests each add noticeably to interpreter start-up,
+and most workers only ever touch a few of them. The proxies below import the real
+module on first attribute access, so `paramiko.SSHClient()` or
+`except paramiko.AuthenticationException` work exactly as with a normal import.
+"""
+import importlib
+import threading
+
+
+class LazyModule:
+    """Stands in for a module (or one of its attributes) until it is first used."""
+
+    def __init__(self, module_name, attribute=None):
+        self._module_name = module_name
+        self._attribute = attribute
+        self._target = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    module = importlib.import_module(self._module_name)
+                    self._target = getattr(module, self._attribute) if self._attribute else module
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __repr__(self):
+        state = "loaded" if self._target is not None else "not loaded"
+        return f"<lazy {self._module_name}{'.' + self._attribute if self._attribute else ''} ({state})>"
+
+
+connect = LazyModule("pyVim.connect")
+vim = LazyModule("pyVmomi", "vim")
+vmodl = LazyModule("pyVmomi", "vmodl")
+paramiko = LazyModule("paramiko")
+yaml = LazyModule("yaml")
+requests = LazyModule("requests")
@@ -0,0 +1,236 @@
+"""Queue-based logging: callers only enqueue, a listener thread formats and writes.
+
+Records are stamped with the job, VM and wave IDs of the code that emitted them (set
+with log_scope or the logged_job decorator), rate-limited per call site before they are
+queued, and routed into per-job ring buffers that /api/logs/jobs serves.
+"""
+import asyncio
+import atexit
+import collections
+import contextlib
+import contextvars
+import datetime
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from io import StringIO
+
+from observability import LOG_RECORDS_DROPPED
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # "json" for one structured record per line
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_RATE_PER_SECOND = float(os.getenv("LOG_RATE_PER_SECOND", "20"))  # per call site and job, DEBUG/INFO only; 0 disables
+LOG_RATE_BURST = 50
+LOG_RATE_SWEEP_SECONDS = 60  # how often buckets that have refilled with nothing suppressed are dropped
+LOG_RATE_MAX_BUCKETS = 10000  # beyond this the least recently used buckets go, suppressed counts and all
+JOB_LOG_LINES = 2000
+JOB_LOG_HISTORY = 500
+CONTEXT_FIELDS = {"job_id": "jobId", "vm": "vm", "wave_id": "waveId"}
+
+log_context = contextvars.ContextVar("log_context", default={})
+log_capture = contextvars.ContextVar("log_capture", default=None)
+job_logs = collections.OrderedDict()  # job id -> {"total": int, "records": deque}
+job_logs_lock = threading.Lock()
+_listener = None
+
+@contextlib.contextmanager
+def log_scope(**fields):
+    """Attach job_id / vm / wave_id to every record logged inside the block, including from to_thread calls."""
+    token = log_context.set({**log_context.get(), **{k: v for k, v in fields.items() if v is not None}})
+    try:
+        yield
+    finally:
+        log_context.reset(token)
+
+def logged_job(fields_for):
+    """Run a background job (sync or async) inside log_scope(**fields_for(*args))."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with log_scope(**fields_for(*args, **kwargs)):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with log_scope(**fields_for(*args, **kwargs)):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@contextlib.contextmanager
+def capture_output():
+    """Collect the messages logged from the current thread or task into a StringIO.
+
+    Uses a context variable instead of adding a root handler, so concurrent captures
+    neither race on the handler list nor see each other's records.
+    """
+    stream = StringIO()
+    token = log_capture.set(stream)
+    try:
+        yield stream
+    finally:
+        log_capture.reset(token)
+
+def _record_entry(record):
+    entry = {
+        "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+        "level": record.levelname,
+        "logger": record.name,
+        "message": record.getMessage(),
+        "thread": record.threadName,
+    }
+    for attribute, key in CONTEXT_FIELDS.items():
+        value = getattr(record, attribute, None)
+        if value is not None:
+            entry[key] = value
+    if getattr(record, "suppressed", 0):
+        entry["suppressed"] = record.suppressed
+    return entry
+
+class ContextFilter(logging.Filter):
+    """Runs in the emitting thread: copies the log scope onto the record and feeds capture_output."""
+
+    def filter(self, record):
+        fields = log_context.get()
+        for attribute in CONTEXT_FIELDS:
+            if getattr(record, attribute, None) is None:
+                setattr(record, attribute, fields.get(attribute))
+        capture = log_capture.get()
+        if capture is not None:
+            capture.write(record.getMessage() + "\n")
+        return True
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per call site and job for DEBUG/INFO records; warnings and errors always pass.
+
+    The next record that gets through carries the number suppressed since the last one.
+    Buckets are kept in least recently used order. Those that have refilled with nothing
+    suppressed are dropped every LOG_RATE_SWEEP_SECONDS, so per-job keys do not accumulate.
+    """
+
+    def __init__(self, rate=LOG_RATE_PER_SECOND, burst=LOG_RATE_BURST):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._buckets = collections.OrderedDict()  # key -> (tokens, updated, suppressed), least recently used first
+        self._swept = time.monotonic()
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.rate <= 0 or record.levelno >= logging.WARNING:
+            return True
+        # Per job as well, so one chatty job cannot use up another job's budget for the same line
+        key = (record.pathname, record.lineno, getattr(record, "job_id", None))
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, suppressed = self._buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - 1, now, 0) if allowed else (tokens, now, suppressed + 1)
+            self._buckets.move_to_end(key)
+            if now - self._swept >= LOG_RATE_SWEEP_SECONDS:
+                self._sweep(now)
+            while len(self._buckets) > LOG_RATE_MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+        if not allowed:
+            LOG_RECORDS_DROPPED.labels(reason="rate_limited").inc()
+            return False
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+    def _sweep(self, now):
+        self._swept = now
+        refilled = now - self.burst / self.rate
+        for key, (_, updated, suppressed) in list(self._buckets.items()):
+            if updated > refilled:
+                break  # the rest were used more recently
+            if not suppressed:
+                del self._buckets[key]
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Drops (and counts) records when the queue is full rather than blocking the caller."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels(reason="queue_full").inc()
+
+class StructuredFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(_record_entry(record), default=str)
+
+class ContextTextFormatter(logging.Formatter):
+    """basicConfig's LEVEL:logger:message layout with the job context in front of the message."""
+
+    def format(self, record):
+        context = " ".join(f"{key}={getattr(record, attribute)}" for attribute, key in CONTEXT_FIELDS.items()
+                           if getattr(record, attribute, None) is not None)
+        suppressed = f" (+{record.suppressed} suppressed)" if getattr(record, "suppressed", 0) else ""
+        prefix = f"[{context}] " if context else ""
+        return f"{record.levelname}:{record.name}:{prefix}{record.getMessage()}{suppressed}"
+
+class JobLogRouter(logging.Handler):
+    """Keeps the most recent records of each job in memory, keyed by job_id."""
+
+    def emit(self, record):
+        job_id = getattr(record, "job_id", None)
+        if not job_id:
+            return
+        entry = _record_entry(record)
+        with job_logs_lock:
+            job = job_logs.get(job_id)
+            if job is None:
+                job = job_logs[job_id] = {"total": 0, "records": collections.deque(maxlen=JOB_LOG_LINES)}
+                while len(job_logs) > JOB_LOG_HISTORY:
+                    job_logs.popitem(last=False)
+            else:
+                job_logs.move_to_end(job_id)
+            job["total"] += 1
+            entry["seq"] = job["total"]
+            job["records"].append(entry)
+
+def get_job_logs(job_id, since=0, limit=500):
+    """Records of a job with seq > since; returns None for unknown jobs."""
+    with job_logs_lock:
+        job = job_logs.get(job_id)
+        if job is None:
+            return None
+        records = [entry for entry in job["records"] if entry["seq"] > since][:limit]
+        return {"jobId": job_id, "total": job["total"], "next": records[-1]["seq"] if records else since, "records": records}
+
+def list_job_logs():
+    with job_logs_lock:
+        return [{"jobId": job_id, "total": job["total"], "lastAt": job["records"][-1]["ts"] if job["records"] else None}
+                for job_id, job in reversed(job_logs.items())]
+
+def configure_logging(level=LOG_LEVEL):
+    """Route the root logger through a bounded queue drained by a single listener thread."""
+    global _listener
+    if _listener is not None:
+        return
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(StructuredFormatter() if LOG_FORMAT == "json" else ContextTextFormatter())
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, JobLogRouter())
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,195 @@
+"""Request and response models shared by the API routers."""
+from typing import Dict, Optional, List
+
+from pydantic import BaseModel
+
+# --- Pydantic Models ---
+
+class Host(BaseModel):
+    id: str
+    ipAddress: str
+    username: str
+    password: str
+    morpheusFqdn: Optional[str] = None
+    morpheusApiKey: Optional[str] = None
+
+class VirtualMachine(BaseModel):
+    id: str
+    name: str
+    powerState: str
+    cpuUsage: int
+    memoryUsage: int
+    storageUsage: float
+    ipAddress: Optional[str] = None
+    hostname: Optional[str] = None
+    guestOs: Optional[str] = None
+    guestOsFamily: Optional[str] = None
+    esxiHost: Optional[str] = None
+    hostId: str
+    cloneTaskId: Optional[str] = None
+    cloneProgress: Optional[int] = None
+    cloneStatus: Optional[str] = None
+    cloneName: Optional[str] = None
+    preparationStatus: Optional[str] = None
+    preparationLogs: Optional[str] = None
+    migrationStatus: Optional[str] = None
+    migrationLogs: Optional[str] = None
+    migrationProgress: Optional[int] = None
+    targetName: Optional[str] = None
+    liveSyncStatus: Optional[str] = None
+    liveSyncTargetIp: Optional[str] = None
+    liveSyncUsername: Optional[str] = None
+    liveSyncPassword: Optional[str] = None
+    liveSyncLogs: Optional[str] = None
+    morpheusAgentStatus: Optional[str] = None
+    pingStatus: Optional[str] = None
+    sourceFileCount: Optional[int] = None
+    targetFileCount: Optional[int] = None
+    chkdskReport: Optional[dict] = None
+    shutdownStatus: Optional[str] = None
+
+
+class FederatedInventoryRequest(BaseModel):
+    hosts: List[Host]
+    timeoutSeconds: float = 30.0  # per vCenter
+
+class EstimateVm(BaseModel):
+    name: str
+    storageUsage: Optional[float] = None  # GB, as listed by /api/vms
+    storageCommitted: Optional[float] = None  # GB actually allocated; used instead of storageUsage when given
+
+class DurationEstimateRequest(BaseModel):
+    vms: List[EstimateVm]
+    host: Optional[Host] = None  # source vCenter; fills in missing sizes from its inventory
+    vcenter: Optional[str] = None  # history scope when no host is given
+    kvmHost: Optional[str] = None
+    phases: List[str] = ["clone", "prepare", "v2v"]
+    concurrency: int = 4
+
+class PreCheckRequest(BaseModel):
+    host: Host
+    vmNames: List[str]
+
+class CloneRequest(BaseModel):
+    host: Host
+    vmName: str
+
+class TaskCheckRequest(Host):
+    pass
+
+class PrepareCloneRequest(BaseModel):
+    host: Host
+    cloneVmName: str
+
+class ConversionOptions(BaseModel):
+    transports: Optional[List[str]] = None  # VDDK modes to try in order: hotadd, san, nbd, nbdssl; default ranks by measured throughput
+    outputFormat: str = "qcow2"  # 'qcow2' or 'raw'
+    outputAllocation: Optional[str] = None  # 'sparse' or 'preallocated'; virt-v2v defaults to sparse
+    vddkConfig: Dict[str, str] = {}  # VixDiskLib config file entries, e.g. vixDiskLib.nfcAio.Session.BufSizeIn64KB
+    vddkOptions: Dict[str, str] = {}  # extra nbdkit-vddk parameters passed as -io vddk-<name>: port, nfchostport, snapshot
+
+class TargetVMRequest(BaseModel):
+    sourceHost: Host
+    targetHost: Host
+    cloneVmName: str
+    conversion: ConversionOptions = ConversionOptions()
+
+class LiveSyncRequest(BaseModel):
+    source_ip: str
+    target_ip: str
+    username: str
+    password: str
+
+class LiveSyncWaveRequest(BaseModel):
+    action: str  # 'start' or 'stop'
+    pairs: List[LiveSyncRequest]
+    concurrency: int = 16  # 1..256
+
+class CheckVmsRequest(BaseModel):
+    host: Host
+    vm_names: List[str]
+
+class WindowsLiveSyncRequest(BaseModel):
+    source_ip: str
+    target_ip: str
+    username: str
+    password: str
+    backend: Optional[str] = None  # 'openssh' or 'powershell'; defaults per backend host OS
+    threads: int = 16  # robocopy /MT, 1..128
+
+class InstallAgentRequest(BaseModel):
+    api_key: str
+    vme_host: str
+    vm_name: str
+    vm_username: str
+    vm_password: str
+
+class BulkAgentVm(BaseModel):
+    vm_name: str
+    vm_username: str
+    vm_password: str
+
+class BulkInstallAgentRequest(BaseModel):
+    api_key: str
+    vme_host: str
+    vms: List[BulkAgentVm]
+    concurrency: int = 8  # 1..32
+    poll_interval: float = 15.0  # at least 5s, at most poll_timeout
+    poll_timeout: float = 900.0  # up to 4h
+
+class PingTestRequest(BaseModel):
+    hostnames: List[str]
+    method: str = "icmp"  # 'icmp' or 'tcp'
+    ports: List[int] = [22, 3389, 5985]
+    timeout: float = 5.0
+    concurrency: int = 256
+    detailed: bool = False
+    stream: bool = False
+
+class FileCheckHost(BaseModel):
+    ip_address: str
+    username: str
+    password: str
+
+class CheckFilesRequest(BaseModel):
+    hosts: List[FileCheckHost]
+
+class ManifestDiffRequest(BaseModel):
+    source: FileCheckHost
+    target: FileCheckHost
+    verify_content: bool = False
+    max_differences: int = 1000
+
+class WindowsCheckFilesRequest(BaseModel):
+    hosts: List[FileCheckHost]
+    method: str = "robocopy"  # 'robocopy' (list-only inventory) or 'chkdsk'
+
+class FanOutRequest(BaseModel):
+    hosts: List[FileCheckHost]
+    operation: str  # one of the names listed by GET /api/vms/fan-out/operations
+    params: Dict[str, str] = {}
+    concurrency: int = 64
+    timeout: float = 30.0  # per host for the command; connecting and logging in have their own 10s limit
+    stream: bool = False
+
+
+class ShutdownVmRequest(BaseModel):
+    host: Host
+    vmName: str
+
+class ProfilingRequest(BaseModel):
+    route_prefix: str = "/api/"
+    count: int = 1
+
+class IpReassignmentRequest(BaseModel):
+    source_ip: str
+    target_ip: str
+    username: str
+    password: str
+    os_type: str  # 'Windows' or 'Linux'
+
+class BatchIpReassignmentRequest(BaseModel):
+    vms: List[IpReassignmentRequest]
+    concurrency: int = 10  # 1..256
+    verify: bool = True
+    verify_timeout: float = 300.0
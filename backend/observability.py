@@ -0,0 +1,254 @@
+"""Prometheus metrics, request/job tracing and the on-demand sampling profiler."""
+import contextlib
+import contextvars
+import datetime
+import functools
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+
+from fastapi import Request
+from prometheus_client import Counter, Gauge, Histogram
+
+# --- Metrics ---
+
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+LONG_JOB_BUCKETS = (10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200, 14400, 28800)
+THROUGHPUT_BUCKETS = tuple(mb * 1024 ** 2 for mb in (1, 5, 10, 25, 50, 100, 200, 400, 800, 1600))
+
+HTTP_REQUEST_SECONDS = Histogram("vme_http_request_duration_seconds", "HTTP handler latency per route.",
+                                 ["method", "route", "status"], buckets=LATENCY_BUCKETS)
+VCENTER_CONNECT_SECONDS = Histogram("vme_vcenter_connect_seconds", "vCenter SmartConnect latency.",
+                                    ["vcenter"], buckets=LATENCY_BUCKETS)
+VCENTER_RETRIEVE_CONTENT_SECONDS = Histogram("vme_vcenter_retrieve_content_seconds", "vCenter RetrieveContent latency.",
+                                             ["vcenter"], buckets=LATENCY_BUCKETS)
+SSH_CONNECT_SECONDS = Histogram("vme_ssh_connect_seconds", "SSH connect latency per host.",
+                                ["host"], buckets=LATENCY_BUCKETS)
+SSH_COMMAND_SECONDS = Histogram("vme_ssh_command_seconds", "SSH command latency per host, until output is read.",
+                                ["host"], buckets=LATENCY_BUCKETS)
+VIRT_V2V_SECONDS = Histogram("vme_virt_v2v_duration_seconds", "virt-v2v conversion duration.",
+                             ["kvm_host", "result"], buckets=LONG_JOB_BUCKETS)
+VIRT_V2V_THROUGHPUT = Histogram("vme_virt_v2v_throughput_bytes_per_second", "virt-v2v output bytes per second.",
+                                ["kvm_host", "transport"], buckets=THROUGHPUT_BUCKETS)
+VIRT_V2V_TRANSPORT_ATTEMPTS = Counter("vme_virt_v2v_transport_attempts_total", "virt-v2v runs per VDDK transport mode.",
+                                      ["kvm_host", "transport", "result"])
+CLONE_SECONDS = Histogram("vme_clone_duration_seconds", "CloneVM_Task duration as reported by vCenter.",
+                          ["vcenter"], buckets=LONG_JOB_BUCKETS)
+PREPARATION_PHASE_SECONDS = Histogram("vme_preparation_phase_seconds", "Clone preparation phase durations.",
+                                      ["phase"], buckets=LONG_JOB_BUCKETS)
+SSH_CONNECT_FAILURES = Counter("vme_ssh_connect_failures_total", "Failed SSH connection attempts per host.", ["host"])
+VIRT_V2V_BYTES = Counter("vme_virt_v2v_bytes_total", "Bytes written by successful virt-v2v conversions.", ["kvm_host"])
+BACKGROUND_JOBS_QUEUED = Gauge("vme_background_jobs_queued", "Background jobs scheduled but not yet started.", ["kind"])
+BACKGROUND_JOBS_ACTIVE = Gauge("vme_background_jobs_active", "Background jobs currently running.", ["kind"])
+JOB_QUEUE_WAIT_SECONDS = Histogram("vme_job_queue_wait_seconds", "Time background jobs waited for a worker.",
+                                   ["job_class", "priority"], buckets=LATENCY_BUCKETS + (600, 1800, 3600))
+LOG_RECORDS_DROPPED = Counter("vme_log_records_dropped_total", "Log records dropped before output.", ["reason"])
+ADMISSION_QUEUED = Gauge("vme_admission_queued", "vCenter operations waiting for admission.", ["scope", "target", "op_class"])
+ADMISSION_ACTIVE = Gauge("vme_admission_active", "vCenter operations currently admitted.", ["scope", "target", "op_class"])
+COALESCED_REQUESTS = Counter("vme_coalesced_requests_total", "Read requests by single-flight outcome (leader, shared, cached).",
+                             ["group", "outcome"])
+ADMISSION_WAIT_SECONDS = Histogram("vme_admission_wait_seconds", "Time vCenter operations spent queued for admission.",
+                                   ["scope", "op_class"], buckets=LATENCY_BUCKETS)
+
+def _vcenter_label(si):
+    return getattr(si._stub, "host", "unknown").split(":")[0]
+
+def retrieve_content(si):
+    vcenter = _vcenter_label(si)
+    with timed_span("vcenter.retrieve_content", VCENTER_RETRIEVE_CONTENT_SECONDS.labels(vcenter=vcenter), vcenter=vcenter):
+        return si.RetrieveContent()
+
+def timed_ssh_connect(client, hostname, **kwargs):
+    try:
+        with timed_span("ssh.connect", SSH_CONNECT_SECONDS.labels(host=hostname), host=hostname):
+            client.connect(hostname, **kwargs)
+    except Exception:
+        SSH_CONNECT_FAILURES.labels(host=hostname).inc()
+        raise
+
+def ssh_command_timer(host):
+    return timed_span("ssh.command", SSH_COMMAND_SECONDS.labels(host=host), host=host)
+
+def ssh_peer(ssh):
+    try:
+        return ssh.get_transport().getpeername()[0]
+    except Exception:
+        return "unknown"
+
+async def record_request_latency(request: Request, call_next):
+    """HTTP middleware observing handler latency per route template."""
+    start_time = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            method=request.method,
+            route=route.path if route else "unmatched",
+            status=str(status),
+        ).observe(time.perf_counter() - start_time)
+
+# --- Tracing & Profiling ---
+
+TRACE_HISTORY_LIMIT = 500
+PROFILE_SAMPLE_INTERVAL_SECONDS = 0.005
+
+current_trace = contextvars.ContextVar("current_trace", default=None)
+current_span = contextvars.ContextVar("current_span", default=None)
+traces = OrderedDict()
+traces_lock = threading.Lock()
+profiles = OrderedDict()
+armed_profiles = {}  # route prefix -> number of upcoming requests to profile
+
+def _elapsed_ms(trace):
+    return round((time.perf_counter() - trace["_start"]) * 1000, 3)
+
+def _close_phase(trace):
+    phase = trace.pop("_open_phase", None)
+    if phase:
+        phase["durationMs"] = round(_elapsed_ms(trace) - phase["startMs"], 3)
+        trace["spans"].append(phase)
+
+@contextlib.contextmanager
+def start_trace(trace_id, name):
+    """Collect spans for a request or a background job under trace_id."""
+    trace = {
+        "traceId": trace_id,
+        "name": name,
+        "startedAt": datetime.datetime.now().isoformat(),
+        "durationMs": None,
+        "spans": [],
+        "_start": time.perf_counter(),
+        "_threads": {threading.get_ident()},
+    }
+    with traces_lock:
+        traces[trace_id] = trace
+        traces.move_to_end(trace_id)
+        while len(traces) > TRACE_HISTORY_LIMIT:
+            traces.popitem(last=False)
+    token = current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _close_phase(trace)
+        trace["durationMs"] = _elapsed_ms(trace)
+        current_trace.reset(token)
+
+@contextlib.contextmanager
+def trace_span(name, **attributes):
+    """Record a timed span in the current trace; a no-op outside of one."""
+    trace = current_trace.get()
+    if trace is None:
+        yield None
+        return
+    trace["_threads"].add(threading.get_ident())
+    span = {"name": name, "parent": current_span.get(), "startMs": _elapsed_ms(trace), "durationMs": None, **attributes}
+    token = current_span.set(name)
+    try:
+        yield span
+    except Exception as e:
+        span["error"] = str(e)
+        raise
+    finally:
+        current_span.reset(token)
+        span["durationMs"] = round(_elapsed_ms(trace) - span["startMs"], 3)
+        trace["spans"].append(span)
+
+def trace_phase(name):
+    """Mark the start of the next sequential phase of a job, closing the previous one."""
+    trace = current_trace.get()
+    if trace is None:
+        return
+    _close_phase(trace)
+    trace["_threads"].add(threading.get_ident())
+    trace["_open_phase"] = {"name": name, "parent": current_span.get(), "startMs": _elapsed_ms(trace), "durationMs": None}
+
+@contextlib.contextmanager
+def timed_span(name, histogram=None, **attributes):
+    """A trace span that also observes its duration on a Prometheus histogram child."""
+    with trace_span(name, **attributes):
+        if histogram is None:
+            yield
+        else:
+            with histogram.time():
+                yield
+
+def traced_job(trace_id_for):
+    """Run a background job inside its own trace, keyed by the job's ID."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_trace(trace_id_for(*args, **kwargs), func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class SamplingProfiler:
+    """Samples the stacks of the threads a trace has touched and folds them for flame graphs."""
+
+    def __init__(self, trace, interval=PROFILE_SAMPLE_INTERVAL_SECONDS):
+        self.trace = trace
+        self.interval = interval
+        self.samples = defaultdict(int)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="vme-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.trace["_threads"]):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if stack:
+                    self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and return the profile in collapsed-stack format."""
+        self._stop.set()
+        self._thread.join()
+        ranked = sorted(self.samples.items(), key=lambda item: item[1], reverse=True)
+        return "\n".join(f"{stack} {count}" for stack, count in ranked)
+
+def _should_profile(request: Request):
+    if request.headers.get("x-profile", "").lower() in ("1", "true", "yes"):
+        return True
+    with traces_lock:
+        for prefix, remaining in list(armed_profiles.items()):
+            if remaining > 0 and request.url.path.startswith(prefix):
+                armed_profiles[prefix] = remaining - 1
+                return True
+    return False
+
+async def trace_request(request: Request, call_next):
+    """HTTP middleware running each request inside a trace, profiling it when asked to."""
+    trace_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    profiler = None
+    with start_trace(trace_id, f"{request.method} {request.url.path}") as trace:
+        if _should_profile(request):
+            profiler = SamplingProfiler(trace)
+            profiler.start()
+        try:
+            response = await call_next(request)
+        finally:
+            if profiler:
+                with traces_lock:
+                    profiles[trace_id] = profiler.stop()
+                    while len(profiles) > TRACE_HISTORY_LIMIT:
+                        profiles.popitem(last=False)
+    response.headers["X-Trace-Id"] = trace_id
+    if profiler:
+        response.headers["X-Profile-Id"] = trace_id
+    return response
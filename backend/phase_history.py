@@ -0,0 +1,101 @@
+"""Measured duration and size of every migration phase run, for the duration estimator.
+
+Each clone, preparation, virt-v2v conversion and Windows sync run is recorded with its
+wall time, the bytes it moved, the vCenter / KVM host / sync target it ran against and
+how many runs of the same phase were active when it started. History is kept in memory
+and, when PHASE_HISTORY_PATH is set, appended to that JSON-lines file and reloaded on
+first use, so estimates survive restarts.
+"""
+import collections
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+
+PHASES = ("clone", "prepare", "v2v", "sync")
+PHASE_HISTORY_LIMIT = 2000  # samples kept per phase
+PHASE_HISTORY_PATH = os.getenv("PHASE_HISTORY_PATH", "")  # empty keeps history in memory only
+
+phase_history = {phase: collections.deque(maxlen=PHASE_HISTORY_LIMIT) for phase in PHASES}
+_active = collections.Counter()
+_lock = threading.Lock()
+_loaded = False
+
+def _ensure_loaded():
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if _loaded:
+            return
+        _loaded = True
+        if not PHASE_HISTORY_PATH or not os.path.exists(PHASE_HISTORY_PATH):
+            return
+        try:
+            with open(PHASE_HISTORY_PATH) as f:
+                for line in f:
+                    try:
+                        sample = json.loads(line)
+                    except ValueError:
+                        continue
+                    if sample.get("phase") in phase_history:
+                        phase_history[sample["phase"]].append(sample)
+        except OSError as e:
+            logging.warning(f"Could not load phase history from {PHASE_HISTORY_PATH}: {e}")
+
+def record_phase(phase, seconds, byte_count=None, result="success", concurrency=None, **scope):
+    """Store one finished run of `phase`; scope keys are vm, vcenter, kvm_host and target."""
+    _ensure_loaded()
+    sample = {
+        "phase": phase,
+        "finishedAt": datetime.datetime.now().isoformat(timespec="seconds"),
+        "seconds": round(seconds, 3),
+        "bytes": byte_count,
+        "result": result,
+        "concurrency": concurrency,
+        **{key: value for key, value in scope.items() if value is not None},
+    }
+    with _lock:
+        phase_history[phase].append(sample)
+        if PHASE_HISTORY_PATH:
+            try:
+                with open(PHASE_HISTORY_PATH, "a") as f:
+                    f.write(json.dumps(sample) + "\n")
+            except OSError as e:
+                logging.warning(f"Could not append to phase history {PHASE_HISTORY_PATH}: {e}")
+    return sample
+
+def get_samples(phase, successful_only=True, **scope):
+    """Recorded runs of `phase`, newest last, matching every given scope value."""
+    _ensure_loaded()
+    with _lock:
+        samples = list(phase_history[phase])
+    return [s for s in samples
+            if (not successful_only or s["result"] == "success")
+            and all(s.get(key) == value for key, value in scope.items() if value is not None)]
+
+class PhaseRun:
+    """One timed run of a phase. finish() records it; only the first call counts.
+
+    `started` (epoch seconds) dates the run back, for runs picked up again after a restart.
+    """
+
+    def __init__(self, phase, started=None, **scope):
+        self.phase = phase
+        self.scope = scope
+        self._started = time.monotonic() - (time.time() - started if started else 0)
+        self._finished = False
+        with _lock:
+            _active[phase] += 1
+            self.concurrency = _active[phase]
+
+    def finish(self, result="success", byte_count=None):
+        if self._finished:
+            return None
+        self._finished = True
+        with _lock:
+            _active[self.phase] -= 1
+        return record_phase(self.phase, time.monotonic() - self._started, byte_count=byte_count, result=result,
+                            concurrency=self.concurrency, **self.scope)
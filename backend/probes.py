@@ -0,0 +1,80 @@
+"""Async ICMP/TCP reachability probes used by the ping test and IP reassignment verification."""
+import asyncio
+import platform
+import re
+import time
+
+PROBE_METHODS = ["icmp", "tcp"]
+
+async def _probe_icmp(host, timeout):
+    """Send a single ICMP echo using the system ping binary; returns the RTT in ms or None."""
+    if platform.system().lower() == 'windows':
+        command = ['ping', '-n', '1', '-w', str(int(timeout * 1000)), host]
+    else:
+        command = ['ping', '-c', '1', '-W', str(max(int(timeout), 1)), host]
+    start_time = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+    )
+    try:
+        output, _ = await asyncio.wait_for(process.communicate(), timeout=timeout + 1)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return None
+    if process.returncode != 0:
+        return None
+    match = re.search(r"time[=<]\s*([\d.]+)\s*ms", output.decode(errors="ignore"))
+    return float(match.group(1)) if match else round((time.perf_counter() - start_time) * 1000, 3)
+
+async def _probe_tcp(host, port, timeout):
+    """Time a TCP handshake to host:port; returns the RTT in ms or None."""
+    start_time = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    rtt = round((time.perf_counter() - start_time) * 1000, 3)
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return rtt
+
+async def probe_host(host, method="icmp", ports=(22, 3389, 5985), timeout=5.0):
+    result = {"host": host, "method": method, "status": "failed", "rttMs": None}
+    if not host or host == "N/A":
+        return result
+    try:
+        if method == "tcp":
+            rtts = await asyncio.gather(*(_probe_tcp(host, port, timeout) for port in ports))
+            open_ports = {port: rtt for port, rtt in zip(ports, rtts) if rtt is not None}
+            result["openPorts"] = sorted(open_ports)
+            if open_ports:
+                result["status"] = "success"
+                result["rttMs"] = min(open_ports.values())
+        else:
+            rtt = await _probe_icmp(host, timeout)
+            if rtt is not None:
+                result["status"] = "success"
+                result["rttMs"] = rtt
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+async def probe_hosts(hostnames, method="icmp", ports=(22, 3389, 5985), timeout=5.0, concurrency=256):
+    """Probe many hosts concurrently, yielding each result as soon as it completes."""
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def bounded_probe(host):
+        async with semaphore:
+            return await probe_host(host, method, ports, timeout)
+
+    tasks = [asyncio.create_task(bounded_probe(host)) for host in dict.fromkeys(hostnames)]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        for task in tasks:
+            task.cancel()
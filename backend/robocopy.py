@@ -0,0 +1,86 @@
+"""robocopy command builders and log parsing for the Windows sync and inventory paths."""
+import re
+
+WINDOWS_DRIVE_DETECT_CMD = 'for %d in (A B C D E F G H I J K L M N O P Q R S T U V W X Y Z) do @if exist %d:\\ echo %d:\\'
+ROBOCOPY_SYSTEM_EXCLUDE_DIRS = ["Windows", "Program Files", "Program Files (x86)", "ProgramData",
+                                "System Volume Information", "$Recycle.Bin", "Recovery", "PerfLogs"]
+ROBOCOPY_SYSTEM_EXCLUDE_FILES = ["pagefile.sys", "hiberfil.sys", "swapfile.sys", "DumpStack.log.tmp",
+                                 "*.etl", "*.evtx", "*.log1"]
+ROBOCOPY_MAX_THREADS = 128  # robocopy's own /MT limit
+SAFE_USERNAME = re.compile(r"^[\w.@\\-]+$")  # user, DOMAIN\user or user@domain
+
+def build_robocopy_command(drive, target_ip, username, threads):
+    """Build the cmd.exe line that mirrors a local drive of the source VM onto the target's admin share.
+
+    The share password is read as the first line of stdin and used through delayed expansion, so
+    cmd.exe never parses it and quotes, &, |, ^ or % in it stay literal.
+    """
+    if not SAFE_USERNAME.match(username):
+        raise ValueError(f"Unsupported characters in user name '{username}'.")
+    target_share = f"\\\\{target_ip}\\{drive}$"
+    options = [
+        "/MIR", "/Z", "/R:1", "/W:1", "/COPY:DAT", "/DCOPY:T", "/FFT",
+        f"/MT:{threads}", "/NP", "/TEE", f"/LOG+:C:\\Windows\\Temp\\vme_robocopy_{drive}.txt",
+    ]
+    if drive == "C":
+        options += ["/XD"] + [f'"C:\\{d}"' for d in ROBOCOPY_SYSTEM_EXCLUDE_DIRS]
+        options += ["/XF"] + ROBOCOPY_SYSTEM_EXCLUDE_FILES
+    return (
+        'cmd /v:on /c "set /p VME_PASSWORD=& '
+        f'net use {target_share} /user:{username} "!VME_PASSWORD!" >nul 2>&1 & '
+        f'robocopy {drive}:\\ {target_share} ' + " ".join(options) + '"'
+    )
+
+ROBOCOPY_COUNT_COLUMNS = ["total", "copied", "skipped", "mismatch", "failed", "extras"]
+ROBOCOPY_TIME_COLUMNS = ["total", "copied", "failed", "extras"]
+ROBOCOPY_BYTE_UNITS = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+
+def _parse_robocopy_bytes(value):
+    """Parse the Bytes row of a robocopy summary, where sizes may carry a k/m/g/t suffix."""
+    sizes = []
+    for number, unit in re.findall(r"(\d+(?:\.\d+)?)(?:\s+([kmgt])\b)?", value):
+        sizes.append(int(float(number) * ROBOCOPY_BYTE_UNITS.get(unit, 1)))
+    return dict(zip(ROBOCOPY_COUNT_COLUMNS, sizes))
+
+def _parse_robocopy_duration(value):
+    hours, minutes, seconds = (int(part) for part in value.split(":"))
+    return hours * 3600 + minutes * 60 + seconds
+
+def parse_robocopy_summaries(text):
+    """Turn the job summary blocks in robocopy output into per-drive statistics."""
+    summaries = {}
+    drive = None
+    for raw_line in text.splitlines():
+        prefix = re.match(r"^\[(\w):\]\s?", raw_line)
+        line = raw_line[prefix.end():] if prefix else raw_line
+        if prefix:
+            drive = prefix.group(1).upper()
+        source = re.match(r"^\s*Source\s*[:-]\s*(?:\\\\[^\\]+\\(\w)\$|(\w):\\)", line)
+        if source:
+            drive = (source.group(1) or source.group(2)).upper()
+            continue
+        # Only summary rows are numeric; this skips header lines such as "Files : *.*"
+        row = re.match(r"^\s*(Dirs|Files|Bytes|Times|Speed)\s*:\s*(\d[\d\s.:kmgtBytes/ec]*)$", line)
+        if not row or drive is None:
+            continue
+        name, value = row.group(1), row.group(2)
+        stats = summaries.setdefault(drive, {})
+        if name in ("Dirs", "Files"):
+            stats[name.lower()] = dict(zip(ROBOCOPY_COUNT_COLUMNS, (int(v) for v in value.split())))
+        elif name == "Bytes":
+            stats["bytes"] = _parse_robocopy_bytes(value)
+        elif name == "Times":
+            stats["times"] = dict(zip(ROBOCOPY_TIME_COLUMNS, (_parse_robocopy_duration(v) for v in value.split())))
+        else:
+            speed = re.match(r"([\d.]+)\s+Bytes/sec", value)
+            if speed:
+                stats["speedBytesPerSec"] = float(speed.group(1))
+    return summaries
+
+def build_robocopy_inventory_command(drive):
+    # List-only mode against a destination that is never created: robocopy walks the volume's
+    # directory entries and prints totals without reading file data or copying anything
+    return (
+        f"robocopy {drive}:\\ {drive}:\\VmeInventoryNull /L /E /XJ /BYTES /NFL /NDL /NP "
+        "/R:0 /W:0 /XF pagefile.sys hiberfil.sys swapfile.sys"
+    )
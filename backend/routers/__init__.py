@@ -0,0 +1 @@
+"""API routers, one per migration stage; main.py mounts them on the app."""
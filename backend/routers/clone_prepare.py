@@ -0,0 +1,273 @@
+"""Cloning source VMs in vCenter and preparing the clones for conversion."""
+import asyncio
+import datetime
+import logging
+import time
+from io import StringIO
+
+from fastapi import APIRouter, Body, HTTPException, Request
+
+from admission import acquire_deferred, admit, release, vm_scopes
+from http_cache import cached_json
+from jobs import submit_job
+from lazy_imports import vim
+from log_pipeline import logged_job
+from models import CloneRequest, Host, PrepareCloneRequest, TaskCheckRequest
+from observability import CLONE_SECONDS, PREPARATION_PHASE_SECONDS, timed_span, traced_job
+from phase_history import PhaseRun
+from singleflight import SingleFlight
+from state import clone_requests, clone_requests_lock, get_version, migration_statuses, update_migration_status
+from vcenter import (disable_nic_connect_at_power_on, disconnect, find_existing_clone, find_vm_by_name,
+                     get_vcenter_connection, power_on_vm_and_wait_for_tools, shutdown_vm_gracefully)
+
+router = APIRouter()
+
+observed_clone_tasks = set()
+CLONE_WATCH_INTERVAL_SECONDS = 5
+CLONE_ADMISSION_MAX_SECONDS = 4 * 3600
+# Clones queue for admission in the background rather than in a request, so they may wait much longer
+CLONE_ADMISSION_MAX_WAIT_SECONDS = 24 * 3600
+CLONE_REQUEST_HISTORY = 500  # finished clone requests kept for clone-status
+
+task_progress_flight = SingleFlight("task_progress")
+
+def _release_when_clone_done(si, task, held, clone_name, phase_run, source_bytes):
+    """Keep the clone's provisioning slots until vCenter finishes the task, then free them and the session."""
+    deadline = time.monotonic() + CLONE_ADMISSION_MAX_SECONDS
+    status = "error"
+    try:
+        while (task.info.state in [vim.TaskInfo.State.queued, vim.TaskInfo.State.running]
+               and time.monotonic() < deadline):
+            time.sleep(CLONE_WATCH_INTERVAL_SECONDS)
+        if task.info.state == vim.TaskInfo.State.success:
+            status = "success"
+            phase_run.finish(byte_count=source_bytes)
+    except Exception as e:
+        logging.warning(f"Lost track of clone task for '{clone_name}', releasing its admission: {e}")
+    finally:
+        phase_run.finish("error")
+        release(held)
+        disconnect(si)
+        clone_requests[clone_name].update(status=status)
+
+@traced_job(lambda host, vm_name, clone_name, held: f"clone:{clone_name}")
+@logged_job(lambda host, vm_name, clone_name, held: {"job_id": f"clone:{clone_name}", "vm": vm_name})
+def run_clone_task(host: Host, vm_name: str, clone_name: str, held: list):
+    """Start the admitted clone and hold its provisioning slots until vCenter has finished it."""
+    record = clone_requests[clone_name]
+    si = None
+    try:
+        # Connect only once admitted so a long wait cannot outlive the vCenter session
+        si = get_vcenter_connection(host)
+        vm_to_clone = find_vm_by_name(si, vm_name)
+        if not vm_to_clone:
+            raise Exception(f"VM '{vm_name}' not found.")
+
+        relospec = vim.vm.RelocateSpec()
+        relospec.datastore = vm_to_clone.datastore[0] if vm_to_clone.datastore else None
+
+        clonespec = vim.vm.CloneSpec()
+        clonespec.location = relospec
+        clonespec.powerOn = False
+        clonespec.template = False
+
+        source_bytes = vm_to_clone.summary.storage.committed
+        logging.info(f"Initiating clone for VM '{vm_name}' to '{clone_name}'...")
+        task = vm_to_clone.CloneVM_Task(folder=vm_to_clone.parent, name=clone_name, spec=clonespec)
+    except Exception as e:
+        logging.error(f"Error cloning VM {vm_name}: {e}")
+        release(held)
+        if si:
+            disconnect(si)
+        record.update(status="error", error=str(e))
+        return
+    record.update(status="running", taskId=task._moId)
+    phase_run = PhaseRun("clone", vm=vm_name, vcenter=host.ipAddress)
+    _release_when_clone_done(si, task, held, clone_name, phase_run, source_bytes)
+
+def _submit_admitted_clone(host: Host, vm_name: str, clone_name: str):
+    """The admission callback for a queued clone: hand it to the clone pool once its slots are held."""
+    def submit(held, error):
+        if error is not None:
+            clone_requests[clone_name].update(status="error", error=error.detail)
+            return
+        try:
+            # Admitted clones hold provisioning slots; start them ahead of anything else in the pool
+            submit_job("clone", run_clone_task, host, vm_name, clone_name, held, priority="high", label=clone_name)
+        except HTTPException as e:
+            release(held)
+            clone_requests[clone_name].update(status="error", error=e.detail)
+    return submit
+
+def _add_clone_request(vm_name, clone_name):
+    """Record a queued clone of vm_name; returns the name of the one already queued instead, if any."""
+    with clone_requests_lock:
+        pending = next((name for name, record in clone_requests.items()
+                        if record["vmName"] == vm_name and record["status"] == "queued"), None)
+        if pending:
+            return pending
+        clone_requests[clone_name] = {"vmName": vm_name, "status": "queued", "taskId": None, "error": None}
+        finished = [name for name, record in clone_requests.items() if record["status"] in ("success", "error")]
+        for name in finished[:max(0, len(finished) - CLONE_REQUEST_HISTORY)]:
+            del clone_requests[name]
+    return None
+
+def _clone_vm(request: CloneRequest):
+    logging.debug(f"Received clone request for VM: {request.vmName} on host {request.host.ipAddress}")
+    si = None
+    try:
+        si = get_vcenter_connection(request.host)
+        
+        existing_clone = find_existing_clone(si, request.vmName)
+        if existing_clone:
+            return {"status": "already_exists", "cloneName": existing_clone.name, "message": f"Clone for {request.vmName} already exists."}
+
+        vm_to_clone = find_vm_by_name(si, request.vmName)
+
+        if not vm_to_clone:
+            raise HTTPException(status_code=404, detail=f"VM '{request.vmName}' not found.")
+        
+        if vm_to_clone.runtime.powerState != 'poweredOn':
+            raise HTTPException(status_code=400, detail=f"VM '{request.vmName}' is not powered on. Skipping clone.")
+
+        timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+        clone_name = f"{request.vmName}-VME_Clone_{timestamp}"
+        scopes = vm_scopes(vm_to_clone, request.host.ipAddress)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logging.error(f"Error cloning VM {request.vmName}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if si:
+            disconnect(si)
+
+    pending = _add_clone_request(request.vmName, clone_name)
+    if pending:
+        return {"status": "queued", "cloneName": pending, "message": f"Clone for {request.vmName} is already queued."}
+    try:
+        # Waits in the background while the vCenter, ESXi host or datastore is at its provisioning limit
+        acquire_deferred("provision", _submit_admitted_clone(request.host, request.vmName, clone_name),
+                         max_wait=CLONE_ADMISSION_MAX_WAIT_SECONDS, **scopes)
+    except HTTPException:
+        with clone_requests_lock:
+            del clone_requests[clone_name]
+        raise
+    return {"status": "queued", "cloneName": clone_name,
+            "message": f"Clone of {request.vmName} queued; poll /api/vms/clone-status/{clone_name} for its task."}
+
+@router.post("/api/vms/clone")
+async def clone_vm(request: CloneRequest):
+    return await asyncio.to_thread(_clone_vm, request)
+
+@router.get("/api/vms/clone-status/{clone_name}")
+async def get_clone_status(clone_name: str):
+    """Whether a queued clone has been admitted yet; "taskId" is set once vCenter's clone task exists."""
+    record = clone_requests.get(clone_name)
+    if not record:
+        raise HTTPException(status_code=404, detail=f"No clone request for {clone_name}.")
+    return {"cloneName": clone_name, **record}
+
+def _task_progress(task_id: str, request: TaskCheckRequest):
+    si = None
+    try:
+        with admit("read", vcenter=request.ipAddress):
+            si = get_vcenter_connection(request)
+            task = vim.Task(task_id, si._stub)
+            info = task.info
+
+        if (info.state == vim.TaskInfo.State.success and task_id not in observed_clone_tasks
+                and info.descriptionId == "VirtualMachine.clone"
+                and info.startTime and info.completeTime):
+            observed_clone_tasks.add(task_id)
+            CLONE_SECONDS.labels(vcenter=request.ipAddress).observe(
+                (info.completeTime - info.startTime).total_seconds())
+
+        if info.state == vim.TaskInfo.State.error:
+            error_message = str(info.error.localizedMessage) if info.error.localizedMessage else "An unknown error occurred during the task."
+            raise HTTPException(status_code=500, detail=error_message)
+
+        return {"state": info.state, "progress": info.progress or 0}
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logging.error(f"Error fetching task progress for task {task_id}: {e}")
+        if "The object has already been deleted or has not been completely created" in str(e):
+             raise HTTPException(status_code=404, detail="Task not found. It might be completed or invalid.")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if si:
+            disconnect(si)
+
+@router.post("/api/tasks/{task_id}")
+async def get_task_progress(task_id: str, request: TaskCheckRequest = Body(...)):
+    return await task_progress_flight.run((task_id, request), asyncio.to_thread, _task_progress, task_id, request)
+
+@traced_job(lambda host, clone_vm_name: f"prepare:{clone_vm_name}")
+@logged_job(lambda host, clone_vm_name: {"job_id": f"prepare:{clone_vm_name}", "vm": clone_vm_name})
+def run_preparation_task(host: Host, clone_vm_name: str):
+    """The actual long-running preparation task."""
+    si = None
+    log_stream = StringIO()
+    vm_name = clone_vm_name # For status updates
+    phase_run = PhaseRun("prepare", vm=clone_vm_name, vcenter=host.ipAddress)
+    try:
+        update_migration_status(vm_name, "running", logs="Starting preparation...")
+        si = get_vcenter_connection(host)
+        
+        log_stream.write(f"Searching for VM clone '{clone_vm_name}'...\n")
+        update_migration_status(vm_name, "running", logs=log_stream.getvalue())
+        vm = find_vm_by_name(si, clone_vm_name)
+        if vm is None:
+            raise Exception(f"VM clone '{clone_vm_name}' not found.")
+        update_migration_status(vm_name, "running", logs=log_stream.getvalue())
+        scopes = vm_scopes(vm, host.ipAddress)
+
+        log_stream.write(f"VM found. Current power state: {vm.runtime.powerState}\n")
+        update_migration_status(vm_name, "running", logs=log_stream.getvalue())
+        if vm.runtime.powerState != vim.VirtualMachinePowerState.poweredOff:
+            with timed_span("prepare.initial_shutdown", PREPARATION_PHASE_SECONDS.labels(phase="initial_shutdown")):
+                shutdown_vm_gracefully(vm, log_stream, scopes=scopes)
+            update_migration_status(vm_name, "running", logs=log_stream.getvalue())
+
+        with timed_span("prepare.disable_nics", PREPARATION_PHASE_SECONDS.labels(phase="disable_nics")):
+            if not disable_nic_connect_at_power_on(vm, log_stream, scopes=scopes):
+                raise Exception("Failed to disable 'Connect at Power On'.")
+        update_migration_status(vm_name, "running", logs=log_stream.getvalue())
+
+        with timed_span("prepare.power_on", PREPARATION_PHASE_SECONDS.labels(phase="power_on")):
+            if not power_on_vm_and_wait_for_tools(vm, log_stream, scopes=scopes):
+                raise Exception("Failed to power on VM.")
+        update_migration_status(vm_name, "running", logs=log_stream.getvalue())
+
+        with timed_span("prepare.final_shutdown", PREPARATION_PHASE_SECONDS.labels(phase="final_shutdown")):
+            if not shutdown_vm_gracefully(vm, log_stream, scopes=scopes):
+                raise Exception("Failed to shut down VM.")
+        update_migration_status(vm_name, "running", logs=log_stream.getvalue())
+
+        log_stream.write("VM preparation complete.\n")
+        update_migration_status(vm_name, "success", logs=log_stream.getvalue())
+        phase_run.finish()
+
+    except Exception as e:
+        log_stream.write(f"An unexpected error occurred: {str(e)}\n")
+        update_migration_status(vm_name, "error", logs=log_stream.getvalue())
+    finally:
+        phase_run.finish("error")
+        if si:
+            disconnect(si)
+        log_stream.close()
+
+@router.post("/api/vms/prepare-for-target")
+async def prepare_clone_for_target(request: PrepareCloneRequest):
+    submit_job("preparation", run_preparation_task, request.host, request.cloneVmName, label=request.cloneVmName)
+    return {"status": "started", "message": f"Preparation process for {request.cloneVmName} has been initiated."}
+
+@router.get("/api/vms/preparation-status/{clone_vm_name}")
+async def get_preparation_status(request: Request, clone_vm_name: str):
+    status = migration_statuses.get(clone_vm_name)
+    if not status:
+        raise HTTPException(status_code=404, detail=f"Preparation status for {clone_vm_name} not found.")
+    version, updated_at = get_version("migration_statuses", clone_vm_name)
+    return cached_json(request, status, version=version, last_modified=updated_at)
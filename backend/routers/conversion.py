@@ -0,0 +1,482 @@
+"""virt-v2v conversion of prepared clones onto the target KVM host."""
+import collections
+import logging
+import os
+import re
+import shlex
+import statistics
+import time
+import xml.etree.ElementTree as ET
+from urllib.parse import quote
+
+from fastapi import APIRouter, HTTPException, Request
+
+from conversion_jobs import get_credentials, get_job, list_jobs, save_credentials, save_job
+from http_cache import cached_json
+from jobs import submit_job
+from lazy_imports import paramiko
+from log_pipeline import logged_job
+from models import ConversionOptions, TargetVMRequest
+from observability import (VIRT_V2V_BYTES, VIRT_V2V_SECONDS, VIRT_V2V_THROUGHPUT, VIRT_V2V_TRANSPORT_ATTEMPTS, trace_phase,
+                           traced_job)
+from phase_history import PhaseRun, get_samples
+from ssh_utils import get_ssh_client
+from state import get_version, migration_statuses, update_migration_status
+
+router = APIRouter()
+
+# --- VDDK Transport Selection ---
+
+VDDK_TRANSPORTS = ("san", "hotadd", "nbdssl", "nbd")  # tried in this order until something has been measured
+VDDK_OPTION_NAMES = {"port", "nfchostport", "snapshot"}
+V2V_OUTPUT_FORMATS = {"qcow2", "raw"}
+V2V_OUTPUT_ALLOCATIONS = {"sparse", "preallocated"}
+V2V_OUTPUT_TAIL_LINES = 50
+TRANSPORT_HISTORY = 50  # recent v2v runs per KVM host considered when ranking transports
+# Failures worth retrying in another mode: the requested mode is unavailable or its NBD connection could not
+# be set up. Credential, locked-disk and snapshot errors also mention VixDiskLib but fail the same in every mode.
+TRANSPORT_ERROR_PATTERN = re.compile(r"Cannot use mode|Transport mode not available|"
+                                     r"NBD_ERR_NETWORK_CONNECT|NBD_ERR_INSUFFICIENT_RESOURCES", re.IGNORECASE)
+SAFE_OPTION_VALUE = re.compile(r"^[\w.:/-]+$")
+
+def validate_conversion_options(options: ConversionOptions):
+    unknown = [t for t in options.transports or [] if t not in VDDK_TRANSPORTS]
+    if unknown or options.transports == []:
+        raise HTTPException(status_code=400, detail=f"transports must be a non-empty list of {', '.join(VDDK_TRANSPORTS)}.")
+    if options.outputFormat not in V2V_OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"outputFormat must be one of {', '.join(sorted(V2V_OUTPUT_FORMATS))}.")
+    if options.outputAllocation and options.outputAllocation not in V2V_OUTPUT_ALLOCATIONS:
+        raise HTTPException(status_code=400, detail=f"outputAllocation must be one of {', '.join(sorted(V2V_OUTPUT_ALLOCATIONS))}.")
+    unknown = [name for name in options.vddkOptions if name not in VDDK_OPTION_NAMES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unsupported vddkOptions: {', '.join(unknown)}.")
+    # Both end up on the KVM host's command line or in a file it reads, so only plain tokens are allowed
+    for key, value in [*options.vddkOptions.items(), *options.vddkConfig.items()]:
+        if not SAFE_OPTION_VALUE.match(key) or not SAFE_OPTION_VALUE.match(value):
+            raise HTTPException(status_code=400, detail=f"Invalid VDDK option '{key}={value}'.")
+
+def vddk_transport_order(kvm_host, vcenter, requested=None):
+    """Transports to try: as requested, else fastest measured first, then untried, then those that failed."""
+    if requested:
+        return list(dict.fromkeys(requested))
+    rates, failures = collections.defaultdict(list), collections.Counter()
+    for sample in get_samples("v2v", successful_only=False, kvm_host=kvm_host, vcenter=vcenter)[-TRANSPORT_HISTORY:]:
+        transport = sample.get("transport")
+        if sample["result"] == "success" and sample.get("bytes") and sample["seconds"] > 0:
+            rates[transport].append(sample["bytes"] / sample["seconds"])
+        elif sample["result"] == "transport_error":
+            failures[transport] += 1
+
+    def rank(transport):
+        if rates[transport]:
+            return (0, -statistics.median(rates[transport]))
+        return (2 if failures[transport] else 1, VDDK_TRANSPORTS.index(transport))
+    return sorted(VDDK_TRANSPORTS, key=rank)
+
+class KvmSession:
+    """Commands on the KVM host over one SSH connection, reconnecting when it drops."""
+
+    def __init__(self, host):
+        self.host = host
+        self.client = None
+
+    def _retry(self, action):
+        for attempt in range(1, SSH_RECONNECT_ATTEMPTS + 1):
+            try:
+                if self.client is None:
+                    self.client = get_ssh_client(self.host.ipAddress, self.host.username, self.host.password)
+                return action(self.client)
+            except paramiko.AuthenticationException:
+                raise
+            except (paramiko.SSHException, OSError, EOFError) as e:
+                self.close()
+                if attempt == SSH_RECONNECT_ATTEMPTS:
+                    raise
+                logging.warning(f"SSH to {self.host.ipAddress} failed ({e}), reconnecting (attempt {attempt})")
+                time.sleep(SSH_RECONNECT_DELAY_SECONDS * attempt)
+
+    def run(self, command):
+        """(exit code, stdout bytes, stderr text) of a command."""
+        def action(client):
+            stdin, stdout, stderr = client.exec_command(command, timeout=SSH_COMMAND_TIMEOUT_SECONDS)
+            output, error = stdout.read(), stderr.read().decode('utf-8', errors='replace')
+            return stdout.channel.recv_exit_status(), output, error
+        return self._retry(action)
+
+    def write_file(self, path, content, mode=None):
+        """Write a file over SFTP; with `mode` it is set before anything is written."""
+        def action(client):
+            sftp = client.open_sftp()
+            try:
+                with sftp.file(path, 'w') as f:
+                    if mode is not None:
+                        f.chmod(mode)
+                    f.write(content)
+            finally:
+                sftp.close()
+        self._retry(action)
+
+    def require_root(self):
+        """Fail unless the login is root: systemd-run, virsh and the datastore writes are not run through sudo."""
+        _, output, _ = self.run("id -u")
+        if output.strip() != b"0":
+            raise Exception(f"Conversions need a root login on the KVM host; {self.host.username}@{self.host.ipAddress} "
+                            "is not root.")
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+def fetch_thumbprint(session, vcenter_host):
+    command = f"openssl s_client -connect {vcenter_host}:443 </dev/null 2>/dev/null | openssl x509 -fingerprint -sha1 -noout"
+    _, output, _ = session.run(command)
+    match = re.search(r"Fingerprint=([A-F0-9:]+)", output.decode('utf-8'))
+    if match:
+        return match.group(1)
+    raise Exception("Failed to extract SHA1 fingerprint from vCenter.")
+
+# --- Detached Conversions ---
+
+V2V_JOB_DIR = "/var/tmp/vme-v2v"  # on the KVM host: per-conversion logs and exit status files
+V2V_POLL_SECONDS = 2.0
+V2V_LOG_MARKER = "---VME-V2V-LOG---"
+SSH_RECONNECT_ATTEMPTS = 5
+SSH_RECONNECT_DELAY_SECONDS = 5.0
+SSH_COMMAND_TIMEOUT_SECONDS = 120
+UNIT_NAME_UNSAFE = re.compile(r"[^\w.-]")
+POST_STEPS = ("fix_xml", "define", "network", "start_vm")
+
+conversions_attached = set()  # clone VM names with a worker in this process
+
+def _new_job(req, session):
+    """Prepare the KVM host for a conversion and return its initial record."""
+    vm_name = req.cloneVmName
+    # Extract base name for the output directory and VM name
+    base_vm_name_match = re.match(r"(.*?)-VME_Clone_\d{14}", vm_name)
+    if not base_vm_name_match:
+        raise Exception(f"Could not determine base name from clone '{vm_name}'")
+    base_vm_name = base_vm_name_match.group(1)
+    session.require_root()
+
+    update_migration_status(vm_name, "running", 10, "Fetching vCenter thumbprint...")
+    trace_phase("v2v.thumbprint")
+    thumbprint = fetch_thumbprint(session, req.sourceHost.ipAddress)
+
+    datastore_path = "/mnt/24445c14-4be6-49c7-91d4-f6e1b0a264c7"
+    vddk_libdir = "/opt/vmware-vix-disklib-distrib"
+    vcenter_path = "/vme-vc/10.55.175.0"
+
+    encoded_username = quote(req.sourceHost.username)
+    output_dir = f"{datastore_path}/{base_vm_name}"
+    job_dir = f"{V2V_JOB_DIR}/{UNIT_NAME_UNSAFE.sub('_', vm_name)}"
+    session.run(f"mkdir -p {output_dir} && mkdir -p -m 700 {job_dir}")
+
+    # Over SFTP, so the password never appears in a command line or shell history on the KVM host
+    temp_pass_file = f"{job_dir}/vcenter.pass"
+    session.write_file(temp_pass_file, req.sourceHost.password, mode=0o600)
+
+    options = req.conversion
+    config_file = None
+    if options.vddkConfig:
+        config_file = f"/tmp/v2v-vddk-{vm_name}.conf"
+        session.write_file(config_file, "".join(f"{key}={value}\n" for key, value in options.vddkConfig.items()))
+    tuning = "".join(f" -io vddk-{name}={value}" for name, value in options.vddkOptions.items())
+    if config_file:
+        tuning += f" -io vddk-config={config_file}"
+    allocation = f" -oa {options.outputAllocation}" if options.outputAllocation else ""
+
+    return {
+        "vmName": vm_name,
+        "baseVmName": base_vm_name,
+        "kvmHost": req.targetHost.ipAddress,
+        "vcenter": req.sourceHost.ipAddress,
+        "status": "running",
+        "createdAt": time.time(),
+        # The command without its transport; {transport} is filled in per attempt
+        "command": (
+            f"virt-v2v -ic 'vpx://{encoded_username}@{req.sourceHost.ipAddress}{vcenter_path}?no_verify=1' "
+            f"-ip {temp_pass_file} \"{vm_name}\" -on \"{base_vm_name}\" -o local -os {output_dir} "
+            f"-of {options.outputFormat}{allocation} -it vddk -io vddk-libdir={vddk_libdir} "
+            f"-io vddk-thumbprint={thumbprint} -io vddk-transports={{transport}}{tuning}"
+        ),
+        "outputDir": output_dir,
+        "jobDir": job_dir,
+        "cleanupFiles": [temp_pass_file] + ([config_file] if config_file else []),
+        "transports": vddk_transport_order(req.targetHost.ipAddress, req.sourceHost.ipAddress, options.transports),
+        "attempt": None,
+        "step": "convert",
+    }
+
+def _attempt_files(job):
+    attempt = job["attempt"]
+    unit = f"vme-v2v-{os.path.basename(job['jobDir'])}-{attempt}"
+    return unit, f"{job['jobDir']}/attempt-{attempt}.log", f"{job['jobDir']}/attempt-{attempt}.exit"
+
+def _launch_attempt(session, job, attempt):
+    """Start one transport attempt as a transient systemd unit; it outlives this SSH session."""
+    job.update(attempt=attempt, transport=job["transports"][attempt], attemptStartedAt=time.time(), logOffset=0)
+    unit, log_file, exit_file = _attempt_files(job)
+    script = f"{job['command'].format(transport=job['transport'])} > {log_file} 2>&1; echo $? > {exit_file}"
+    # The session re-runs a command after a dropped connection; skip the launch if that drop came after it
+    exit_code, _, error = session.run(f"systemctl is-active --quiet {unit} || test -e {exit_file} || "
+                                      f"systemd-run --unit={unit} --collect --quiet /bin/sh -c {shlex.quote(script)}")
+    if exit_code != 0:
+        raise Exception(f"Could not start virt-v2v unit {unit} on {job['kvmHost']}: {error.strip()}")
+    save_job(job)
+
+def _follow_attempt(session, job):
+    """Tail the attempt's log from the saved offset until it exits; returns its exit code."""
+    unit, log_file, exit_file = _attempt_files(job)
+    # Unit state before the exit file, and the exit file before the log, so a finished attempt is read completely
+    poll_command = (f"systemctl is-active --quiet {unit} && echo active; echo {V2V_LOG_MARKER}; "
+                    f"cat {exit_file} 2>/dev/null; echo {V2V_LOG_MARKER}; tail -c +{{offset}} {log_file} 2>/dev/null")
+    partial = ""
+    while True:
+        _, output, _ = session.run(poll_command.format(offset=job["logOffset"] + 1))
+        unit_state, exit_status, chunk = output.split(f"{V2V_LOG_MARKER}\n".encode(), 2)
+        if chunk:
+            job["logOffset"] += len(chunk)
+            save_job(job, progress_only=True)
+            *lines, partial = re.split(r"[\r\n]", partial + chunk.decode('utf-8', errors='replace'))
+            lines = [line.strip() for line in lines if line.strip()]
+            if lines:
+                # Update status with the latest line from virt-v2v
+                update_migration_status(job["vmName"], "running", 30, f"v2v: {lines[-1]}")
+        if exit_status.strip():
+            return int(exit_status)
+        if not unit_state.strip():
+            raise Exception(f"virt-v2v unit {unit} on {job['kvmHost']} stopped without an exit status "
+                            "(was the KVM host rebooted?).")
+        time.sleep(V2V_POLL_SECONDS)
+
+def _convert(session, job):
+    """Run (or reattach to) the transport attempts until one succeeds or a failure is final."""
+    vm_name, kvm_host = job["vmName"], job["kvmHost"]
+    if job["attempt"] is None:
+        _launch_attempt(session, job, 0)
+    while True:
+        transport = job["transport"]
+        update_migration_status(vm_name, "running", 20, f"Running virt-v2v migration (VDDK transport {transport})...")
+        phase_run = PhaseRun("v2v", started=job["attemptStartedAt"], vm=vm_name, vcenter=job["vcenter"],
+                             kvm_host=kvm_host, transport=transport)
+        try:
+            exit_code = _follow_attempt(session, job)
+        except (paramiko.SSHException, OSError, EOFError):
+            phase_run.finish("interrupted")  # still running on the host; the reattached run records the result
+            raise
+        except Exception:
+            phase_run.finish("error")
+            raise
+        v2v_seconds = time.time() - job["attemptStartedAt"]
+        VIRT_V2V_SECONDS.labels(kvm_host=kvm_host, result="success" if exit_code == 0 else "error").observe(v2v_seconds)
+        if exit_code == 0:
+            VIRT_V2V_TRANSPORT_ATTEMPTS.labels(kvm_host=kvm_host, transport=transport, result="success").inc()
+            _, output, _ = session.run(f"du -sb {job['outputDir']} | cut -f1")
+            output_bytes = output.decode('utf-8').strip()
+            if output_bytes.isdigit() and v2v_seconds > 0:
+                VIRT_V2V_BYTES.labels(kvm_host=kvm_host).inc(int(output_bytes))
+                VIRT_V2V_THROUGHPUT.labels(kvm_host=kvm_host, transport=transport).observe(int(output_bytes) / v2v_seconds)
+            phase_run.finish(byte_count=int(output_bytes) if output_bytes.isdigit() else None)
+            return
+
+        _, log_file, _ = _attempt_files(job)
+        _, output, _ = session.run(f"tail -n {V2V_OUTPUT_TAIL_LINES} {log_file}")
+        failure_log = output.decode('utf-8', errors='replace')
+        transport_failed = TRANSPORT_ERROR_PATTERN.search(failure_log) is not None
+        result = "transport_error" if transport_failed else "error"
+        VIRT_V2V_TRANSPORT_ATTEMPTS.labels(kvm_host=kvm_host, transport=transport, result=result).inc()
+        phase_run.finish(result)
+        if not transport_failed or job["attempt"] == len(job["transports"]) - 1:
+            raise Exception(f"virt-v2v failed with exit code {exit_code} (VDDK transport {transport}): {failure_log}")
+        next_transport = job["transports"][job["attempt"] + 1]
+        logging.warning(f"virt-v2v with VDDK transport {transport} failed for {vm_name}, trying {next_transport}")
+        update_migration_status(vm_name, "running", 20, f"VDDK transport {transport} failed, falling back to {next_transport}...")
+        # Clear what the failed attempt wrote so the next one starts from an empty output directory
+        session.run(f"rm -f {job['outputDir']}/{job['baseVmName']}-sd* {job['outputDir']}/{job['baseVmName']}.xml")
+        _launch_attempt(session, job, job["attempt"] + 1)
+
+def _fix_xml(session, job):
+    update_migration_status(job["vmName"], "running", 90, "Fixing VM configuration...")
+    trace_phase("v2v.fix_xml")
+    xml_file = f"{job['outputDir']}/{job['baseVmName']}.xml"
+    _, xml_content_bytes, stderr_output = session.run(f"cat {xml_file}")
+    if stderr_output: raise Exception(f"Could not read XML file: {stderr_output}")
+    xml_content = xml_content_bytes.decode('utf-8')
+
+    tree = ET.ElementTree(ET.fromstring(xml_content))
+    root = tree.getroot()
+    devices = root.find('devices')
+    if devices is not None:
+        disks = devices.findall('disk')
+        target_to_disk = {}
+        for disk in disks[:]:
+            target_elem = disk.find('target')
+            if target_elem is not None:
+                dev = target_elem.get('dev')
+                if dev:
+                    source_elem = disk.find('source')
+                    has_source = source_elem is not None and source_elem.get('file') is not None
+                    if dev in target_to_disk:
+                        prev_disk = target_to_disk[dev]
+                        prev_source = prev_disk.find('source')
+                        prev_has_source = prev_source is not None and prev_source.get('file') is not None
+                        if not has_source: devices.remove(disk)
+                        elif not prev_has_source:
+                            devices.remove(prev_disk)
+                            target_to_disk[dev] = disk
+                        else: devices.remove(disk)
+                    else: target_to_disk[dev] = disk
+
+    modified_xml = ET.tostring(root, encoding='unicode', method='xml')
+    session.write_file(xml_file, modified_xml)
+
+def _define_vm(session, job):
+    trace_phase("v2v.define")
+    _, _, stderr_output = session.run(f"virsh define {job['outputDir']}/{job['baseVmName']}.xml")
+    if stderr_output: raise Exception(f"Failed to define VM: {stderr_output}")
+
+def _set_network(session, job):
+    base_vm_name = job["baseVmName"]
+    temp_xml_path = f"/tmp/{base_vm_name}.xml"
+    network_command = (
+        f"virsh dumpxml {base_vm_name} | "
+        f"sed \"s/interface type='bridge'/interface type='network'/\" | "
+        f"sed \"s/source bridge='VM Network'/source network='Compute'/\" > {temp_xml_path} && "
+        f"virsh define {temp_xml_path}"
+    )
+    _, _, stderr_output = session.run(network_command)
+    if stderr_output: raise Exception(f"Failed to modify network settings: {stderr_output}")
+
+def _start_vm(session, job):
+    update_migration_status(job["vmName"], "running", 95, "Starting VM on target...")
+    trace_phase("v2v.start_vm")
+    _, _, stderr_output = session.run(f"virsh start {job['baseVmName']}")
+    # Resuming after a restart can find the VM already started by the interrupted run
+    if stderr_output and "already active" not in stderr_output: raise Exception(f"Failed to start VM: {stderr_output}")
+
+POST_STEP_HANDLERS = {"fix_xml": _fix_xml, "define": _define_vm, "network": _set_network, "start_vm": _start_vm}
+
+@traced_job(lambda req: f"virt-v2v:{req.cloneVmName}")
+@logged_job(lambda req: {"job_id": f"virt-v2v:{req.cloneVmName}", "vm": req.cloneVmName})
+def run_virt_v2v(req: TargetVMRequest):
+    """Convert the clone, or reattach to its conversion and continue from the step where it stopped."""
+    vm_name = req.cloneVmName
+    session = KvmSession(req.targetHost)
+    job = get_job(vm_name)
+    try:
+        update_migration_status(vm_name, "running", 5, "Connecting to KVM host...")
+        trace_phase("v2v.connect")
+        if job is None or job["status"] != "running":
+            job = save_job(_new_job(req, session))
+        else:
+            logging.info(f"Reattaching to the conversion of {vm_name} on {job['kvmHost']} at step {job['step']}")
+        # The vCenter password is only needed to start the conversion and is already on the KVM host
+        save_credentials(vm_name, req.model_dump(exclude={"sourceHost": {"password"}}))
+
+        if job["step"] == "convert":
+            trace_phase("v2v.convert")
+            try:
+                _convert(session, job)
+            except (paramiko.SSHException, OSError, EOFError):
+                raise  # the unit keeps running and still needs the password file
+            except Exception:
+                session.run(f"rm -f {' '.join(job['cleanupFiles'])}")
+                raise
+            session.run(f"rm -f {' '.join(job['cleanupFiles'])}")
+            job["step"] = POST_STEPS[0]
+            save_job(job)
+
+        # --- Start of post-migration script logic ---
+        for step in POST_STEPS[POST_STEPS.index(job["step"]):]:
+            POST_STEP_HANDLERS[step](session, job)
+            job["step"] = POST_STEPS[POST_STEPS.index(step) + 1] if step != POST_STEPS[-1] else "done"
+            save_job(job)
+        # --- End of post-migration script logic ---
+
+        session.run(f"rm -rf {job['jobDir']}")
+        job["status"] = "success"
+        save_job(job)
+        update_migration_status(vm_name, "success", 100, "Migration successful. VM created and started on target.")
+    except (paramiko.SSHException, OSError, EOFError) as e:
+        if job is None or job["status"] != "running":
+            update_migration_status(vm_name, "error", 0, str(e))
+        else:
+            # The conversion itself is unaffected; keep the record so a resubmission reattaches
+            update_migration_status(vm_name, "error", 0, f"Lost the SSH connection to {job['kvmHost']} ({e}) at step "
+                                                         f"{job['step']}; submit the conversion again to reattach.")
+    except Exception as e:
+        if job is not None and job["status"] == "running":
+            job.update(status="error", error=str(e))
+            save_job(job)
+        update_migration_status(vm_name, "error", 0, str(e))
+    finally:
+        conversions_attached.discard(vm_name)
+        session.close()
+
+def resume_conversions():
+    """Reattach to the conversions left running by an earlier process, from their stored requests."""
+    for job in list_jobs():
+        vm_name = job["vmName"]
+        request = get_credentials(vm_name)
+        if job["status"] != "running" or request is None or vm_name in conversions_attached:
+            continue
+        request["sourceHost"]["password"] = ""
+        conversions_attached.add(vm_name)
+        try:
+            submit_job("conversion", run_virt_v2v, TargetVMRequest(**request), priority="high", label=vm_name)
+        except HTTPException as e:
+            conversions_attached.discard(vm_name)
+            logging.warning(f"Could not resume the conversion of {vm_name}: {e.detail}")
+            continue
+        update_migration_status(vm_name, "running", 30 if job["step"] == "convert" else 90,
+                                f"Backend restarted; reattaching to the conversion on {job['kvmHost']} (step {job['step']}).")
+
+def restore_conversion_statuses():
+    """Show conversions left running by an earlier process that could not be resumed until they are resubmitted."""
+    for job in list_jobs():
+        if job["status"] == "running" and job["vmName"] not in conversions_attached and job["vmName"] not in migration_statuses:
+            update_migration_status(job["vmName"], "running", 30 if job["step"] == "convert" else 90,
+                                    f"Backend restarted while this conversion ran on {job['kvmHost']} "
+                                    f"(step {job['step']}); submit it again to reattach.")
+
+@router.post("/api/vms/create-target-vm")
+async def create_target_vm(request: TargetVMRequest):
+    validate_conversion_options(request.conversion)
+    vm_name = request.cloneVmName
+    if vm_name in conversions_attached:
+        raise HTTPException(status_code=409, detail=f"The conversion of {vm_name} is already running.")
+    job = get_job(vm_name)
+    if job and job["status"] == "running" and job["kvmHost"] != request.targetHost.ipAddress:
+        raise HTTPException(status_code=409, detail=f"{vm_name} is still being converted on {job['kvmHost']}.")
+    reattach = job is not None and job["status"] == "running"
+    conversions_attached.add(vm_name)
+    try:
+        # A reattached conversion is already using the KVM host; pick it up ahead of new ones
+        submit_job("conversion", run_virt_v2v, request, priority="high" if reattach else "normal", label=vm_name)
+    except HTTPException:
+        conversions_attached.discard(vm_name)
+        raise
+    if reattach:
+        return {"status": "reattached", "message": f"Reattaching to the conversion of {vm_name} on {job['kvmHost']}."}
+    return {"status": "started", "message": f"Migration process for {request.cloneVmName} has been initiated."}
+
+@router.get("/api/vms/conversions")
+async def get_conversions(running_only: bool = False):
+    """Records of the detached conversions, newest first."""
+    restore_conversion_statuses()
+    jobs = list_jobs()
+    for job in jobs:
+        job["attached"] = job["vmName"] in conversions_attached
+    return [job for job in jobs if job["status"] == "running"] if running_only else jobs
+
+@router.get("/api/vms/migration-status/{vm_name}")
+async def get_migration_status(request: Request, vm_name: str):
+    status = migration_statuses.get(vm_name)
+    if not status:
+        restore_conversion_statuses()
+        status = migration_statuses.get(vm_name)
+    if not status:
+        raise HTTPException(status_code=404, detail="Migration status not found for this VM.")
+    version, updated_at = get_version("migration_statuses", vm_name)
+    return cached_json(request, status, version=version, last_modified=updated_at)
@@ -0,0 +1,335 @@
+"""vCenter inventory listing and source VM power operations."""
+import asyncio
+import base64
+import json
+import logging
+import time
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+
+from admission import admit, vm_scopes
+from http_cache import cached_json
+from lazy_imports import vim, vmodl
+from models import FederatedInventoryRequest, Host, ShutdownVmRequest, VirtualMachine
+from observability import retrieve_content, trace_span
+from singleflight import SingleFlight
+from vcenter import disconnect, find_vm_by_name, get_vcenter_connection
+
+router = APIRouter()
+
+# --- Inventory Listing ---
+
+# Property paths each projectable field needs; only the union for a request is fetched from vCenter
+VM_FIELD_PROPERTIES = {
+    "id": [],
+    "name": ["name"],
+    "powerState": ["runtime.powerState"],
+    "cpuUsage": ["summary.quickStats.overallCpuUsage"],
+    "memoryUsage": ["summary.quickStats.guestMemoryUsage"],
+    "storageUsage": ["summary.storage.committed", "summary.storage.uncommitted"],
+    "storageCommitted": ["summary.storage.committed"],
+    "ipAddress": ["summary.guest.ipAddress"],
+    "hostname": ["summary.guest.hostName"],
+    "guestOs": ["summary.guest.guestFullName"],
+    "guestOsFamily": ["summary.config.guestFullName"],
+    "esxiHost": ["runtime.host"],
+    "hostId": [],
+    "instanceUuid": ["config.instanceUuid"],
+}
+LEGACY_VM_FIELDS = [f for f in VirtualMachine.model_fields if f in VM_FIELD_PROPERTIES and f not in ("guestOsFamily", "esxiHost")]
+FEDERATED_MAX_TIMEOUT_SECONDS = 300
+LINUX_GUEST_MARKERS = ("linux", "red hat", "centos", "ubuntu", "debian", "suse", "oracle", "rocky", "alma", "photon", "fedora")
+VM_PROPERTY_PAGE_SIZE = 1000
+VM_PAGE_DEFAULT_LIMIT = 500
+
+vm_rows_flight = SingleFlight("vm_rows")
+
+def _guest_os_family(guest_full_name):
+    name = (guest_full_name or "").lower()
+    if "windows" in name:
+        return "windows"
+    if any(marker in name for marker in LINUX_GUEST_MARKERS):
+        return "linux"
+    return "other"
+
+def _split_param(value):
+    return [part.strip() for part in value.split(",") if part.strip()] if value else []
+
+def _retrieve_properties(collector, filter_spec):
+    options = vmodl.query.PropertyCollector.RetrieveOptions(maxObjects=VM_PROPERTY_PAGE_SIZE)
+    result = collector.RetrievePropertiesEx([filter_spec], options)
+    while result:
+        for obj in result.objects:
+            yield obj.obj, {prop.name: prop.val for prop in obj.propSet}
+        result = collector.ContinueRetrievePropertiesEx(result.token) if result.token else None
+
+def retrieve_vm_properties(si, paths):
+    """Fetch only `paths` for every VM with PropertyCollector instead of a round trip per VM property."""
+    content = retrieve_content(si)
+    view = content.viewManager.CreateContainerView(content.rootFolder, [vim.VirtualMachine], True)
+    try:
+        traversal = vmodl.query.PropertyCollector.TraversalSpec(name="traverseView", path="view", skip=False,
+                                                               type=vim.view.ContainerView)
+        filter_spec = vmodl.query.PropertyCollector.FilterSpec(
+            objectSet=[vmodl.query.PropertyCollector.ObjectSpec(obj=view, skip=True, selectSet=[traversal])],
+            propSet=[vmodl.query.PropertyCollector.PropertySpec(type=vim.VirtualMachine, pathSet=sorted(paths), all=False)],
+        )
+        return list(_retrieve_properties(content.propertyCollector, filter_spec))
+    finally:
+        view.Destroy()
+
+def retrieve_host_names(si, hosts):
+    """Resolve HostSystem references to their names in one PropertyCollector call."""
+    if not hosts:
+        return {}
+    content = retrieve_content(si)
+    filter_spec = vmodl.query.PropertyCollector.FilterSpec(
+        objectSet=[vmodl.query.PropertyCollector.ObjectSpec(obj=host, skip=False) for host in hosts],
+        propSet=[vmodl.query.PropertyCollector.PropertySpec(type=vim.HostSystem, pathSet=["name"], all=False)],
+    )
+    return {obj._moId: props.get("name") for obj, props in _retrieve_properties(content.propertyCollector, filter_spec)}
+
+def _vm_row(vm, props, host_id, host_names):
+    committed = props.get("summary.storage.committed") or 0
+    uncommitted = props.get("summary.storage.uncommitted") or 0
+    esxi_host = props.get("runtime.host")
+    return {
+        "id": vm._moId,
+        "name": props.get("name"),
+        "powerState": props.get("runtime.powerState"),
+        # Missing quick stats and guest OS stay None, as the list has always returned them
+        "cpuUsage": props.get("summary.quickStats.overallCpuUsage"),
+        "memoryUsage": props.get("summary.quickStats.guestMemoryUsage"),
+        "storageUsage": round((committed + uncommitted) / (1024**3), 2),
+        "storageCommitted": round(committed / (1024**3), 2),  # what clones and conversions actually copy
+        "ipAddress": props.get("summary.guest.ipAddress") or "N/A",
+        "hostname": props.get("summary.guest.hostName") or "N/A",
+        "guestOs": props.get("summary.guest.guestFullName"),
+        "guestOsFamily": _guest_os_family(props.get("summary.config.guestFullName")),
+        "esxiHost": host_names.get(esxi_host._moId) if esxi_host is not None else None,
+        "hostId": host_id,
+        "instanceUuid": props.get("config.instanceUuid"),
+    }
+
+def _sort_key(field, descending):
+    # None sorts last in both directions; the VM id keeps the order total for cursors
+    if descending:
+        return lambda row: (row[field] is not None, row[field], row["id"])
+    return lambda row: (row[field] is None, row[field], row["id"])
+
+def _encode_cursor(sort, key):
+    return base64.urlsafe_b64encode(json.dumps({"sort": sort, "key": key}).encode()).decode()
+
+def _decode_cursor(cursor, sort):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if not isinstance(data, dict) or not isinstance(data.get("key"), list) or len(data["key"]) != 3:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if data.get("sort") != sort:
+        raise HTTPException(status_code=400, detail="Cursor was issued for a different sort order.")
+    return tuple(data["key"])
+
+def _listing_query(fields, sort, filters):
+    """Validate projection and sort; return (projection, sort_field, property paths to fetch)."""
+    projection = _split_param(fields) or LEGACY_VM_FIELDS
+    unknown = [f for f in projection if f not in VM_FIELD_PROPERTIES]
+    sort_field = sort.lstrip("-") if sort else None
+    if sort_field and sort_field not in VM_FIELD_PROPERTIES:
+        unknown.append(sort_field)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown VM field(s): {', '.join(unknown)}.")
+    needed = {"id", *projection, *(field for field, wanted in filters.items() if wanted)}
+    if sort_field:
+        needed.add(sort_field)
+    return projection, sort_field, needed
+
+def _filter_rows(rows, filters):
+    if filters["powerState"]:
+        rows = [r for r in rows if r["powerState"] in filters["powerState"]]
+    if filters["guestOsFamily"]:
+        rows = [r for r in rows if r["guestOsFamily"] in filters["guestOsFamily"]]
+    if filters["name"]:
+        rows = [r for r in rows if (r["name"] or "").lower().startswith(filters["name"].lower())]
+    if filters["esxiHost"]:
+        rows = [r for r in rows if r["esxiHost"] in filters["esxiHost"]]
+    return rows
+
+def fetch_vm_rows(host: Host, needed):
+    """Connect to one vCenter and return a row per VM with the `needed` fields filled in."""
+    paths = {path for field in needed for path in VM_FIELD_PROPERTIES[field]}
+    service_instance = None
+    try:
+        with admit("read", vcenter=host.ipAddress):
+            service_instance = get_vcenter_connection(host)
+            with trace_span("vcenter.property_fetch", vcenter=host.ipAddress):
+                vm_properties = retrieve_vm_properties(service_instance, paths)
+                host_names = {}
+                if "esxiHost" in needed:
+                    hosts = {props["runtime.host"]._moId: props["runtime.host"] for _, props in vm_properties if props.get("runtime.host")}
+                    host_names = retrieve_host_names(service_instance, list(hosts.values()))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred while fetching VMs: {str(e)}")
+    finally:
+        if service_instance:
+            disconnect(service_instance)
+    return [_vm_row(vm, props, host.id, host_names) for vm, props in vm_properties]
+
+async def shared_vm_rows(host: Host, needed):
+    """fetch_vm_rows, shared with any identical listing of the same vCenter already in flight."""
+    return await vm_rows_flight.run((host, sorted(needed)), asyncio.to_thread, fetch_vm_rows, host, needed)
+
+@router.post("/api/vms")
+async def get_vms_from_host(request: Request, host: Host, limit: Optional[int] = None, cursor: Optional[str] = None,
+                            power_state: Optional[str] = None, guest_os_family: Optional[str] = None,
+                            name_prefix: Optional[str] = None, esxi_host: Optional[str] = None,
+                            sort: Optional[str] = None, fields: Optional[str] = None):
+    """List the VMs of a vCenter, optionally filtered, sorted, projected and paginated.
+
+    Without `limit`/`cursor` this returns the plain list the UI has always consumed. With them it
+    returns {"items", "nextCursor", "total"}; pass nextCursor back with the same filters and sort.
+    Filters take comma-separated values, `sort` is a field name with an optional leading "-", and
+    `fields` lists the VirtualMachine properties to fetch and return ("id" is always included).
+    Responses carry an ETag of the listing; send it back as If-None-Match to get a bodiless 304.
+    """
+    logging.debug(f"Received payload for get_vms_from_host: {host.ipAddress}")
+    filters = {"powerState": set(_split_param(power_state)), "guestOsFamily": {f.lower() for f in _split_param(guest_os_family)},
+               "name": name_prefix, "esxiHost": set(_split_param(esxi_host))}
+    paginated = limit is not None or cursor is not None
+    page_size = limit if limit is not None else VM_PAGE_DEFAULT_LIMIT
+    if paginated and not sort:
+        sort = "name"
+    projection, sort_field, needed = _listing_query(fields, sort, filters)
+    if paginated and not 1 <= page_size <= 5000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 5000.")
+
+    rows = _filter_rows(await shared_vm_rows(host, needed), filters)
+    if sort_field:
+        descending = sort.startswith("-")
+        key = _sort_key(sort_field, descending)
+        rows = sorted(rows, key=key, reverse=descending)
+
+    def project(selected):
+        return [{field: row[field] for field in ["id", *projection]} for row in selected]
+
+    if not paginated:
+        return cached_json(request, project(rows))
+
+    total = len(rows)
+    if cursor:
+        after = _decode_cursor(cursor, sort)
+        try:
+            rows = [r for r in rows if (key(r) < after if descending else key(r) > after)]
+        except TypeError:  # a key of the wrong types for this sort field
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+    page = rows[:page_size]
+    next_cursor = _encode_cursor(sort, list(key(page[-1]))) if len(rows) > len(page) else None
+    return cached_json(request, {"items": project(page), "nextCursor": next_cursor, "total": total})
+
+async def _fetch_vcenter(host, needed, timeout):
+    started = time.perf_counter()
+    report = {"hostId": host.id, "ipAddress": host.ipAddress}
+    try:
+        # The worker thread cannot be cancelled; on timeout it finishes (and disconnects) in the background
+        rows = await asyncio.wait_for(shared_vm_rows(host, needed), timeout)
+        report.update(status="ok", vmCount=len(rows))
+    except asyncio.TimeoutError:
+        rows = []
+        report.update(status="timeout", error=f"No response within {timeout:g}s.")
+    except HTTPException as e:
+        rows = []
+        report.update(status="error", error=e.detail)
+    except Exception as e:
+        rows = []
+        report.update(status="error", error=str(e))
+    report["elapsedMs"] = round((time.perf_counter() - started) * 1000, 1)
+    if report["status"] != "ok":
+        logging.warning(f"Federated inventory: vCenter {host.ipAddress} {report['status']}: {report['error']}")
+    return rows, report
+
+@router.post("/api/vms/federated")
+async def get_vms_federated(request: Request, body: FederatedInventoryRequest,
+                            power_state: Optional[str] = None, guest_os_family: Optional[str] = None,
+                            name_prefix: Optional[str] = None, esxi_host: Optional[str] = None,
+                            sort: Optional[str] = None, fields: Optional[str] = None):
+    """List the VMs of several vCenters at once, each queried concurrently under its own timeout.
+
+    Takes the same filter, sort and field parameters as /api/vms. A vCenter that fails or times
+    out is reported in "vcenters" and leaves "partial" set instead of failing the request. Hosts
+    pointing at the same address are queried once, and a VM reached through two addresses of
+    the same vCenter (same instanceUuid) is listed once, under the first host's hostId.
+    """
+    if not body.hosts:
+        raise HTTPException(status_code=400, detail="At least one vCenter host is required.")
+    if not 0 < body.timeoutSeconds <= FEDERATED_MAX_TIMEOUT_SECONDS:
+        raise HTTPException(status_code=400, detail=f"timeoutSeconds must be between 0 and {FEDERATED_MAX_TIMEOUT_SECONDS}.")
+    filters = {"powerState": set(_split_param(power_state)), "guestOsFamily": {f.lower() for f in _split_param(guest_os_family)},
+               "name": name_prefix, "esxiHost": set(_split_param(esxi_host))}
+    projection, sort_field, needed = _listing_query(fields, sort, filters)
+    needed |= {"hostId", "instanceUuid"}
+
+    unique_hosts, duplicates = {}, []
+    for host in body.hosts:
+        address = host.ipAddress.strip().lower()
+        if address in unique_hosts:
+            duplicates.append({"hostId": host.id, "ipAddress": host.ipAddress, "status": "duplicate",
+                               "sameAs": unique_hosts[address].id})
+        else:
+            unique_hosts[address] = host
+    results = await asyncio.gather(*(_fetch_vcenter(host, needed, body.timeoutSeconds) for host in unique_hosts.values()))
+
+    rows, seen = [], set()
+    for host_rows, _ in results:
+        for row in host_rows:
+            identity = row["instanceUuid"] or (row["hostId"], row["id"])
+            if identity not in seen:
+                seen.add(identity)
+                rows.append(row)
+    rows = _filter_rows(rows, filters)
+    if sort_field:
+        descending = sort.startswith("-")
+        rows.sort(key=_sort_key(sort_field, descending), reverse=descending)
+
+    reports = [report for _, report in results]
+    output_fields = ["id", "hostId", *(f for f in projection if f not in ("id", "hostId"))]
+    return cached_json(request, {
+        "items": [{field: row[field] for field in output_fields} for row in rows],
+        "total": len(rows),
+        "partial": any(report["status"] != "ok" for report in reports),
+        "vcenters": reports + duplicates,
+    })
+
+def _shutdown_vm(request: ShutdownVmRequest):
+    si = None
+    try:
+        si = get_vcenter_connection(request.host)
+        vm = find_vm_by_name(si, request.vmName)
+        if not vm:
+            raise HTTPException(status_code=404, detail=f"VM '{request.vmName}' not found.")
+
+        if vm.runtime.powerState != vim.VirtualMachinePowerState.poweredOn:
+            return {"status": "already_off", "message": f"VM '{request.vmName}' is not powered on."}
+
+        if vm.guest.toolsRunningStatus != "guestToolsRunning":
+            raise HTTPException(status_code=400, detail=f"VMware Tools is not running on '{request.vmName}'. Cannot perform graceful shutdown.")
+
+        with admit("power", **vm_scopes(vm, request.host.ipAddress)):
+            vm.ShutdownGuest()
+        return {"status": "shutdown_initiated", "message": f"Graceful shutdown initiated for '{request.vmName}'."}
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logging.error(f"Error shutting down VM {request.vmName}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if si:
+            disconnect(si)
+
+@router.post("/api/vms/shutdown")
+async def shutdown_vm(request: ShutdownVmRequest):
+    return await asyncio.to_thread(_shutdown_vm, request)
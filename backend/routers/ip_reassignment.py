@@ -0,0 +1,510 @@
+"""Moving converted VMs onto their source IP addresses, one at a time or in batches."""
+import asyncio
+import collections
+import datetime
+import logging
+import os
+import re
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import APIRouter, HTTPException, Request
+
+from http_cache import cached_json
+from jobs import submit_job
+from lazy_imports import paramiko, yaml
+from log_pipeline import logged_job
+from models import BatchIpReassignmentRequest, IpReassignmentRequest
+from observability import timed_ssh_connect
+from probes import probe_host
+from ssh_utils import ssh_exec
+from state import (get_version, ip_reassignment_batches, ip_reassignment_logs, reset_ip_reassignment_logs,
+                   update_ip_reassignment_logs)
+
+router = APIRouter()
+
+# --- IP Reassignment Logic (Fire-and-Forget Approach) ---
+
+# Linux IP Reassignment Functions
+def _distro_from_os_release(os_release):
+    data = os_release.lower()
+    if "ubuntu" in data:
+        return "ubuntu"
+    elif "debian" in data:
+        return "debian"
+    elif "rhel" in data or "centos" in data or "oracle" in data:
+        return "rhel"
+    elif "suse" in data:
+        return "suse"
+    return "unknown"
+
+def detect_linux_network(ssh):
+    """Detect distro, interface, gateway and prefix in a single SSH round trip."""
+    marker = "---VME-NET---"
+    out, _ = ssh_exec(ssh, f"cat /etc/os-release; echo {marker}; ip route | grep default; echo {marker}; ip -o -f inet addr show")
+    os_release, routes, addresses = (out.split(marker) + ["", ""])[:3]
+    distro = _distro_from_os_release(os_release)
+
+    route = routes.strip().splitlines()
+    if not route:
+        return distro, None, None, None
+    parts = route[0].split()
+    gateway = parts[2]
+    iface = parts[4]
+
+    match = re.search(rf"^\d+:\s+{re.escape(iface)}\s+inet (\d+\.\d+\.\d+\.\d+)/(\d+)", addresses, re.MULTILINE)
+    if not match:
+        return distro, iface, gateway, None
+    return distro, iface, gateway, match.group(2)
+
+def update_linux_ip_address_and_disconnect(ssh, distro, iface, new_ip, prefix, gateway):
+    """Apply new IP configuration and immediately disconnect SSH session (fire-and-forget)."""
+    if distro in ["rhel", "centos", "oracle", "suse"]:
+        cmds = [
+            f"nmcli con mod {iface} ipv4.addresses {new_ip}/{prefix}",
+            f"nmcli con mod {iface} ipv4.method manual",
+            f"nmcli con mod {iface} ipv4.gateway {gateway}",
+            f"nmcli con up {iface}"
+        ]
+        for c in cmds:
+            logging.info(f"Sending: {c}")
+            ssh_exec(ssh, c, wait=False)
+
+    elif distro == "ubuntu":
+        out, _ = ssh_exec(ssh, "ls /etc/netplan/*.yaml /etc/netplan/*.yml 2>/dev/null")
+        if not out:
+            raise Exception("No netplan config found.")
+        yaml_path = out.splitlines()[0]
+
+        content, _ = ssh_exec(ssh, f"cat {yaml_path}")
+        try:
+            netplan_cfg = yaml.safe_load(content)
+        except yaml.YAMLError as e:
+            raise Exception(f"Failed to parse netplan config: {e}")
+
+        # Update the network configuration
+        ethernets = netplan_cfg.setdefault("network", {}).setdefault("ethernets", {})
+        for iface_name, iface_conf in ethernets.items():
+            if iface_name == iface:
+                iface_conf["dhcp4"] = False
+                iface_conf["addresses"] = [f"{new_ip}/{prefix}"]
+                iface_conf["gateway4"] = gateway
+                break
+
+        # Write the updated config to a temporary file and upload
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.yaml') as tmp_file:
+            yaml.safe_dump(netplan_cfg, tmp_file)
+            local_temp_path = tmp_file.name
+
+        try:
+            sftp = ssh.open_sftp()
+            remote_tmp_path = "/tmp/netplan_new.yaml"
+            sftp.put(local_temp_path, remote_tmp_path)
+            sftp.close()
+
+            cmd = f"mv {remote_tmp_path} {yaml_path} && netplan apply"
+            logging.info(f"Sending: {cmd}")
+            ssh_exec(ssh, cmd, wait=False)
+        finally:
+            os.unlink(local_temp_path)
+
+    elif distro == "debian":
+        out, _ = ssh_exec(ssh, "cat /etc/network/interfaces")
+        lines = out.splitlines()
+        new_lines = []
+        
+        for line in lines:
+            if line.strip().startswith("address"):
+                new_lines.append(f"    address {new_ip}")
+            elif line.strip().startswith("gateway"):
+                new_lines.append(f"    gateway {gateway}")
+            else:
+                new_lines.append(line)
+
+        # Write the updated interfaces file
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.interfaces') as tmp_file:
+            tmp_file.write("\n".join(new_lines))
+            local_temp_path = tmp_file.name
+
+        try:
+            sftp = ssh.open_sftp()
+            sftp.put(local_temp_path, "/tmp/interfaces_new")
+            sftp.close()
+
+            cmd = "mv /tmp/interfaces_new /etc/network/interfaces && ifdown -a && ifup -a"
+            logging.info(f"Sending: {cmd}")
+            ssh_exec(ssh, cmd, wait=False)
+        finally:
+            os.unlink(local_temp_path)
+
+    else:
+        raise Exception(f"Unsupported Linux distribution: {distro}")
+    
+    # Give time for command to fire before closing session
+    time.sleep(2)
+    logging.info("Closing SSH session (host will change IP).")
+    ssh.close()
+
+# Windows IP Reassignment Functions
+def get_interface_details(ssh, source_ip):
+    """
+    Run 'netsh interface ip show config' on remote Windows host via SSH
+    and parse the details for the given source IP.
+    """
+    stdin, stdout, stderr = ssh.exec_command(r'C:\Windows\System32\netsh.exe interface ip show config')
+    output = stdout.read().decode()
+    error = stderr.read().decode()
+
+    if error:
+        logging.error(f"netsh failed: {error}")
+        return None, None, None
+
+    interfaces = output.split("Configuration for interface")
+
+    for block in interfaces:
+        if source_ip in block:
+            # Extract interface name
+            match_name = re.search(r'"(.+?)"', block)
+            interface_name = match_name.group(1) if match_name else None
+
+            # Extract subnet prefix (/CIDR -> Subnet Mask)
+            match_subnet = re.search(r"Subnet Prefix:\s+(\d+\.\d+\.\d+\.\d+)/(\d+)", block)
+            subnet_mask = None
+            if match_subnet:
+                _, cidr = match_subnet.groups()
+                cidr = int(cidr)
+                mask = (0xffffffff >> (32 - cidr)) << (32 - cidr)
+                subnet_mask = ".".join([str((mask >> (i * 8)) & 0xFF) for i in range(3, -1, -1)])
+
+            # Extract gateway
+            match_gw = re.search(r"Default Gateway:\s+(\d+\.\d+\.\d+\.\d+)", block)
+            gateway = match_gw.group(1) if match_gw else None
+
+            return interface_name, subnet_mask, gateway
+
+    return None, None, None
+
+
+def change_windows_ip_and_disconnect(ssh, interface, target_ip, subnet_mask, gateway):
+    """
+    Run netsh to assign a new static IP on remote Windows host via SSH.
+    Close session immediately after sending command (fire-and-forget).
+    """
+    command = (
+        fr'C:\Windows\System32\netsh.exe interface ip set address '
+        fr'name="{interface}" static {target_ip} {subnet_mask} {gateway}'
+    )
+    logging.info(f"Sending command (will disconnect after IP change): {command}")
+
+    transport = ssh.get_transport()
+    channel = transport.open_session()
+    channel.exec_command(command)
+
+    # Give the command a moment to start
+    time.sleep(2)
+
+    logging.info("Closing SSH session (IP change may disconnect this host).")
+    ssh.close()
+
+
+@logged_job(lambda request: {"job_id": f"reassign-ip:{request.source_ip}", "vm": request.source_ip})
+def run_ip_reassignment_task(request: IpReassignmentRequest):
+    """Background task to handle IP reassignment with detailed logging. Returns True once the change was sent."""
+    source_ip = request.source_ip
+    target_ip = request.target_ip
+    
+    # Initialize logs
+    reset_ip_reassignment_logs(source_ip)
+    
+    ssh = None
+    try:
+        # Step 1: Connecting
+        update_ip_reassignment_logs(source_ip, f"[INFO] Connecting to {source_ip} via SSH...")
+        
+        ssh = paramiko.SSHClient()
+        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        timed_ssh_connect(
+            ssh,
+            source_ip, 
+            port=22, 
+            username=request.username, 
+            password=request.password, 
+            timeout=30,
+            banner_timeout=30,
+            auth_timeout=30,
+            look_for_keys=False,
+            allow_agent=False
+        )
+        
+        update_ip_reassignment_logs(source_ip, "[INFO] SSH connection established.")
+        
+        if request.os_type.lower() == 'windows':
+            # Windows IP reassignment with detailed logging
+            interface, subnet_mask, gateway = get_interface_details(ssh, source_ip)
+            
+            if not interface or not subnet_mask or not gateway:
+                update_ip_reassignment_logs(source_ip, f"[ERROR] Could not detect network configuration for source IP {source_ip}")
+                return
+            
+            update_ip_reassignment_logs(source_ip, f"[INFO] Interface: {interface}")
+            update_ip_reassignment_logs(source_ip, f"[INFO] Subnet   : {subnet_mask}")
+            update_ip_reassignment_logs(source_ip, f"[INFO] Gateway  : {gateway}")
+            update_ip_reassignment_logs(source_ip, f"[INFO] Target IP: {target_ip}")
+            update_ip_reassignment_logs(source_ip, "Proceed with IP change? (y/n): y")
+            
+            command = (
+                fr'C:\Windows\System32\netsh.exe interface ip set address '
+                fr'name="{interface}" static {target_ip} {subnet_mask} {gateway}'
+            )
+            update_ip_reassignment_logs(source_ip, f"[INFO] Sending command (will disconnect after IP change): {command}")
+            
+            # Fire-and-forget IP change
+            transport = ssh.get_transport()
+            channel = transport.open_session()
+            channel.exec_command(command)
+            time.sleep(2)
+            
+            update_ip_reassignment_logs(source_ip, "[INFO] Closing SSH session (IP change may disconnect this host).")
+            ssh.close()
+            ssh = None
+            update_ip_reassignment_logs(source_ip, f"[SUCCESS] Sent IP change command for {target_ip}")
+            return True
+            
+        elif request.os_type.lower() == 'linux':
+            # Linux IP reassignment with detailed logging
+            distro, interface, gateway, prefix = detect_linux_network(ssh)
+            
+            if not interface or not gateway or not prefix:
+                update_ip_reassignment_logs(source_ip, f"[ERROR] Could not detect network configuration for source IP {source_ip}")
+                return
+            
+            update_ip_reassignment_logs(source_ip, "[INFO] Detected network details:")
+            update_ip_reassignment_logs(source_ip, f"  Distro   : {distro}")
+            update_ip_reassignment_logs(source_ip, f"  Interface: {interface}")
+            update_ip_reassignment_logs(source_ip, f"  Gateway  : {gateway}")
+            update_ip_reassignment_logs(source_ip, f"  Subnet   : /{prefix}")
+            update_ip_reassignment_logs(source_ip, f"Change IP from {source_ip} → {target_ip}? (yes/no): yes")
+            
+            # Fire-and-forget commands based on distro
+            if distro in ["rhel", "centos", "oracle", "suse"]:
+                cmds = [
+                    f"nmcli con mod {interface} ipv4.addresses {target_ip}/{prefix}",
+                    f"nmcli con mod {interface} ipv4.method manual",
+                    f"nmcli con mod {interface} ipv4.gateway {gateway}",
+                    f"nmcli con up {interface}"
+                ]
+                for c in cmds:
+                    update_ip_reassignment_logs(source_ip, f"[INFO] Sending: {c}")
+                    ssh_exec(ssh, c, wait=False)
+            
+            elif distro == "ubuntu":
+                out, _ = ssh_exec(ssh, "ls /etc/netplan/*.yaml /etc/netplan/*.yml 2>/dev/null")
+                if not out:
+                    update_ip_reassignment_logs(source_ip, "[ERROR] No netplan config found.")
+                    return
+                yaml_path = out.splitlines()[0]
+                
+                content, _ = ssh_exec(ssh, f"cat {yaml_path}")
+                try:
+                    netplan_cfg = yaml.safe_load(content)
+                except yaml.YAMLError as e:
+                    update_ip_reassignment_logs(source_ip, f"[ERROR] Failed to parse netplan config: {e}")
+                    return
+                
+                # Update the network configuration
+                ethernets = netplan_cfg.setdefault("network", {}).setdefault("ethernets", {})
+                for iface_name, iface_conf in ethernets.items():
+                    if iface_name == interface:
+                        iface_conf["dhcp4"] = False
+                        iface_conf["addresses"] = [f"{target_ip}/{prefix}"]
+                        iface_conf["gateway4"] = gateway
+                        break
+                
+                # Write the updated config
+                with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.yaml') as tmp_file:
+                    yaml.safe_dump(netplan_cfg, tmp_file)
+                    local_temp_path = tmp_file.name
+                
+                try:
+                    sftp = ssh.open_sftp()
+                    remote_tmp_path = "/tmp/netplan_new.yaml"
+                    sftp.put(local_temp_path, remote_tmp_path)
+                    sftp.close()
+                    
+                    cmd = f"mv {remote_tmp_path} {yaml_path} && netplan apply"
+                    update_ip_reassignment_logs(source_ip, f"[INFO] Sending: {cmd}")
+                    ssh_exec(ssh, cmd, wait=False)
+                finally:
+                    os.unlink(local_temp_path)
+            
+            elif distro == "debian":
+                out, _ = ssh_exec(ssh, "cat /etc/network/interfaces")
+                lines = out.splitlines()
+                new_lines = []
+                
+                for line in lines:
+                    if line.strip().startswith("address"):
+                        new_lines.append(f"    address {target_ip}")
+                    elif line.strip().startswith("gateway"):
+                        new_lines.append(f"    gateway {gateway}")
+                    else:
+                        new_lines.append(line)
+                
+                # Write the updated interfaces file
+                with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.interfaces') as tmp_file:
+                    tmp_file.write("\n".join(new_lines))
+                    local_temp_path = tmp_file.name
+                
+                try:
+                    sftp = ssh.open_sftp()
+                    sftp.put(local_temp_path, "/tmp/interfaces_new")
+                    sftp.close()
+                    
+                    cmd = "mv /tmp/interfaces_new /etc/network/interfaces && ifdown -a && ifup -a"
+                    update_ip_reassignment_logs(source_ip, f"[INFO] Sending: {cmd}")
+                    ssh_exec(ssh, cmd, wait=False)
+                finally:
+                    os.unlink(local_temp_path)
+
+            else:
+                update_ip_reassignment_logs(source_ip, f"[ERROR] Unsupported Linux distribution '{distro}'; no IP change command sent.")
+                return False
+            
+            # Give time for command to fire before closing session
+            time.sleep(2)
+            update_ip_reassignment_logs(source_ip, "[INFO] Closing SSH session (host will change IP).")
+            ssh.close()
+            ssh = None
+            update_ip_reassignment_logs(source_ip, f"[SUCCESS] Sent IP change command for {target_ip}")
+            return True
+        
+        else:
+            update_ip_reassignment_logs(source_ip, f"[ERROR] Unsupported OS type: {request.os_type}")
+            
+    except paramiko.AuthenticationException:
+        update_ip_reassignment_logs(source_ip, "[ERROR] SSH authentication failed. Check username and password.")
+    except paramiko.SSHException as e:
+        update_ip_reassignment_logs(source_ip, f"[ERROR] SSH connection error: {str(e)}")
+    except Exception as e:
+        update_ip_reassignment_logs(source_ip, f"[ERROR] An unexpected error occurred: {str(e)}")
+    finally:
+        if ssh:
+            try:
+                ssh.close()
+            except Exception as e:
+                update_ip_reassignment_logs(source_ip, f"[WARNING] Error closing SSH connection: {e}")
+@router.post("/api/vms/reassign-ip")
+async def reassign_vm_ip(request: IpReassignmentRequest):
+    """Reassign IP address for a Windows or Linux VM via SSH using fire-and-forget approach with real-time logs."""
+    logging.debug(f"IP reassignment request for {request.source_ip} -> {request.target_ip} (OS: {request.os_type})")
+    
+    # Initialize empty logs for immediate response
+    reset_ip_reassignment_logs(request.source_ip)
+    
+    # Start background task; IP changes are the cutover itself and go ahead of everything else queued
+    submit_job("cutover", run_ip_reassignment_task, request, priority="critical", label=request.source_ip)
+    
+    return {
+        "status": "started",
+        "message": f"IP reassignment process initiated for {request.source_ip} -> {request.target_ip}",
+        "source_ip": request.source_ip,
+        "target_ip": request.target_ip,
+        "os_type": request.os_type,
+        "fire_and_forget": True
+    }
+
+@router.get("/api/vms/reassign-ip/logs/{source_ip}")
+async def get_ip_reassignment_logs(request: Request, source_ip: str):
+    """Get real-time logs for IP reassignment process."""
+    logs = ip_reassignment_logs.get(source_ip, [])
+    version, updated_at = get_version("ip_reassignment_logs", source_ip)
+    return cached_json(request, {
+        "source_ip": source_ip,
+        "logs": logs,
+        "log_count": len(logs)
+    }, version=version, last_modified=updated_at)
+
+
+# --- Batch IP Reassignment ---
+
+IP_VERIFY_PORTS = {"linux": [22], "windows": [22, 3389, 5985]}
+IP_VERIFY_MAX_BACKOFF_SECONDS = 15.0
+IP_BATCH_MAX_CONCURRENCY = 256
+
+async def verify_ip_convergence(target_ip, os_type, timeout):
+    """Probe target_ip with exponential backoff until it answers; returns seconds waited or None."""
+    ports = IP_VERIFY_PORTS.get(os_type.lower(), [22])
+    started = time.monotonic()
+    delay = 1.0
+    while time.monotonic() - started < timeout:
+        result = await probe_host(target_ip, "tcp", ports, timeout=2.0)
+        if result["status"] == "success":
+            return round(time.monotonic() - started, 2)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, IP_VERIFY_MAX_BACKOFF_SECONDS)
+    return None
+
+@logged_job(lambda batch_id, request: {"job_id": f"reassign-ip-batch:{batch_id}", "wave_id": batch_id})
+async def run_ip_reassignment_batch(batch_id, request: BatchIpReassignmentRequest):
+    batch = ip_reassignment_batches[batch_id]
+    loop = asyncio.get_running_loop()
+    # Own threads, so the SSH work runs `concurrency` wide rather than as wide as the default executor
+    executor = ThreadPoolExecutor(max_workers=request.concurrency, thread_name_prefix="reassign-ip")
+    semaphore = asyncio.Semaphore(request.concurrency)
+
+    async def reassign(vm: IpReassignmentRequest):
+        result = batch["vms"][vm.source_ip]
+        async with semaphore:
+            result["status"] = "running"
+            sent = await loop.run_in_executor(executor, run_ip_reassignment_task, vm)
+        if not sent:
+            result["status"] = "failed"
+            return
+        result["commandSentAt"] = datetime.datetime.now().isoformat()
+        if not request.verify:
+            result["status"] = "sent"
+            return
+        # Verification only waits on the network, so it runs outside the SSH concurrency limit
+        result["status"] = "verifying"
+        convergence = await verify_ip_convergence(vm.target_ip, vm.os_type, request.verify_timeout)
+        if convergence is None:
+            result["status"] = "unreachable"
+            update_ip_reassignment_logs(vm.source_ip, f"[ERROR] {vm.target_ip} did not respond within {int(request.verify_timeout)}s.")
+        else:
+            result.update(status="converged", convergenceSeconds=convergence)
+            update_ip_reassignment_logs(vm.source_ip, f"[SUCCESS] {vm.target_ip} is reachable after {convergence}s.")
+
+    try:
+        await asyncio.gather(*(reassign(vm) for vm in request.vms))
+    finally:
+        executor.shutdown(wait=False)
+    batch["status"] = "completed"
+
+@router.post("/api/vms/reassign-ip/batch")
+async def reassign_vm_ips_batch(request: BatchIpReassignmentRequest):
+    """Reassign IPs for many VMs concurrently and verify each comes back on its target address."""
+    if not 1 <= request.concurrency <= IP_BATCH_MAX_CONCURRENCY:
+        raise HTTPException(status_code=400, detail=f"concurrency must be between 1 and {IP_BATCH_MAX_CONCURRENCY}.")
+    # Results and logs are kept per source IP, and two changes for one host would conflict anyway
+    source_counts = collections.Counter(vm.source_ip for vm in request.vms)
+    duplicates = sorted(ip for ip, count in source_counts.items() if count > 1)
+    if duplicates:
+        raise HTTPException(status_code=400, detail=f"Duplicate source IPs: {', '.join(duplicates)}.")
+    batch_id = uuid.uuid4().hex
+    ip_reassignment_batches[batch_id] = {
+        "status": "running",
+        "vms": {vm.source_ip: {"targetIp": vm.target_ip, "status": "queued"} for vm in request.vms},
+    }
+    for vm in request.vms:
+        reset_ip_reassignment_logs(vm.source_ip)
+    submit_job("cutover", run_ip_reassignment_batch, batch_id, request, priority="critical", label=batch_id)
+    return {"status": "started", "batchId": batch_id, "message": f"IP reassignment initiated for {len(request.vms)} VMs."}
+
+@router.get("/api/vms/reassign-ip/batch/{batch_id}")
+async def get_ip_reassignment_batch(request: Request, batch_id: str):
+    batch = ip_reassignment_batches.get(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="IP reassignment batch not found.")
+    return cached_json(request, batch)
@@ -0,0 +1,233 @@
+"""Morpheus agent installation on converted VMs, single and bulk."""
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import APIRouter, HTTPException, Request
+
+from http_cache import cached_json
+from jobs import submit_job
+from lazy_imports import requests
+from log_pipeline import logged_job
+from models import BulkAgentVm, BulkInstallAgentRequest, InstallAgentRequest
+
+router = APIRouter()
+
+MORPHEUS_PAGE_SIZE = 200
+MORPHEUS_INDEX_TTL_SECONDS = 300
+MORPHEUS_REQUESTS_PER_SECOND = 5
+MORPHEUS_BULK_MAX_CONCURRENCY = 32  # the session's connection pool size; more only wait on the rate limit
+MORPHEUS_MIN_POLL_INTERVAL_SECONDS = 5  # every poll is a full server listing
+MORPHEUS_MAX_POLL_TIMEOUT_SECONDS = 4 * 3600
+
+class MorpheusClient:
+    """Pooled Morpheus API session with a cached name -> server id index and a request rate limit."""
+
+    def __init__(self, vme_host, api_key, requests_per_second=MORPHEUS_REQUESTS_PER_SECOND):
+        self.base_url = f"https://{vme_host}/api"
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Accept": "application/json",
+            "Content-Type": "application/json"
+        })
+        self.session.verify = False
+        import urllib3
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32)
+        self.session.mount("https://", adapter)
+        self._min_interval = 1.0 / requests_per_second
+        self._next_request_at = 0.0
+        self._rate_lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._refresh_lock = threading.RLock()  # one full listing at a time
+        self._lookup_locks = {}  # name -> lock, one targeted lookup per name at a time
+        self._server_index = {}
+        self._servers = {}
+        self._index_loaded_at = 0.0
+
+    def _request(self, method, path, **kwargs):
+        with self._rate_lock:
+            wait = self._next_request_at - time.monotonic()
+            self._next_request_at = max(self._next_request_at, time.monotonic()) + self._min_interval
+        if wait > 0:
+            time.sleep(wait)
+        return self.session.request(method, f"{self.base_url}{path}", timeout=60, **kwargs)
+
+    def list_servers(self):
+        """Fetch every server page by page."""
+        servers = []
+        offset = 0
+        while True:
+            response = self._request("GET", "/servers", params={"max": MORPHEUS_PAGE_SIZE, "offset": offset})
+            if response.status_code != 200:
+                raise HTTPException(status_code=response.status_code, detail=f"Failed to fetch servers from Morpheus: {response.text}")
+            page = response.json().get("servers", [])
+            servers.extend(page)
+            if len(page) < MORPHEUS_PAGE_SIZE:
+                return servers
+            offset += MORPHEUS_PAGE_SIZE
+
+    def refresh_index(self):
+        """Reload the index from a full server listing."""
+        with self._refresh_lock:
+            servers = self.list_servers()
+            with self._index_lock:
+                self._servers = {s["id"]: s for s in servers}
+                self._server_index = {s["name"]: s["id"] for s in servers}
+                self._index_loaded_at = time.monotonic()
+                self._lookup_locks = {}
+                return self._servers
+
+    def _index_fresh(self):
+        return time.monotonic() - self._index_loaded_at < MORPHEUS_INDEX_TTL_SECONDS
+
+    def _lookup_server(self, name):
+        """Ask Morpheus for one server by name and add it to the index; returns its id or None."""
+        response = self._request("GET", "/servers", params={"name": name, "max": MORPHEUS_PAGE_SIZE})
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=f"Failed to fetch servers from Morpheus: {response.text}")
+        server = next((s for s in response.json().get("servers", []) if s.get("name") == name), None)
+        if server is None:
+            return None
+        with self._index_lock:
+            self._servers[server["id"]] = server
+            self._server_index[name] = server["id"]
+        return server["id"]
+
+    def find_server_id(self, name):
+        """Look a server up in the cached index, reloading it only once it is older than the TTL.
+
+        Concurrent lookups on a stale index share one listing. A name missing from a fresh
+        index (a VM that appeared in Morpheus since it was loaded) is looked up on its own,
+        once for all concurrent callers, rather than by listing every server again.
+        """
+        if not self._index_fresh():
+            with self._refresh_lock:
+                if not self._index_fresh():
+                    self.refresh_index()
+        with self._index_lock:
+            server_id = self._server_index.get(name)
+            if server_id is not None:
+                return server_id
+            lookup_lock = self._lookup_locks.setdefault(name, threading.Lock())
+        with lookup_lock:
+            with self._index_lock:
+                server_id = self._server_index.get(name)
+            return server_id if server_id is not None else self._lookup_server(name)
+
+    def make_managed(self, server_id, username, password):
+        payload = {
+            "server": {
+                "sshUsername": username,
+                "sshPassword": password
+            },
+            "installAgent": True
+        }
+        return self._request("PUT", f"/servers/{server_id}/make-managed", json=payload)
+
+morpheus_clients = {}
+morpheus_clients_lock = threading.Lock()
+morpheus_agent_jobs = {}
+
+def get_morpheus_client(vme_host, api_key):
+    with morpheus_clients_lock:
+        client = morpheus_clients.get((vme_host, api_key))
+        if client is None:
+            client = morpheus_clients[(vme_host, api_key)] = MorpheusClient(vme_host, api_key)
+        return client
+
+@router.post("/api/vms/install-morpheus-agent")
+async def install_morpheus_agent(req: InstallAgentRequest):
+    client = get_morpheus_client(req.vme_host, req.api_key)
+
+    # Step 1: Find the server/VM in Morpheus
+    try:
+        vm_id = await asyncio.to_thread(client.find_server_id, req.vm_name)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error communicating with Morpheus: {str(e)}")
+    if vm_id is None:
+        raise HTTPException(status_code=404, detail=f"VM '{req.vm_name}' not found in Morpheus.")
+
+    # Step 2: Trigger agent installation
+    try:
+        response = await asyncio.to_thread(client.make_managed, vm_id, req.vm_username, req.vm_password)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error triggering agent installation: {str(e)}")
+    if response.status_code == 200:
+        return {"status": "success", "message": "Morpheus agent installation triggered successfully."}
+    raise HTTPException(status_code=response.status_code, detail=f"Failed to install agent: {response.text}")
+
+@logged_job(lambda client, job_id, vm: {"job_id": f"morpheus-agent:{job_id}", "vm": vm.vm_name, "wave_id": job_id})
+def _trigger_agent_install(client, job_id, vm: BulkAgentVm):
+    result = morpheus_agent_jobs[job_id]["vms"][vm.vm_name]
+    try:
+        server_id = client.find_server_id(vm.vm_name)
+        if server_id is None:
+            result.update(status="not_found", message=f"VM '{vm.vm_name}' not found in Morpheus.")
+            return
+        result["serverId"] = server_id
+        response = client.make_managed(server_id, vm.vm_username, vm.vm_password)
+        if response.status_code == 200:
+            result.update(status="triggered", message="Agent installation triggered.")
+        else:
+            result.update(status="failed", message=f"Failed to install agent: {response.text}")
+    except Exception as e:
+        result.update(status="failed", message=str(e))
+
+@logged_job(lambda job_id, req: {"job_id": f"morpheus-agent:{job_id}", "wave_id": job_id})
+def run_bulk_agent_install(job_id, req: BulkInstallAgentRequest):
+    """Trigger make-managed for a whole wave concurrently, then poll agent state for all VMs per server listing."""
+    job = morpheus_agent_jobs[job_id]
+    client = get_morpheus_client(req.vme_host, req.api_key)
+    try:
+        # Load the index once up front, so the workers below all look up in it instead of each listing the servers
+        client.refresh_index()
+        with ThreadPoolExecutor(max_workers=req.concurrency) as executor:
+            list(executor.map(lambda vm: _trigger_agent_install(client, job_id, vm), req.vms))
+
+        waiting = {r["serverId"]: name for name, r in job["vms"].items() if r["status"] == "triggered"}
+        deadline = time.monotonic() + req.poll_timeout
+        while waiting and time.monotonic() < deadline:
+            time.sleep(req.poll_interval)
+            # One paginated listing covers every VM in the wave instead of a request per VM
+            servers = client.refresh_index()
+            for server_id, name in list(waiting.items()):
+                server = servers.get(server_id, {})
+                job["vms"][name]["agentInstalled"] = bool(server.get("agentInstalled"))
+                if server.get("agentInstalled"):
+                    job["vms"][name].update(status="installed", message="Morpheus agent is installed.")
+                    del waiting[server_id]
+        for name in waiting.values():
+            job["vms"][name].update(status="timeout", message="Agent did not report as installed before the poll timeout.")
+        job["status"] = "completed"
+    except Exception as e:
+        job.update(status="error", message=str(e))
+
+@router.post("/api/vms/install-morpheus-agent/bulk")
+async def install_morpheus_agent_bulk(req: BulkInstallAgentRequest):
+    if not 1 <= req.concurrency <= MORPHEUS_BULK_MAX_CONCURRENCY:
+        raise HTTPException(status_code=400, detail=f"concurrency must be between 1 and {MORPHEUS_BULK_MAX_CONCURRENCY}.")
+    if not 0 < req.poll_timeout <= MORPHEUS_MAX_POLL_TIMEOUT_SECONDS:
+        raise HTTPException(status_code=400, detail=f"poll_timeout must be between 0 and {MORPHEUS_MAX_POLL_TIMEOUT_SECONDS} seconds.")
+    if not MORPHEUS_MIN_POLL_INTERVAL_SECONDS <= req.poll_interval <= req.poll_timeout:
+        raise HTTPException(status_code=400, detail=f"poll_interval must be between {MORPHEUS_MIN_POLL_INTERVAL_SECONDS} "
+                                                    "seconds and poll_timeout.")
+    job_id = uuid.uuid4().hex
+    morpheus_agent_jobs[job_id] = {
+        "status": "running",
+        "vms": {vm.vm_name: {"status": "pending", "message": ""} for vm in req.vms},
+    }
+    submit_job("agent", run_bulk_agent_install, job_id, req, label=job_id)
+    return {"status": "started", "jobId": job_id, "message": f"Agent installation initiated for {len(req.vms)} VMs."}
+
+@router.get("/api/vms/install-morpheus-agent/bulk/{job_id}")
+async def get_bulk_agent_install_status(request: Request, job_id: str):
+    job = morpheus_agent_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Agent installation job not found.")
+    return cached_json(request, job)
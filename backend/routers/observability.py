@@ -0,0 +1,83 @@
+"""Prometheus scrape endpoint plus trace and profile inspection."""
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import PlainTextResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from admission import admission_snapshot
+from jobs import get_job, list_jobs, pool_snapshot
+from log_pipeline import get_job_logs, list_job_logs
+from models import ProfilingRequest
+from observability import armed_profiles, profiles, traces, traces_lock
+
+router = APIRouter()
+
+@router.get("/metrics")
+def metrics():
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@router.get("/api/traces")
+async def list_traces(name_prefix: str = "", limit: int = 100):
+    with traces_lock:
+        recent = [t for t in reversed(traces.values()) if t["name"].startswith(name_prefix) or t["traceId"].startswith(name_prefix)]
+    return [
+        {"traceId": t["traceId"], "name": t["name"], "startedAt": t["startedAt"],
+         "durationMs": t["durationMs"], "spanCount": len(t["spans"])}
+        for t in recent[:limit]
+    ]
+
+@router.get("/api/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    trace = traces.get(trace_id)
+    if not trace:
+        raise HTTPException(status_code=404, detail="Trace not found.")
+    spans = sorted(trace["spans"] + ([trace["_open_phase"]] if "_open_phase" in trace else []), key=lambda span: span["startMs"])
+    return {**{k: v for k, v in trace.items() if not k.startswith("_")}, "spans": spans}
+
+@router.get("/api/profiles/{trace_id}")
+async def get_profile(trace_id: str):
+    """Collapsed stacks ('frame;frame;frame count'), loadable by flamegraph.pl or speedscope."""
+    profile = profiles.get(trace_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return PlainTextResponse(profile)
+
+@router.post("/api/admin/profiling")
+async def arm_profiling(request: ProfilingRequest):
+    """Profile the next `count` requests whose path starts with `route_prefix`."""
+    with traces_lock:
+        armed_profiles[request.route_prefix] = request.count
+    return {"status": "armed", "routePrefix": request.route_prefix, "count": request.count}
+
+@router.get("/api/logs/jobs")
+async def list_job_log_streams():
+    return list_job_logs()
+
+@router.get("/api/logs/jobs/{job_id:path}")
+async def get_job_log_stream(job_id: str, since: int = 0, limit: int = 500):
+    """Structured records routed to a job (e.g. 'virt-v2v:<clone>'); poll with since=<previous next>."""
+    logs = get_job_logs(job_id, since, limit)
+    if logs is None:
+        raise HTTPException(status_code=404, detail="No log records for this job.")
+    return logs
+
+@router.get("/api/admission")
+async def get_admission_state(active_only: bool = False):
+    """Per vCenter / ESXi host / datastore gate: limits, admitted and queued operations."""
+    gates = admission_snapshot()
+    if active_only:
+        gates = [g for g in gates if g["active"] or g["queued"]]
+    return {"queued": sum(g["queued"] for g in gates), "active": sum(g["active"] for g in gates), "gates": gates}
+
+@router.get("/api/jobs")
+async def get_jobs(state: Optional[str] = None, job_class: Optional[str] = None, limit: int = 200):
+    """Running and queued background jobs (queued in the order they will start), then recently finished ones."""
+    return {"pools": pool_snapshot(), "jobs": list_jobs(state, job_class)[:limit]}
+
+@router.get("/api/jobs/{job_id}")
+async def get_job_state(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
@@ -0,0 +1,138 @@
+"""Wave planning: duration estimates from the measured phase history."""
+import heapq
+import statistics
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+
+from models import DurationEstimateRequest
+from phase_history import PHASES, get_samples
+from routers.inventory import shared_vm_rows
+
+router = APIRouter()
+
+# Phases whose duration scales with the VM's size, and the history scope each is measured per
+THROUGHPUT_PHASES = {"clone": "vcenter", "v2v": "kvm_host", "sync": "target"}
+# Phases whose duration does not depend on size (guest boots and shutdowns)
+DURATION_PHASES = {"prepare": "vcenter"}
+DEFAULT_THROUGHPUT_BYTES_PER_SECOND = {"clone": 150 * 1024 ** 2, "v2v": 60 * 1024 ** 2, "sync": 40 * 1024 ** 2}
+DEFAULT_PHASE_SECONDS = {"prepare": 600}
+ESTIMATE_SAMPLE_LIMIT = 50  # most recent samples used per model
+MIN_SAMPLES = 3
+# Incremental syncs and tiny VMs are dominated by fixed overhead and would understate throughput
+MIN_THROUGHPUT_SAMPLE_BYTES = 256 * 1024 ** 2
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))]
+
+def _usable(phase, sample):
+    if phase in THROUGHPUT_PHASES:
+        return (sample.get("bytes") or 0) >= MIN_THROUGHPUT_SAMPLE_BYTES and sample["seconds"] > 0
+    return sample["seconds"] > 0
+
+def _history_for(phase, scope_value, concurrency):
+    """Most specific usable samples: same scope, then any scope; similar concurrency preferred within each."""
+    scope_key = THROUGHPUT_PHASES.get(phase) or DURATION_PHASES.get(phase)
+    candidates = []
+    if scope_value:
+        candidates.append(("scope", [s for s in get_samples(phase, **{scope_key: scope_value}) if _usable(phase, s)]))
+    candidates.append(("phase", [s for s in get_samples(phase) if _usable(phase, s)]))
+    for basis, samples in candidates:
+        if len(samples) < MIN_SAMPLES and not (basis == "phase" and samples):
+            continue
+        similar = [s for s in samples if s.get("concurrency") and concurrency / 2 <= s["concurrency"] <= concurrency * 2]
+        if len(similar) >= MIN_SAMPLES:
+            return basis, similar[-ESTIMATE_SAMPLE_LIMIT:]
+        return basis, samples[-ESTIMATE_SAMPLE_LIMIT:]
+    return "default", []
+
+def phase_model(phase, scope_value, concurrency):
+    """How long `phase` takes: a throughput (bytes/s) or a fixed duration, expected and pessimistic."""
+    basis, samples = _history_for(phase, scope_value, concurrency)
+    model = {"basis": basis, "samples": len(samples)}
+    if phase in THROUGHPUT_PHASES:
+        rates = [s["bytes"] / s["seconds"] for s in samples] or [DEFAULT_THROUGHPUT_BYTES_PER_SECOND[phase]]
+        model.update(bytesPerSecond=round(statistics.median(rates)), slowBytesPerSecond=round(_percentile(rates, 10)))
+    else:
+        durations = [s["seconds"] for s in samples] or [DEFAULT_PHASE_SECONDS[phase]]
+        model.update(seconds=statistics.median(durations), slowSeconds=_percentile(durations, 90))
+    return model
+
+def _phase_seconds(model, size_bytes, slow=False):
+    if "bytesPerSecond" in model:
+        return size_bytes / model["slowBytesPerSecond" if slow else "bytesPerSecond"]
+    return model["slowSeconds" if slow else "seconds"]
+
+def _makespan(durations, concurrency):
+    """Wave length when VMs are started longest-first on `concurrency` parallel slots."""
+    slots = [0.0] * min(concurrency, len(durations))
+    heapq.heapify(slots)
+    for duration in sorted(durations, reverse=True):
+        heapq.heappush(slots, heapq.heappop(slots) + duration)
+    return max(slots, default=0.0)
+
+@router.post("/api/plan/estimate")
+async def estimate_wave_duration(request: DurationEstimateRequest):
+    """Predict per-VM and whole-wave durations from committed storage and the recorded phase throughput.
+
+    Clone and virt-v2v throughput are taken from earlier runs against the same vCenter and
+    KVM host when there are enough of them, otherwise from all runs, otherwise from defaults;
+    "models" shows which basis each phase used. "p90Seconds" uses the slow end of the history.
+    """
+    unknown_phases = [p for p in request.phases if p not in PHASES]
+    if unknown_phases or not request.phases:
+        raise HTTPException(status_code=400, detail=f"phases must be a non-empty subset of {', '.join(PHASES)}.")
+    if not 1 <= request.concurrency <= 500:
+        raise HTTPException(status_code=400, detail="concurrency must be between 1 and 500.")
+    if not request.vms:
+        raise HTTPException(status_code=400, detail="At least one VM is required.")
+
+    # Throughput is recorded on allocated bytes, so committed storage is the matching size; storageUsage
+    # also counts thin-provisioned space never written and is only the fallback
+    sizes = {vm.name: vm.storageCommitted for vm in request.vms}
+    if request.host and any(size is None for size in sizes.values()):
+        rows = await shared_vm_rows(request.host, {"id", "name", "storageCommitted"})
+        inventory = {row["name"]: row["storageCommitted"] for row in rows}
+        sizes = {name: inventory.get(name) if size is None else size for name, size in sizes.items()}
+    fallback = {vm.name: vm.storageUsage for vm in request.vms}
+    sizes = {name: fallback[name] if size is None else size for name, size in sizes.items()}
+    missing = [name for name, size in sizes.items() if size is None]
+    if missing and any(p in THROUGHPUT_PHASES for p in request.phases):
+        raise HTTPException(status_code=400, detail=f"No storageCommitted or storageUsage for: {', '.join(missing)}. "
+                                                    "Pass it per VM or give the source host.")
+
+    vcenter = request.host.ipAddress if request.host else request.vcenter
+    scopes = {"vcenter": vcenter, "kvm_host": request.kvmHost, "target": None}
+    models = {phase: phase_model(phase, scopes[THROUGHPUT_PHASES.get(phase) or DURATION_PHASES[phase]], request.concurrency)
+              for phase in request.phases}
+
+    vms = []
+    for name, size in sizes.items():
+        size_bytes = (size or 0) * 1024 ** 3
+        phases = {phase: round(_phase_seconds(model, size_bytes)) for phase, model in models.items()}
+        vms.append({
+            "name": name,
+            "sizeGb": size,  # committed storage, or storageUsage when that was all there was
+            "phases": phases,
+            "totalSeconds": sum(phases.values()),
+            "p90Seconds": round(sum(_phase_seconds(model, size_bytes, slow=True) for model in models.values())),
+        })
+    return {
+        "concurrency": request.concurrency,
+        "vms": vms,
+        "wave": {
+            "seconds": round(_makespan([vm["totalSeconds"] for vm in vms], request.concurrency)),
+            "p90Seconds": round(_makespan([vm["p90Seconds"] for vm in vms], request.concurrency)),
+            "serialSeconds": sum(vm["totalSeconds"] for vm in vms),
+        },
+        "models": models,
+    }
+
+@router.get("/api/plan/history")
+async def get_phase_history(phase: str, vcenter: Optional[str] = None, kvm_host: Optional[str] = None, limit: int = 100):
+    """Recorded runs of a phase, newest first, including failed ones."""
+    if phase not in PHASES:
+        raise HTTPException(status_code=400, detail=f"phase must be one of {', '.join(PHASES)}.")
+    samples = get_samples(phase, successful_only=False, vcenter=vcenter, kvm_host=kvm_host)
+    return list(reversed(samples))[:limit]
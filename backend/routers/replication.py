@@ -0,0 +1,684 @@
+"""Live sync between source VMs and their converted targets: lsyncd on Linux, robocopy on Windows."""
+import asyncio
+import base64
+import collections
+import datetime
+import os
+import platform
+import re
+import shlex
+import subprocess
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+from fastapi import APIRouter, HTTPException, Request
+
+from admission import admit
+from http_cache import cached_json
+from jobs import submit_job
+from lazy_imports import paramiko
+from log_pipeline import logged_job
+from models import CheckVmsRequest, LiveSyncRequest, LiveSyncWaveRequest, WindowsLiveSyncRequest
+from observability import ssh_command_timer, timed_ssh_connect
+from phase_history import PhaseRun
+from robocopy import ROBOCOPY_MAX_THREADS, WINDOWS_DRIVE_DETECT_CMD, build_robocopy_command, parse_robocopy_summaries
+from singleflight import SingleFlight
+from ssh_utils import drain_channels, execute_ssh_command, get_ssh_client
+from state import live_sync_logs, live_sync_metrics, live_sync_waves, windows_sync_runs
+from vcenter import disconnect, find_vm_by_name, get_vcenter_connection
+
+router = APIRouter()
+
+# --- Live Sync Logic ---
+
+LSYNCD_EXCLUDE_LIST = "/proc/\n/sys/\n/tmp/\n/run/\n/mnt/\n/media/\n/lost+found/\n/dev/\n/var/lock/\n/var/run/\n/var/tmp/\n/root/.ssh/\n/var/log/lsyncd/\n/etc/lsyncd.conf\n/etc/lsyncd.exclude\n/usr/bin/lsyncd\n/etc/systemd/system/lsyncd*\n/lib/systemd/system/lsyncd*"
+
+def build_lsyncd_config(target_ip):
+    return f"""
+settings {{
+   logfile = "/var/log/lsyncd/lsyncd.log",
+   statusFile = "/var/log/lsyncd/lsyncd.status",
+   nodaemon = true,
+   insist = true,
+   inotifyMode = "CloseWrite",
+   maxProcesses = 1,
+}}
+sync {{
+   default.rsyncssh,
+   source = "/",
+   host = "{target_ip}",
+   targetdir = "/",
+   delay = 0,
+   rsync = {{
+      archive = true,
+      compress = true,
+      verbose = true,
+      rsh = "/usr/bin/ssh -o StrictHostKeyChecking=no",
+      _extra = {{
+         "--delete", "--exclude-from=/etc/lsyncd.exclude"
+      }},
+   }}
+}}
+"""
+
+# Every step of the live sync bootstrap for one side, run as a single command per stage. The sudo
+# password arrives as the first line of stdin; each step reports "VME-RESULT<TAB>step<TAB>status<TAB>detail".
+LIVE_SYNC_BOOTSTRAP_SCRIPT = r"""
+stage="$1"
+IFS= read -r PASS || true
+as_root() { if [ "$(id -u)" -eq 0 ]; then "$@"; else printf '%s\n' "$PASS" | sudo -S -p '' "$@"; fi; }
+check() {
+    step="$1"; shift
+    if out=$("$@" 2>&1); then status=ok; else status=failed; fi
+    printf 'VME-RESULT\t%s\t%s\t%s\n' "$step" "$status" "$(printf '%s' "$out" | tr '\t\n' '  ')"
+    [ "$status" = ok ]
+}
+case "$stage" in
+source-prepare)
+    check sshd as_root systemctl is-active sshd
+    check lsyncd command -v lsyncd
+    [ -f ~/.ssh/id_rsa ] || check keygen sh -c 'mkdir -p ~/.ssh && chmod 700 ~/.ssh && ssh-keygen -t rsa -b 2048 -N "" -f ~/.ssh/id_rsa -q'
+    check public_key cat ~/.ssh/id_rsa.pub
+    ;;
+target-prepare)
+    check sshd as_root systemctl is-active sshd
+    check rsync command -v rsync
+    check authorized_key sh -c 'mkdir -p ~/.ssh && chmod 700 ~/.ssh &&
+        { grep -qxF "$1" ~/.ssh/authorized_keys 2>/dev/null || printf "%s\n" "$1" >> ~/.ssh/authorized_keys; } &&
+        chmod 600 ~/.ssh/authorized_keys' _ "$(printf '%s' "$2" | base64 -d)"
+    ;;
+source-start)
+    check passwordless_ssh ssh -o BatchMode=yes -o StrictHostKeyChecking=no "$2" "echo ok" || exit 1
+    check config as_root sh -c 'printf "%s" "$1" | base64 -d > /etc/lsyncd.conf' _ "$3"
+    check exclude_list as_root sh -c 'printf "%s" "$1" | base64 -d > /etc/lsyncd.exclude' _ "$4"
+    check start as_root systemctl start lsyncd
+    ;;
+stop)
+    check stop as_root systemctl stop lsyncd
+    ;;
+esac
+"""
+LIVE_SYNC_RESULT_PREFIX = "VME-RESULT\t"
+
+def _b64(text):
+    return base64.b64encode(text.encode('utf-8')).decode('utf-8')
+
+def run_bootstrap_stage(client, host, password, stage, args, log_buffer):
+    """Upload the bootstrap script, run one stage of it in this session and return its results by step."""
+    arguments = " ".join(shlex.quote(arg) for arg in (stage, *args))
+    command = (f"f=$(mktemp /tmp/vme-live-sync.XXXXXX) && echo {_b64(LIVE_SYNC_BOOTSTRAP_SCRIPT)} | base64 -d > $f && "
+               f"sh $f {arguments}; rc=$?; rm -f $f; exit $rc")
+    with ssh_command_timer(host):
+        stdin, stdout, stderr = client.exec_command(command)
+        stdin.write(password + '\n')
+        stdin.flush()
+        stdin.channel.shutdown_write()
+        output = stdout.read().decode('utf-8', errors='ignore')
+        error = stderr.read().decode('utf-8', errors='ignore').strip()
+    results = {}
+    for line in output.splitlines():
+        if line.startswith(LIVE_SYNC_RESULT_PREFIX):
+            step, status, detail = (line[len(LIVE_SYNC_RESULT_PREFIX):].split("\t", 2) + ["", ""])[:3]
+            results[step] = {"status": status, "detail": detail.strip()}
+            log_buffer.write(f"[{host}] {step}: {status}{f' - {detail.strip()}' if detail.strip() else ''}\n")
+    if error:
+        log_buffer.write(f"Error from {host}: {error}\n")
+    return results
+
+def bootstrap_live_sync(req: LiveSyncRequest, log_buffer):
+    """Check both sides, exchange the SSH key, write the lsyncd config and start it: one session per side."""
+    source = get_ssh_client(req.source_ip, req.username, req.password)
+    target = None
+    try:
+        log_buffer.write("Checking source and preparing its SSH key...\n")
+        source_results = run_bootstrap_stage(source, req.source_ip, req.password, "source-prepare", [], log_buffer)
+        public_key = source_results.get("public_key", {})
+        if public_key.get("status") != "ok" or not public_key["detail"]:
+            raise Exception("Failed to retrieve public key from source.")
+
+        log_buffer.write("Checking target and authorizing the source key...\n")
+        target = get_ssh_client(req.target_ip, req.username, req.password)
+        target_results = run_bootstrap_stage(target, req.target_ip, req.password, "target-prepare",
+                                             [_b64(public_key["detail"])], log_buffer)
+
+        log_buffer.write("Testing passwordless SSH, writing the lsyncd configuration and starting lsyncd...\n")
+        start_results = run_bootstrap_stage(source, req.source_ip, req.password, "source-start",
+                                            [f"{req.username}@{req.target_ip}", _b64(build_lsyncd_config(req.target_ip)),
+                                             _b64(LSYNCD_EXCLUDE_LIST)], log_buffer)
+        ssh_test = start_results.get("passwordless_ssh", {})
+        if ssh_test.get("status") != "ok" or "ok" not in ssh_test.get("detail", ""):
+            raise Exception(f"Failed to setup passwordless SSH: {ssh_test.get('detail') or 'no result'}")
+        if start_results.get("start", {}).get("status") != "ok":
+            raise Exception(f"Failed to start lsyncd: {start_results.get('start', {}).get('detail') or 'no result'}")
+        return {"source": {**source_results, **start_results}, "target": target_results}
+    finally:
+        source.close()
+        if target is not None:
+            target.close()
+
+# --- Live Sync Metrics ---
+
+LSYNCD_STATUS_MARKER = "---LSYNCD-STATUS---"
+LSYNCD_LOG_MARKER = "---LSYNCD-LOG---"
+LSYNCD_JOURNAL_MARKER = "---LSYNCD-JOURNAL---"
+LSYNCD_RATE_WINDOW_MINUTES = 5
+
+def _parse_lsyncd_timestamp(line):
+    """Parse the 'Thu Sep  4 22:21:50 2025' prefix lsyncd puts on every log line."""
+    match = re.match(r"^(\w{3}\s+\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}\s+\d{4})\s", line)
+    if not match:
+        return None
+    try:
+        return datetime.datetime.strptime(" ".join(match.group(1).split()), "%a %b %d %H:%M:%S %Y")
+    except ValueError:
+        return None
+
+def _parse_lsyncd_status(text):
+    """Extract delay counts and watch totals from /var/log/lsyncd/lsyncd.status."""
+    status = {
+        "reportTime": None,
+        "queuedEvents": 0,
+        "delaysInFlight": 0,
+        "blockedEvents": 0,
+        "totalDelays": 0,
+        "watchedDirectories": None,
+    }
+    for line in text.splitlines():
+        stripped = line.strip()
+        match = re.match(r"Lsyncd status report at (.+)$", stripped)
+        if match:
+            try:
+                status["reportTime"] = datetime.datetime.strptime(" ".join(match.group(1).split()), "%a %b %d %H:%M:%S %Y")
+            except ValueError:
+                pass
+            continue
+        match = re.match(r"There are (\d+) delays", stripped)
+        if match:
+            status["totalDelays"] += int(match.group(1))
+            continue
+        match = re.match(r"Inotify watching (\d+) directories", stripped)
+        if match:
+            status["watchedDirectories"] = int(match.group(1))
+            continue
+        # Individual delays are listed as "<status> <event> <path>"
+        match = re.match(r"^(active|wait|block)\s+\w+\s+\S", stripped)
+        if match:
+            if match.group(1) == "active":
+                status["delaysInFlight"] += 1
+            elif match.group(1) == "wait":
+                status["queuedEvents"] += 1
+            else:
+                status["blockedEvents"] += 1
+    return status
+
+def _parse_lsyncd_log(log_text, journal_text, now):
+    """Derive rsync rate, bytes moved and last successful sync from the lsyncd log and rsync output.
+
+    `journal_text` holds only the last LSYNCD_RATE_WINDOW_MINUTES of the unit's journal, where rsync's
+    transfer summaries land, so the byte counts cover the same window as the rate.
+    """
+    window_start = now - datetime.timedelta(minutes=LSYNCD_RATE_WINDOW_MINUTES)
+    rsync_runs_in_window = 0
+    last_success = None
+    last_error = None
+    for line in log_text.splitlines():
+        timestamp = _parse_lsyncd_timestamp(line)
+        if timestamp is None:
+            continue
+        if "Calling rsync" in line or "recursive startup rsync" in line:
+            if timestamp >= window_start:
+                rsync_runs_in_window += 1
+        elif re.search(r"Finished .*(exitcode: 0|= 0)\s*$", line) or re.search(r"Startup of .* finished", line):
+            last_success = timestamp
+        elif "Error:" in line:
+            last_error = line.strip()
+
+    bytes_sent = 0
+    bytes_received = 0
+    for line in journal_text.splitlines():
+        match = re.search(r"sent ([\d,]+) bytes\s+received ([\d,]+) bytes", line)
+        if match:
+            bytes_sent += int(match.group(1).replace(",", ""))
+            bytes_received += int(match.group(2).replace(",", ""))
+
+    return {
+        "rsyncRunsPerMinute": round(rsync_runs_in_window / LSYNCD_RATE_WINDOW_MINUTES, 2),
+        "rateWindowMinutes": LSYNCD_RATE_WINDOW_MINUTES,
+        "bytesTransferred": bytes_sent,  # within the rate window
+        "bytesReceived": bytes_received,
+        "lastSuccessfulSync": last_success.isoformat() if last_success else None,
+        "secondsSinceLastSync": int((now - last_success).total_seconds()) if last_success else None,
+        "lastError": last_error,
+    }
+
+def collect_live_sync_metrics(req: LiveSyncRequest):
+    """Read the lsyncd status file, log and journal from the source in one SSH call and summarise them."""
+    log_buffer = StringIO()
+    command = (
+        f"sudo sh -c 'date \"+%a %b %d %H:%M:%S %Y\"; "
+        f"echo {LSYNCD_STATUS_MARKER}; cat /var/log/lsyncd/lsyncd.status 2>/dev/null; "
+        f"echo {LSYNCD_LOG_MARKER}; tail -n 2000 /var/log/lsyncd/lsyncd.log 2>/dev/null; "
+        f"echo {LSYNCD_JOURNAL_MARKER}; journalctl -u lsyncd --since \"{LSYNCD_RATE_WINDOW_MINUTES} min ago\" --no-pager -o cat 2>/dev/null'"
+    )
+    output, error = execute_ssh_command(req.source_ip, req.username, req.password, command, log_buffer)
+    log_buffer.close()
+    if LSYNCD_STATUS_MARKER not in output:
+        raise HTTPException(status_code=502, detail=f"Could not read lsyncd status from {req.source_ip}: {error or 'no output'}")
+
+    header, _, rest = output.partition(LSYNCD_STATUS_MARKER)
+    status_text, _, rest = rest.partition(LSYNCD_LOG_MARKER)
+    log_text, _, journal_text = rest.partition(LSYNCD_JOURNAL_MARKER)
+
+    now = None
+    for line in reversed(header.splitlines()):
+        try:
+            now = datetime.datetime.strptime(" ".join(line.split()), "%a %b %d %H:%M:%S %Y")
+            break
+        except ValueError:
+            continue
+    if now is None:
+        now = datetime.datetime.now()
+
+    status = _parse_lsyncd_status(status_text)
+    report_time = status.pop("reportTime")
+    metrics = {
+        "sourceIp": req.source_ip,
+        "targetIp": req.target_ip,
+        "collectedAt": now.isoformat(),
+        "statusFileFound": bool(status_text.strip()),
+        "statusReportAgeSeconds": int((now - report_time).total_seconds()) if report_time else None,
+        **status,
+        **_parse_lsyncd_log(log_text, journal_text, now),
+    }
+    live_sync_metrics[f"{req.source_ip}-{req.target_ip}-linux"] = metrics
+    return metrics
+
+@logged_job(lambda action, req: {"job_id": f"live-sync:{req.source_ip}-{req.target_ip}", "vm": req.source_ip})
+def run_live_sync_action(action, req: LiveSyncRequest):
+    """Run a live sync action for one pair; returns the per-step results of start/stop, or None if it failed."""
+    log_buffer = StringIO()
+    log_key = f"{req.source_ip}-{req.target_ip}-linux"
+    results = {}
+    
+    try:
+        if action == "start":
+            log_buffer.write("--- Starting Live Sync Setup ---\n")
+            results = bootstrap_live_sync(req, log_buffer)
+            log_buffer.write("lsyncd service started.\n")
+
+        elif action == "stop":
+            log_buffer.write("--- Stopping Live Sync ---\n")
+            client = get_ssh_client(req.source_ip, req.username, req.password)
+            try:
+                results = {"source": run_bootstrap_stage(client, req.source_ip, req.password, "stop", [], log_buffer)}
+            finally:
+                client.close()
+            if results["source"].get("stop", {}).get("status") != "ok":
+                raise Exception(f"Failed to stop lsyncd: {results['source'].get('stop', {}).get('detail') or 'no result'}")
+            log_buffer.write("lsyncd service stopped.\n")
+
+        elif action == "logs":
+            log_buffer.write("--- Fetching Logs ---\n")
+            output, _ = execute_ssh_command(req.source_ip, req.username, req.password, 'sudo tail -n 100 /var/log/lsyncd/lsyncd.log', log_buffer)
+            if not output.strip():
+                log_buffer.write("Log file is empty or does not exist.\n")
+
+    except Exception as e:
+        log_buffer.write(f"\n--- An unexpected error occurred: {str(e)} ---\n")
+        results = None
+    finally:
+        live_sync_logs[log_key] = log_buffer.getvalue()
+        log_buffer.close()
+    return results
+
+@logged_job(lambda wave_id, request: {"job_id": f"live-sync-wave:{wave_id}", "wave_id": wave_id})
+def run_live_sync_wave(wave_id, request: LiveSyncWaveRequest):
+    """Start or stop live sync for every pair of a wave, `concurrency` pairs at a time."""
+    wave = live_sync_waves[wave_id]
+
+    def run_pair(pair: LiveSyncRequest):
+        result = wave["pairs"][f"{pair.source_ip}-{pair.target_ip}"]
+        result["status"] = "running"
+        steps = run_live_sync_action(request.action, pair)
+        result.update(status="success" if steps is not None else "failed", steps=steps or {})
+
+    with ThreadPoolExecutor(max_workers=max(request.concurrency, 1)) as executor:
+        list(executor.map(run_pair, request.pairs))
+    wave["status"] = "completed"
+
+# --- Windows Sync Backends ---
+
+def _append_live_sync_log(log_key, text):
+    live_sync_logs[log_key] = live_sync_logs.get(log_key, "") + text
+
+def _run_windows_sync_powershell(req: WindowsLiveSyncRequest, log_key):
+    """Legacy backend: drives robocopy through powershell.exe on the backend host (Windows only)."""
+    source = req.source_ip
+    clone = req.target_ip
+    user = req.username
+    pwd = req.password
+
+    ps_script = f'''
+$ErrorActionPreference = "Stop"
+$sourceVMIP = "{source}"
+$cloneVMIP = "{clone}"
+$username = "{user}"
+$password = "{pwd}"
+$retry = 1
+$wait = 1
+$driveLetters = "C", "D", "E"
+
+function Test-NetUse {{
+    param ($Path, $User, $Pass)
+    try {{
+        net use $Path /user:$User $Pass 2>&1 | Out-Null
+        if ($LASTEXITCODE -eq 0) {{
+            Write-Host "Successfully connected to $Path"
+            return $true
+        }} else {{
+            Write-Host "Failed to connect to $Path"
+            return $false
+        }}
+    }} catch {{
+        Write-Host "Error connecting to $Path : $_"
+        return $false
+    }}
+}}
+
+if (-not (Test-NetUse "\\\\$sourceVMIP\\C$" $username $password)) {{
+    Write-Error "Failed to connect to source VM C$ share"
+    exit 1
+}}
+if (-not (Test-NetUse "\\\\$cloneVMIP\\C$" $username $password)) {{
+    Write-Error "Failed to connect to target VM C$ share"
+    exit 1
+}}
+
+foreach ($drive in $driveLetters) {{
+    $sourcePath = "\\\\$sourceVMIP\\$drive`$"
+    $targetPath = "\\\\$cloneVMIP\\$drive`$"
+    Write-Host "`nSyncing $sourcePath -> $targetPath..."
+    $baseOptions = @(
+        "robocopy",
+        "`"$sourcePath`"",
+        "`"$targetPath`"",
+        "/MIR",
+        "/Z",
+        "/R:$retry",
+        "/W:$wait",
+        "/COPY:DAT",
+        "/DCOPY:T",
+        "/FFT",
+        "/LOG+:robocopy_log.txt",
+        "/TEE"
+    )
+    if ($drive -eq "C") {{
+        $baseOptions += @(
+            "/XD",
+                "`"$sourcePath\\Windows`"",
+                "`"$sourcePath\\Program Files`"",
+                "`"$sourcePath\\Program Files (x86)`"",
+                "`"$sourcePath\\ProgramData`"",
+                "`"$sourcePath\\System Volume Information`"",
+                "`"$sourcePath\\$Recycle.Bin`"",
+                "`"$sourcePath\\Recovery`"",
+                "`"$sourcePath\\PerfLogs`"",
+            "/XF",
+                "pagefile.sys",
+                "hiberfil.sys",
+                "swapfile.sys",
+                "DumpStack.log.tmp",
+                "*.etl",
+                "*.evtx",
+                "*.log1"
+        )
+    }}
+    $cmd = $baseOptions -join " "
+    Write-Host "Executing: $cmd"
+    try {{
+        Invoke-Expression $cmd
+        if ($LASTEXITCODE -eq 0 -or $LASTEXITCODE -eq 1) {{
+            Write-Host "Robocopy completed successfully for drive $drive"
+        }} else {{
+            Write-Host "Robocopy failed for drive $drive with exit code $LASTEXITCODE"
+        }}
+    }} catch {{
+        Write-Host "Error executing robocopy for drive $drive : $_"
+    }}
+}}
+'''
+    # stderr is merged into stdout so a single pipe is drained and neither side can stall the other
+    process = subprocess.Popen(
+        ["powershell.exe", "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", ps_script],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        encoding='utf-8',
+        errors='replace'
+    )
+    for line in process.stdout:
+        _append_live_sync_log(log_key, line)
+    process.wait()
+
+def _stream_windows_sync_channels(channels, log_key):
+    return drain_channels(channels, lambda drive, lines: _append_live_sync_log(
+        log_key, "".join(f"[{drive}:] {line}\n" for line in lines)))
+
+def _run_windows_sync_openssh(req: WindowsLiveSyncRequest, log_key):
+    """Linux-native backend: runs robocopy on the source VM over its OpenSSH server, one channel per drive."""
+    client = paramiko.SSHClient()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    try:
+        timed_ssh_connect(client, req.source_ip, username=req.username, password=req.password, timeout=20)
+        stdin, stdout, stderr = client.exec_command(WINDOWS_DRIVE_DETECT_CMD)
+        drives_output = stdout.read().decode(errors="ignore")
+        drives = [line.strip().strip(":\\") for line in drives_output.splitlines() if line.strip()]
+        if not drives:
+            raise Exception(f"Could not detect any drives on {req.source_ip}.")
+        _append_live_sync_log(log_key, f"Detected drives: {', '.join(drives)}. Syncing in parallel with /MT:{req.threads}...\n")
+
+        channels = {}
+        for drive in drives:
+            channel = client.get_transport().open_session()
+            channel.set_combine_stderr(True)
+            channel.exec_command(build_robocopy_command(drive, req.target_ip, req.username, req.threads))
+            channel.sendall(f"{req.password}\r\n".encode())
+            channel.shutdown_write()
+            channels[drive] = channel
+
+        exit_codes = _stream_windows_sync_channels(channels, log_key)
+        for drive in drives:
+            # Robocopy exit codes below 8 mean the copy succeeded (possibly with extras or mismatches)
+            if exit_codes.get(drive, 16) < 8:
+                _append_live_sync_log(log_key, f"Robocopy completed successfully for drive {drive} (exit code {exit_codes[drive]})\n")
+            else:
+                _append_live_sync_log(log_key, f"Robocopy failed for drive {drive} with exit code {exit_codes.get(drive)}\n")
+    finally:
+        client.close()
+
+# --- Robocopy Statistics ---
+
+def _record_windows_sync_run(log_key, backend_name, started_at, output):
+    """Store the parsed statistics of one sync run alongside the earlier runs for the same pair."""
+    drives = parse_robocopy_summaries(output)
+    run = {
+        "runId": len(windows_sync_runs.get(log_key, [])) + 1,
+        "backend": backend_name,
+        "startedAt": started_at.isoformat(),
+        "finishedAt": datetime.datetime.now().isoformat(),
+        "drives": drives,
+        "bytesCopied": sum(d.get("bytes", {}).get("copied", 0) for d in drives.values()),
+        "filesCopied": sum(d.get("files", {}).get("copied", 0) for d in drives.values()),
+        "filesFailed": sum(d.get("files", {}).get("failed", 0) for d in drives.values()),
+        "elapsedSeconds": int((datetime.datetime.now() - started_at).total_seconds()),
+    }
+    windows_sync_runs.setdefault(log_key, []).append(run)
+    return run
+
+WINDOWS_SYNC_BACKENDS = {
+    "powershell": _run_windows_sync_powershell,
+    "openssh": _run_windows_sync_openssh,
+}
+DEFAULT_WINDOWS_SYNC_BACKEND = os.getenv(
+    "WINDOWS_SYNC_BACKEND", "powershell" if platform.system().lower() == "windows" else "openssh"
+)
+
+@logged_job(lambda req: {"job_id": f"windows-sync:{req.source_ip}-{req.target_ip}", "vm": req.source_ip})
+def run_windows_sync(req: WindowsLiveSyncRequest):
+    log_key = f"{req.source_ip}-{req.target_ip}-windows"
+    backend_name = req.backend or DEFAULT_WINDOWS_SYNC_BACKEND
+    _append_live_sync_log(log_key, f"Using '{backend_name}' sync backend.\n")
+    started_at = datetime.datetime.now()
+    log_offset = len(live_sync_logs[log_key])
+    phase_run = PhaseRun("sync", vm=req.source_ip, target=req.target_ip)
+    result = "error"
+    try:
+        WINDOWS_SYNC_BACKENDS[backend_name](req, log_key)
+        _append_live_sync_log(log_key, "\nSync process finished.")
+        result = "success"
+    except Exception as e:
+        _append_live_sync_log(log_key, f"\nError running {backend_name} sync: {e}")
+    finally:
+        run = _record_windows_sync_run(log_key, backend_name, started_at, live_sync_logs[log_key][log_offset:])
+        phase_run.finish(result, byte_count=run["bytesCopied"])
+
+
+@router.post("/api/vms/replication/start-windows-sync")
+async def start_windows_sync(request: WindowsLiveSyncRequest):
+    source = request.source_ip
+    clone = request.target_ip
+    log_key = f"{source}-{clone}-windows"
+    # Resolved here so a bad WINDOWS_SYNC_BACKEND default fails the request rather than the job
+    backend_name = request.backend or DEFAULT_WINDOWS_SYNC_BACKEND
+    if backend_name not in WINDOWS_SYNC_BACKENDS:
+        raise HTTPException(status_code=400, detail=f"Unknown Windows sync backend '{backend_name}'; "
+                                                    f"expected one of {', '.join(WINDOWS_SYNC_BACKENDS)}.")
+    if not 1 <= request.threads <= ROBOCOPY_MAX_THREADS:
+        raise HTTPException(status_code=400, detail=f"threads must be between 1 and {ROBOCOPY_MAX_THREADS}.")
+    live_sync_logs[log_key] = f"Initiating Robocopy sync for {source} -> {clone}...\n"
+    
+    submit_job("sync", run_windows_sync, request, label=log_key)
+    
+    return {"status": "started", "message": f"Windows sync process initiated for {source} -> {clone}."}
+
+@router.get("/api/vms/replication/windows-stats/{source_ip}/{target_ip}")
+async def get_windows_sync_stats(source_ip: str, target_ip: str):
+    """Per-run robocopy statistics for a Windows pair, with a projection of the next (cutover) delta."""
+    runs = windows_sync_runs.get(f"{source_ip}-{target_ip}-windows", [])
+    estimated_next_sync_seconds = None
+    if runs:
+        last = runs[-1]
+        estimated_next_sync_seconds = last["elapsedSeconds"]
+        if len(runs) > 1 and runs[-2]["bytesCopied"] > 0:
+            # Assume the delta keeps shrinking at the rate observed between the last two runs
+            shrink = min(last["bytesCopied"] / runs[-2]["bytesCopied"], 1.0)
+            estimated_next_sync_seconds = int(last["elapsedSeconds"] * shrink)
+    return {
+        "runs": runs,
+        "bytesCopiedPerRun": [run["bytesCopied"] for run in runs],
+        "estimatedNextSyncSeconds": estimated_next_sync_seconds,
+    }
+
+check_vms_flight = SingleFlight("check_vms")
+
+def _check_vms(request: CheckVmsRequest):
+    with admit("read", vcenter=request.host.ipAddress):
+        return _check_vms_admitted(request)
+
+def _check_vms_admitted(request: CheckVmsRequest):
+    si = get_vcenter_connection(request.host)
+    results = []
+    try:
+        for vm_name in request.vm_names:
+            vm = find_vm_by_name(si, vm_name)
+            if vm:
+                guest_os_str = vm.summary.guest.guestFullName if vm.summary.guest else "N/A"
+                os_type = "Unknown"
+                if "windows" in guest_os_str.lower():
+                    os_type = "Windows"
+                elif "linux" in guest_os_str.lower():
+                    os_type = "Linux"
+                
+                results.append({
+                    "name": vm.name,
+                    "powerState": vm.runtime.powerState, 
+                    "guestOs": guest_os_str,
+                    "osType": os_type
+                })
+            else:
+                results.append({"name": vm_name, "powerState": "not present", "guestOs": "N/A", "osType": "Unknown"})
+    finally:
+        if si:
+            disconnect(si)
+    return results
+
+@router.post("/api/vms/replication/check-vms")
+async def check_vms_status(request: CheckVmsRequest, http_request: Request):
+    results = await check_vms_flight.run((request,), asyncio.to_thread, _check_vms, request)
+    return cached_json(http_request, results)
+
+@router.post("/api/vms/replication/metrics")
+async def live_sync_metrics_action(request: LiveSyncRequest):
+    """Collect lag and backlog metrics for a Linux live sync pair."""
+    return await asyncio.to_thread(collect_live_sync_metrics, request)
+
+@router.get("/api/vms/replication/metrics/{source_ip}/{target_ip}")
+async def get_live_sync_metrics(source_ip: str, target_ip: str):
+    metrics = live_sync_metrics.get(f"{source_ip}-{target_ip}-linux")
+    if not metrics:
+        raise HTTPException(status_code=404, detail="No live sync metrics collected yet for this pair.")
+    return metrics
+
+# Stopping sync is part of a cutover; fetching logs is not urgent
+LIVE_SYNC_ACTION_PRIORITIES = {"stop": "critical", "start": "normal", "logs": "low"}
+LIVE_SYNC_WAVE_MAX_CONCURRENCY = 256
+
+@router.post("/api/vms/replication/wave")
+async def live_sync_wave(request: LiveSyncWaveRequest):
+    """Start or stop live sync for many source/target pairs in parallel; poll GET .../wave/{waveId}."""
+    if request.action not in ("start", "stop"):
+        raise HTTPException(status_code=400, detail="action must be 'start' or 'stop'.")
+    if not request.pairs:
+        raise HTTPException(status_code=400, detail="At least one pair is required.")
+    if not 1 <= request.concurrency <= LIVE_SYNC_WAVE_MAX_CONCURRENCY:
+        raise HTTPException(status_code=400, detail=f"concurrency must be between 1 and {LIVE_SYNC_WAVE_MAX_CONCURRENCY}.")
+    pair_counts = collections.Counter(f"{pair.source_ip}-{pair.target_ip}" for pair in request.pairs)
+    duplicates = sorted(key for key, count in pair_counts.items() if count > 1)
+    if duplicates:
+        raise HTTPException(status_code=400, detail=f"Duplicate source/target pairs: {', '.join(duplicates)}.")
+    wave_id = uuid.uuid4().hex
+    live_sync_waves[wave_id] = {
+        "action": request.action,
+        "status": "running",
+        "pairs": {f"{pair.source_ip}-{pair.target_ip}": {"status": "queued"} for pair in request.pairs},
+    }
+    for pair in request.pairs:
+        live_sync_logs[f"{pair.source_ip}-{pair.target_ip}-linux"] = f"Initiating '{request.action}' action (wave {wave_id})...\n"
+    submit_job("live_sync", run_live_sync_wave, wave_id, request, priority=LIVE_SYNC_ACTION_PRIORITIES[request.action], label=wave_id)
+    return {"status": "started", "waveId": wave_id, "message": f"Live sync {request.action} initiated for {len(request.pairs)} pairs."}
+
+@router.get("/api/vms/replication/wave/{wave_id}")
+async def get_live_sync_wave(request: Request, wave_id: str):
+    wave = live_sync_waves.get(wave_id)
+    if not wave:
+        raise HTTPException(status_code=404, detail="Live sync wave not found.")
+    return cached_json(request, wave)
+
+@router.post("/api/vms/replication/{action}")
+async def live_sync_action(action: str, request: LiveSyncRequest):
+    if action not in ["start", "stop", "logs"]:
+        raise HTTPException(status_code=400, detail="Invalid action specified.")
+    
+    log_key = f"{request.source_ip}-{request.target_ip}-linux"
+    live_sync_logs[log_key] = f"Initiating '{action}' action...\n"
+    
+    submit_job("live_sync", run_live_sync_action, action, request, priority=LIVE_SYNC_ACTION_PRIORITIES[action], label=log_key)
+    
+    return {"status": "started", "message": f"Action '{action}' initiated for {request.source_ip} -> {request.target_ip}."}
+
+@router.get("/api/vms/replication/logs/{source_ip}/{target_ip}")
+async def get_live_sync_logs(request: Request, source_ip: str, target_ip: str, os_type: str = 'linux'):
+    log_key = f"{source_ip}-{target_ip}-{os_type}"
+    logs = live_sync_logs.get(log_key, "No logs available yet. Please initiate an action.")
+    return cached_json(request, {"logs": logs})
@@ -0,0 +1,118 @@
+"""Pre-migration PDF reports. reportlab is only imported when a report is rendered."""
+import asyncio
+import logging
+from io import BytesIO
+
+from fastapi import APIRouter, HTTPException, Response
+
+from admission import admit
+from lazy_imports import vim
+from models import PreCheckRequest
+from observability import retrieve_content, trace_phase, trace_span
+from vcenter import disconnect, smart_connect
+
+router = APIRouter()
+
+def gather_vsphere_info(vcenter, user, pwd, vm_names):
+    with admit("read", vcenter=vcenter):
+        return _gather_vsphere_info(vcenter, user, pwd, vm_names)
+
+def _gather_vsphere_info(vcenter, user, pwd, vm_names):
+    si = smart_connect(vcenter, user, pwd)
+    content = retrieve_content(si)
+    with trace_span("vcenter.container_view_walk"):
+        view = content.viewManager.CreateContainerView(content.rootFolder, [vim.VirtualMachine], True)
+        vms = {vm.name: vm for vm in view.view}
+        view.Destroy()
+    trace_phase("vcenter.property_fetch")
+    results = {}
+    for name in vm_names:
+        vm = vms.get(name)
+        if not vm:
+            results[name] = None
+            continue
+        s = vm.summary
+        info = {
+            "Name": s.config.name,
+            "Host": vm.runtime.host.name,
+            "PowerState": vm.runtime.powerState,
+            "vCPUs": s.config.numCpu,
+            "MemoryMB": s.config.memorySizeMB,
+            "Datastores": ", ".join(ds.name for ds in vm.datastore)
+        }
+        if s.guest and s.guest.toolsRunningStatus == "guestToolsRunning":
+            info.update({
+                "GuestOS": s.guest.guestFullName,
+                "Hostname": s.guest.hostName,
+                "IP": s.guest.ipAddress
+            })
+        else:
+            info.update({"GuestOS": "N/A", "Hostname": "N/A", "IP": "N/A"})
+        results[name] = info
+    trace_phase("vcenter.disconnect")
+    disconnect(si)
+    return results
+
+@router.post("/api/precheck-report")
+async def generate_precheck_report(request: PreCheckRequest):
+    logging.debug(f"Generating pre-check report for {len(request.vmNames)} VMs on host {request.host.ipAddress}")
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+    try:
+        with trace_span("report.gather_vsphere_info"):
+            vs_data = await asyncio.to_thread(gather_vsphere_info, request.host.ipAddress, request.host.username,
+                                              request.host.password, request.vmNames)
+        report_data = [info for info in vs_data.values() if info]
+        trace_phase("report.render_pdf")
+
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter,
+                                leftMargin=36, rightMargin=36,
+                                topMargin=36, bottomMargin=36)
+        styles = getSampleStyleSheet()
+        # Adjust styles for table
+        header_style = styles['Heading4']
+        header_style.fontSize = 9
+        header_style.leading = 10
+        body_style = styles['BodyText']
+        body_style.fontSize = 8
+        body_style.leading = 10
+        body_style.wordWrap = 'CJK' # enable wrapping
+        elements = []
+        elements.append(Paragraph("VM Inventory Report", styles['Title']))
+        elements.append(Spacer(1, 12))
+        headers = ["Name", "Host/Host IP", "PowerState", "GuestOS", "Hostname", "IP", "vCPUs", "MemoryMB", "Datastores"]
+        table_data = []
+        # Wrap headers in Paragraphs
+        table_data.append([Paragraph(h, header_style) for h in headers])
+        for row in report_data:
+            cells = []
+            for key in ["Name", "Host", "PowerState", "GuestOS", "Hostname", "IP", "vCPUs", "MemoryMB", "Datastores"]:
+                cells.append(Paragraph(str(row.get(key, "")), body_style))
+            table_data.append(cells)
+        col_count = len(headers)
+        table_width = doc.width
+        col_widths = [table_width / col_count] * col_count
+        t = Table(table_data, colWidths=col_widths, repeatRows=1)
+        t.setStyle(TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), colors.grey),
+            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+            ('ALIGN',(0,0),(-1,0),'CENTER'),
+            ('VALIGN',(0,0),(-1,-1),'TOP'),
+            ('GRID', (0,0), (-1,-1), 0.5, colors.black),
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold')
+        ]))
+        elements.append(t)
+        doc.build(elements)
+        buffer.seek(0)
+        
+        return Response(content=buffer.getvalue(), media_type="application/pdf")
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logging.error(f"Error generating report: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,360 @@
+"""Post-conversion checks: reachability probes, file counts, manifest diffs and Windows inventories."""
+import asyncio
+import json
+import logging
+import re
+import shlex
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from fanout import fan_out
+from jobs import run_job
+from lazy_imports import paramiko
+from models import (CheckFilesRequest, FanOutRequest, FileCheckHost, ManifestDiffRequest, PingTestRequest,
+                    WindowsCheckFilesRequest)
+from observability import timed_ssh_connect
+from probes import PROBE_METHODS, probe_hosts
+from robocopy import WINDOWS_DRIVE_DETECT_CMD, build_robocopy_inventory_command, parse_robocopy_summaries
+from routers.replication import LSYNCD_EXCLUDE_LIST
+from ssh_utils import drain_channels, get_ssh_client, run_ssh_command_windows, start_remote_stream
+
+router = APIRouter()
+
+# --- Validation ---
+
+@router.post("/api/vms/ping-test")
+async def ping_test(request: PingTestRequest):
+    if request.method not in PROBE_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unsupported probe method '{request.method}'.")
+    probes = probe_hosts(request.hostnames, request.method, request.ports, request.timeout, request.concurrency)
+
+    if request.stream:
+        async def ndjson_results():
+            async for result in probes:
+                yield json.dumps(result) + "\n"
+        return StreamingResponse(ndjson_results(), media_type="application/x-ndjson")
+
+    results = {}
+    async for result in probes:
+        results[result["host"]] = result if request.detailed else result["status"]
+    return results
+
+@router.post("/api/vms/check-files")
+async def check_files(request: CheckFilesRequest):
+    """File count per host (-1 if it could not be taken), all hosts counted concurrently."""
+    counts = {}
+    async for result in fan_out(request.hosts, lambda host: FILE_COUNT_COMMAND, timeout=CHECK_FILES_TIMEOUT_SECONDS):
+        output = result["stdout"].strip()
+        if result["status"] == "ok" and output.isdigit():
+            counts[result["host"]] = int(output)
+        else:
+            reason = result.get("error") or result["stderr"].strip() or f"{result['status']}, output '{output}'"
+            logging.error(f"Failed to count files on {result['host']}: {reason}")
+            counts[result["host"]] = -1
+    return {host.ip_address: counts[host.ip_address] for host in request.hosts}
+
+# --- File Manifest Diff ---
+
+PSEUDO_FILESYSTEMS = ["proc", "sysfs", "devtmpfs", "devpts", "tmpfs", "cgroup", "cgroup2", "securityfs",
+                      "debugfs", "tracefs", "pstore", "bpf", "mqueue", "hugetlbfs", "configfs", "fusectl",
+                      "autofs", "binfmt_misc"]
+MANIFEST_HASH_CHUNK = 256
+MANIFEST_HASH_WORKERS = 4
+
+def _build_find_prune_expression():
+    """find(1) clauses that skip pseudo-filesystems and everything lsyncd is told not to replicate."""
+    clauses = [f"-fstype {fs}" for fs in PSEUDO_FILESYSTEMS]
+    clauses += [f"-path '{entry.rstrip('/')}'" for entry in LSYNCD_EXCLUDE_LIST.splitlines() if entry.strip()]
+    return "\\( " + " -o ".join(clauses) + " \\) -prune"
+
+def _build_manifest_command():
+    # C-locale sort gives byte order, which both sides and the merge below agree on
+    return f"find / {_build_find_prune_expression()} -o -type f -printf '%p\\t%s\\t%T@\\n' 2>/dev/null | LC_ALL=C sort"
+
+def _build_hash_command():
+    return (
+        f"find / {_build_find_prune_expression()} -o -type f -print0 2>/dev/null | "
+        f"xargs -0 -r -n {MANIFEST_HASH_CHUNK} -P {MANIFEST_HASH_WORKERS} sha256sum 2>/dev/null | "
+        "awk '{print substr($0, 67) \"\\t\" substr($0, 1, 64)}' | LC_ALL=C sort"
+    )
+
+def _parse_manifest_lines(lines):
+    for line in lines:
+        parts = line.rsplit('\t', 2)
+        if len(parts) != 3:
+            continue
+        path, size, mtime = parts
+        try:
+            yield path, int(size), int(float(mtime))
+        except ValueError:
+            continue
+
+def _parse_hash_lines(lines):
+    for line in lines:
+        path, _, digest = line.rpartition('\t')
+        if path:
+            yield path, digest
+
+def _attach_hashes(records, hashes):
+    """Join a host's sorted metadata stream with its sorted hash stream on path."""
+    current = next(hashes, None)
+    for path, size, mtime in records:
+        while current is not None and current[0] < path:
+            current = next(hashes, None)
+        digest = current[1] if current is not None and current[0] == path else None
+        yield path, size, mtime, digest
+
+def _display_path(path):
+    return path.encode('latin-1').decode('utf-8', errors='replace')
+
+def diff_manifests(source_records, target_records, max_differences=1000):
+    """Merge two path-sorted manifests and report files missing, extra or changed on the target."""
+    summary = {"sourceFiles": 0, "targetFiles": 0, "sourceBytes": 0, "targetBytes": 0,
+               "missingOnTarget": 0, "extraOnTarget": 0, "changed": 0}
+    differences = {"missingOnTarget": [], "extraOnTarget": [], "changed": []}
+
+    def record(kind, entry):
+        summary[kind] += 1
+        if len(differences[kind]) < max_differences:
+            differences[kind].append(entry)
+
+    src = next(source_records, None)
+    tgt = next(target_records, None)
+    while src is not None or tgt is not None:
+        if tgt is None or (src is not None and src[0] < tgt[0]):
+            summary["sourceFiles"] += 1
+            summary["sourceBytes"] += src[1]
+            record("missingOnTarget", {"path": _display_path(src[0]), "size": src[1], "mtime": src[2]})
+            src = next(source_records, None)
+        elif src is None or tgt[0] < src[0]:
+            summary["targetFiles"] += 1
+            summary["targetBytes"] += tgt[1]
+            record("extraOnTarget", {"path": _display_path(tgt[0]), "size": tgt[1], "mtime": tgt[2]})
+            tgt = next(target_records, None)
+        else:
+            summary["sourceFiles"] += 1
+            summary["targetFiles"] += 1
+            summary["sourceBytes"] += src[1]
+            summary["targetBytes"] += tgt[1]
+            reasons = []
+            if src[1] != tgt[1]:
+                reasons.append("size")
+            if src[2] != tgt[2]:
+                reasons.append("mtime")
+            if src[3] and tgt[3] and src[3] != tgt[3]:
+                reasons.append("content")
+            if reasons:
+                record("changed", {"path": _display_path(src[0]), "reasons": reasons,
+                                   "source": {"size": src[1], "mtime": src[2]},
+                                   "target": {"size": tgt[1], "mtime": tgt[2]}})
+            src = next(source_records, None)
+            tgt = next(target_records, None)
+    return {"summary": summary, "differences": differences}
+
+def run_manifest_diff(request: ManifestDiffRequest):
+    hosts = [request.source, request.target]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(get_ssh_client, h.ip_address, h.username, h.password) for h in hosts]
+    # Both connects have finished here; close whichever succeeded if the other one failed
+    clients = [future.result() for future in futures if future.exception() is None]
+    failed = next((future.exception() for future in futures if future.exception() is not None), None)
+    if failed is not None:
+        for client in clients:
+            client.close()
+        raise failed
+    try:
+        # Every traversal is started before any output is consumed so both hosts walk their trees concurrently
+        manifests = [_parse_manifest_lines(start_remote_stream(client, _build_manifest_command())) for client in clients]
+        if request.verify_content:
+            hash_streams = [_parse_hash_lines(start_remote_stream(client, _build_hash_command())) for client in clients]
+            streams = [_attach_hashes(m, h) for m, h in zip(manifests, hash_streams)]
+        else:
+            streams = [((path, size, mtime, None) for path, size, mtime in m) for m in manifests]
+        result = diff_manifests(streams[0], streams[1], request.max_differences)
+    finally:
+        for client in clients:
+            client.close()
+    result.update({"source": request.source.ip_address, "target": request.target.ip_address,
+                   "contentVerified": request.verify_content})
+    return result
+
+@router.post("/api/vms/check-files/manifest-diff")
+async def manifest_diff(request: ManifestDiffRequest):
+    try:
+        # Full tree walks on both hosts; they wait behind cutover work rather than compete with it
+        return await run_job("validation", run_manifest_diff, request, priority="low",
+                             label=f"{request.source.ip_address}->{request.target.ip_address}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Manifest diff failed for {request.source.ip_address} -> {request.target.ip_address}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# --- SSH Fan-Out ---
+
+CHECK_FILES_TIMEOUT_SECONDS = 900  # the find itself; an unreachable guest fails after the connect timeout
+FAN_OUT_MAX_CONCURRENCY = 256
+FAN_OUT_MAX_TIMEOUT_SECONDS = 900
+PATH_PARAM = re.compile(r"^/[\w./ +@-]*$")
+NAME_PARAM = re.compile(r"^[\w@.-]+$")
+FILE_COUNT_COMMAND = f"find / {_build_find_prune_expression()} -o -type f -printf '.' 2>/dev/null | wc -c"
+
+def _parse_os_release(output):
+    fields = dict(line.split("=", 1) for line in output.splitlines() if "=" in line)
+    return {key: fields[name].strip('"') for key, name in
+            (("id", "ID"), ("versionId", "VERSION_ID"), ("prettyName", "PRETTY_NAME")) if name in fields}
+
+def _parse_df(output):
+    filesystem, size, used, available, _, mount = output.splitlines()[-1].split(None, 5)
+    return {"filesystem": filesystem, "sizeBytes": int(size), "usedBytes": int(used),
+            "availableBytes": int(available), "mountPoint": mount}
+
+# The only commands the fan-out endpoint runs; parameters are checked against their pattern and shell-quoted
+FAN_OUT_OPERATIONS = {
+    "sshd_active": {"command": "systemctl is-active sshd", "description": "Whether sshd is running."},
+    "lsyncd_installed": {"command": "command -v lsyncd", "description": "Path of lsyncd, if installed."},
+    "rsync_installed": {"command": "command -v rsync", "description": "Path of rsync, if installed."},
+    "distro": {"command": "cat /etc/os-release", "parse": _parse_os_release, "description": "Linux distribution."},
+    "file_count": {"command": FILE_COUNT_COMMAND, "parse": int,
+                   "description": "Regular files outside pseudo-filesystems and the lsyncd excludes."},
+    "disk_usage": {"command": "df -PB1 {path}", "params": {"path": PATH_PARAM}, "parse": _parse_df,
+                   "description": "Size and free space of the filesystem holding a path."},
+    "path_exists": {"command": "test -e {path}", "params": {"path": PATH_PARAM},
+                    "description": "Exit code 0 if the path exists."},
+    "service_active": {"command": "systemctl is-active {service}", "params": {"service": NAME_PARAM},
+                       "description": "Whether a systemd service is running."},
+    "uptime": {"command": "cut -d' ' -f1 /proc/uptime", "parse": float, "description": "Seconds since boot."},
+    "windows_drives": {"command": WINDOWS_DRIVE_DETECT_CMD,
+                       "parse": lambda output: [line.strip().strip(":\\") for line in output.splitlines() if line.strip()],
+                       "description": "Drive letters of a Windows guest."},
+}
+
+def _fan_out_command(operation, params):
+    spec = FAN_OUT_OPERATIONS.get(operation)
+    if spec is None:
+        raise HTTPException(status_code=400, detail=f"Unknown operation '{operation}'.")
+    expected = spec.get("params", {})
+    if set(params) != set(expected):
+        raise HTTPException(status_code=400, detail=f"Operation '{operation}' takes parameters: {', '.join(expected) or 'none'}.")
+    for name, pattern in expected.items():
+        if not pattern.match(params[name]):
+            raise HTTPException(status_code=400, detail=f"Invalid value for '{name}'.")
+    return spec["command"].format(**{name: shlex.quote(value) for name, value in params.items()}) if expected else spec["command"]
+
+def _with_parsed(result, parse):
+    if parse and result["status"] == "ok":
+        try:
+            result["parsed"] = parse(result["stdout"].strip())
+        except (ValueError, IndexError):
+            result["parsed"] = None
+    return result
+
+@router.get("/api/vms/fan-out/operations")
+async def list_fan_out_operations():
+    return {name: {"description": spec["description"], "params": list(spec.get("params", {}))}
+            for name, spec in FAN_OUT_OPERATIONS.items()}
+
+@router.post("/api/vms/fan-out")
+async def fan_out_operation(request: FanOutRequest):
+    """Run one whitelisted operation on every host concurrently; results per host, as NDJSON as they finish with stream."""
+    command = _fan_out_command(request.operation, request.params)
+    if not 1 <= request.concurrency <= FAN_OUT_MAX_CONCURRENCY:
+        raise HTTPException(status_code=400, detail=f"concurrency must be between 1 and {FAN_OUT_MAX_CONCURRENCY}.")
+    if not 0 < request.timeout <= FAN_OUT_MAX_TIMEOUT_SECONDS:
+        raise HTTPException(status_code=400, detail=f"timeout must be between 0 and {FAN_OUT_MAX_TIMEOUT_SECONDS} seconds.")
+    parse = FAN_OUT_OPERATIONS[request.operation].get("parse")
+    results = fan_out(request.hosts, lambda host: command, request.timeout, request.concurrency)
+
+    if request.stream:
+        async def ndjson_results():
+            async for result in results:
+                yield json.dumps(_with_parsed(result, parse)) + "\n"
+        return StreamingResponse(ndjson_results(), media_type="application/x-ndjson")
+
+    return {result["host"]: _with_parsed(result, parse) async for result in results}
+
+# --- Windows chkdsk Logic ---
+
+def _get_windows_drives(ip, username, password):
+    drives_output = run_ssh_command_windows(ip, username, password, WINDOWS_DRIVE_DETECT_CMD)
+    return [line.strip(":\\") for line in drives_output.splitlines() if line.strip()]
+
+def _extract_chkdsk_summary(output: str) -> str:
+    """
+    Extract only the 'xxx KB in yyy files.' line from chkdsk output.
+    """
+    for line in output.splitlines():
+        match = re.search(r"(\d+)\s+KB in\s+(\d+)\s+files\.", line)
+        if match:
+            return f"{match.group(1)} KB in {match.group(2)} files."
+    return "File count not found"
+
+def _inventory_windows_host(host: FileCheckHost):
+    """Count files and bytes on every drive of one Windows VM over a single SSH session."""
+    client = paramiko.SSHClient()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    try:
+        timed_ssh_connect(client, host.ip_address, username=host.username, password=host.password, timeout=20)
+        stdin, stdout, stderr = client.exec_command(WINDOWS_DRIVE_DETECT_CMD)
+        drives_output = stdout.read().decode(errors="ignore")
+        drives = [line.strip().strip(":\\") for line in drives_output.splitlines() if line.strip()]
+        if not drives:
+            return {"error": "Could not detect any drives on the Windows VM."}
+
+        channels = {}
+        for drive in drives:
+            channel = client.get_transport().open_session()
+            channel.set_combine_stderr(True)
+            channel.exec_command(build_robocopy_inventory_command(drive))
+            channels[drive] = channel
+        outputs = {drive: [] for drive in drives}
+        drain_channels(channels, lambda drive, lines: outputs[drive].extend(lines))
+
+        host_results = {}
+        for drive in drives:
+            stats = parse_robocopy_summaries("\n".join(outputs[drive])).get(drive, {})
+            files = stats.get("files", {}).get("total")
+            size = stats.get("bytes", {}).get("total")
+            if files is None or size is None:
+                host_results[drive] = "File count not found"
+            else:
+                host_results[drive] = f"{size // 1024} KB in {files} files."
+        return host_results
+    except Exception as e:
+        logging.error(f"Windows inventory failed on {host.ip_address}: {e}")
+        return {"error": str(e)}
+    finally:
+        client.close()
+
+def _chkdsk_windows_host(host: FileCheckHost):
+    CHKDSK_PATH = r"C:\Windows\System32\chkdsk.exe"
+    host_results = {}
+    drives = _get_windows_drives(host.ip_address, host.username, host.password)
+    if not drives:
+        return {"error": "Could not detect any drives on the Windows VM."}
+
+    for drive in drives:
+        cmd = f'"{CHKDSK_PATH}" {drive}:'
+        output = run_ssh_command_windows(host.ip_address, host.username, host.password, cmd)
+        host_results[drive] = _extract_chkdsk_summary(output)
+    return host_results
+
+WINDOWS_INVENTORY_METHODS = {
+    "robocopy": _inventory_windows_host,
+    "chkdsk": _chkdsk_windows_host,
+}
+
+@router.post("/api/vms/check-files-windows")
+async def check_files_windows(request: WindowsCheckFilesRequest):
+    inventory = WINDOWS_INVENTORY_METHODS.get(request.method)
+    if inventory is None:
+        raise HTTPException(status_code=400, detail=f"Unknown Windows inventory method '{request.method}'.")
+    try:
+        reports = await asyncio.gather(*(asyncio.to_thread(inventory, host) for host in request.hosts))
+    except Exception as e:
+        logging.error(f"Error running command on {request.hosts}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {host.ip_address: report for host, report in zip(request.hosts, reports)}
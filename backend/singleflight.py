@@ -0,0 +1,97 @@
+"""Coalescing of identical in-flight read requests.
+
+When several tabs or operators ask for the same listing or task at once, the first
+caller (the leader) runs the work and everyone who arrives while it is in flight
+awaits the same result. Results can optionally be kept for a short TTL.
+
+The key is the request with its credential fields removed, so it is safe to log and
+expose. Credentials still gate sharing: callers only join a flight or a cached result
+whose credentials fingerprint (an HMAC under a per-process key) matches their own,
+so a wrong password never gets a result someone else authenticated for.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import time
+
+from pydantic import BaseModel
+
+from observability import COALESCED_REQUESTS
+
+CREDENTIAL_FIELDS = {"password", "morpheusApiKey", "vm_password"}
+SINGLE_FLIGHT_TTL_SECONDS = float(os.getenv("SINGLE_FLIGHT_TTL_SECONDS", "0"))  # 0 shares in-flight work only
+_FINGERPRINT_KEY = os.urandom(32)
+
+def _split_credentials(value):
+    """(value without credential fields, just the credential fields) for models, dicts and lists."""
+    if isinstance(value, BaseModel):
+        value = value.model_dump()
+    if isinstance(value, dict):
+        public, secret = {}, {}
+        for key, item in value.items():
+            if key in CREDENTIAL_FIELDS:
+                secret[key] = item
+                continue
+            public[key], nested = _split_credentials(item)
+            if nested:
+                secret[key] = nested
+        return public, secret
+    if isinstance(value, (list, tuple, set, frozenset)):
+        pairs = [_split_credentials(item) for item in (sorted(value, key=str) if isinstance(value, (set, frozenset)) else value)]
+        secrets = [secret for _, secret in pairs]
+        return [public for public, _ in pairs], secrets if any(secrets) else {}
+    return value, {}
+
+def request_key(group, *parts):
+    """(coalescing key without credentials, fingerprint of the credentials) for a request."""
+    public, secret = _split_credentials(list(parts))
+    key = json.dumps([group, public], sort_keys=True, default=str)
+    fingerprint = hmac.new(_FINGERPRINT_KEY, json.dumps(secret, sort_keys=True, default=str).encode(), hashlib.sha256).hexdigest()
+    return key, fingerprint
+
+class SingleFlight:
+    """Shares one execution of an async call among concurrent callers with the same key.
+
+    Runs on the event loop only, so the bookkeeping needs no lock. Callers must treat
+    the result as read-only since every caller gets the same object.
+    """
+
+    def __init__(self, group, ttl=SINGLE_FLIGHT_TTL_SECONDS):
+        self.group = group
+        self.ttl = ttl
+        self._inflight = {}  # key -> (fingerprint, task)
+        self._results = {}  # key -> (expires_at, fingerprint, result)
+
+    async def run(self, parts, func, *args):
+        """Await func(*args), or the identical call already in flight for `parts`."""
+        key, fingerprint = request_key(self.group, *parts)
+        cached = self._results.get(key)
+        if cached and cached[0] > time.monotonic() and hmac.compare_digest(cached[1], fingerprint):
+            COALESCED_REQUESTS.labels(group=self.group, outcome="cached").inc()
+            return cached[2]
+        flight = self._inflight.get(key)
+        if flight and hmac.compare_digest(flight[0], fingerprint):
+            COALESCED_REQUESTS.labels(group=self.group, outcome="shared").inc()
+            return await asyncio.shield(flight[1])
+
+        COALESCED_REQUESTS.labels(group=self.group, outcome="leader").inc()
+        task = asyncio.ensure_future(func(*args))
+        if flight is None:
+            # Someone with different credentials runs on their own and does not displace the flight
+            self._inflight[key] = (fingerprint, task)
+        task.add_done_callback(lambda done: self._finish(key, fingerprint, done))
+        # Shielded so a caller that goes away does not cancel the work the others are waiting for
+        return await asyncio.shield(task)
+
+    def _finish(self, key, fingerprint, task):
+        flight = self._inflight.get(key)
+        if flight and flight[1] is task:
+            del self._inflight[key]
+        if task.cancelled() or task.exception() is not None or self.ttl <= 0:
+            return
+        now = time.monotonic()
+        for stale in [k for k, (expires_at, _, _) in self._results.items() if expires_at <= now]:
+            del self._results[stale]
+        self._results[key] = (now + self.ttl, fingerprint, task.result())
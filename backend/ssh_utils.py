@@ -0,0 +1,130 @@
+"""SSH helpers shared by the conversion, replication, validation and IP reassignment routers."""
+import logging
+import time
+
+from lazy_imports import paramiko
+from observability import ssh_command_timer, ssh_peer, timed_ssh_connect
+
+def get_ssh_client(hostname, username, password):
+    client = paramiko.SSHClient()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    timed_ssh_connect(client, hostname, username=username, password=password, timeout=10)
+    return client
+
+def execute_ssh_command(host, username, password, command, log_buffer):
+    try:
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        timed_ssh_connect(client, host, username=username, password=password, timeout=10)
+        
+        use_sudo = command.startswith('sudo ')
+        actual_cmd = f'sudo -S {command[5:]}' if use_sudo else command
+        
+        with ssh_command_timer(host):
+            stdin, stdout, stderr = client.exec_command(actual_cmd, get_pty=True)
+            if use_sudo:
+                stdin.write(password + '\n')
+                stdin.flush()
+
+            output = stdout.read().decode('utf-8', errors='ignore').strip()
+            error = stderr.read().decode('utf-8', errors='ignore').strip()
+        
+        if output:
+            log_buffer.write(f"Output from {host}: {output}\n")
+        if error:
+            log_buffer.write(f"Error from {host}: {error}\n")
+            
+        return output, error
+    except Exception as e:
+        log_buffer.write(f"Exception connecting to {host}: {str(e)}\n")
+        return "", str(e)
+    finally:
+        if 'client' in locals() and client.get_transport() is not None and client.get_transport().is_active():
+            client.close()
+
+def drain_channels(channels, on_lines):
+    """Drain the merged output of several channels without blocking on any single one.
+
+    on_lines(key, lines) is called with each batch of complete lines; returns the exit code per key.
+    """
+    pending = dict(channels)
+    partial = {key: "" for key in channels}
+    exit_codes = {}
+    while pending:
+        received = False
+        for key, channel in list(pending.items()):
+            while channel.recv_ready():
+                partial[key] += channel.recv(32768).decode('utf-8', errors='replace')
+                *lines, partial[key] = partial[key].split("\n")
+                lines = [line.rstrip() for line in lines if line.strip()]
+                if lines:
+                    on_lines(key, lines)
+                    received = True
+            if channel.exit_status_ready() and not channel.recv_ready():
+                if partial[key].strip():
+                    on_lines(key, [partial[key].rstrip()])
+                exit_codes[key] = channel.recv_exit_status()
+                channel.close()
+                del pending[key]
+        if not received:
+            time.sleep(0.2)
+    return exit_codes
+
+def start_remote_stream(client, command):
+    """Start a command on its own channel right away and return a lazy iterator over its output lines."""
+    channel = client.get_transport().open_session()
+    channel.exec_command(command)
+    stream = channel.makefile('rb')
+
+    def lines():
+        try:
+            for raw in stream:
+                # latin-1 maps bytes 1:1, so string order matches the remote byte-wise sort
+                yield raw.decode('latin-1').rstrip('\n')
+        finally:
+            channel.close()
+    return lines()
+
+def run_ssh_command_windows(ip, username, password, command):
+    client = paramiko.SSHClient()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    try:
+        timed_ssh_connect(client, ip, username=username, password=password, timeout=20)
+        with ssh_command_timer(ip):
+            stdin, stdout, stderr = client.exec_command(command)
+            output = stdout.read().decode(errors="ignore")
+            error = stderr.read().decode(errors="ignore")
+        if error:
+            logging.error(f"Error executing command on {ip}: {error}")
+        return output.strip() if output else error.strip()
+    finally:
+        client.close()
+
+def ssh_exec(ssh, cmd, timeout=30, wait=True):
+    """Execute SSH command and return output and error with timeout."""
+    if wait:
+        try:
+            with ssh_command_timer(ssh_peer(ssh)):
+                stdin, stdout, stderr = ssh.exec_command(cmd, timeout=timeout)
+
+                # Set timeout for reading output
+                stdout.channel.settimeout(timeout)
+                stderr.channel.settimeout(timeout)
+
+                output = stdout.read().decode().strip()
+                error = stderr.read().decode().strip()
+            
+            return output, error
+        except Exception as e:
+            logging.error(f"SSH command '{cmd}' failed with error: {e}")
+            return "", str(e)
+    else:
+        # fire-and-forget: don't block waiting for output
+        try:
+            transport = ssh.get_transport()
+            channel = transport.open_session()
+            channel.exec_command(cmd)
+            return "", ""
+        except Exception as e:
+            logging.error(f"SSH fire-and-forget command '{cmd}' failed with error: {e}")
+            return "", str(e)
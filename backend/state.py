@@ -0,0 +1,62 @@
+"""In-memory job state shared between the routers and their background tasks."""
+import collections
+import logging
+import threading
+import time
+
+# In-memory storage for migration status and IP reassignment logs (replace with a database in a real app)
+migration_statuses = {}
+clone_requests = collections.OrderedDict()  # clone name -> queued or started clone, oldest first
+clone_requests_lock = threading.Lock()  # held to add or remove clone requests
+live_sync_logs = {}
+live_sync_metrics = {}
+live_sync_waves = {}
+windows_sync_runs = {}
+ip_reassignment_logs = {}
+ip_reassignment_batches = {}
+state_versions = {}  # (store, key) -> (version, updated_at), used as ETag / Last-Modified by the status endpoints
+_versions_lock = threading.Lock()
+
+# --- Status Helpers ---
+
+def bump_version(store, key):
+    with _versions_lock:
+        version, _ = state_versions.get((store, key), (0, None))
+        state_versions[(store, key)] = (version + 1, time.time())
+
+def get_version(store, key):
+    """(version, updated_at) of a status entry, or (None, None) if it was never updated."""
+    return state_versions.get((store, key), (None, None))
+
+def update_ip_reassignment_logs(vm_ip, log_message):
+    """Update IP reassignment logs for real-time display."""
+    if vm_ip not in ip_reassignment_logs:
+        ip_reassignment_logs[vm_ip] = []
+    
+    ip_reassignment_logs[vm_ip].append(log_message)
+    bump_version("ip_reassignment_logs", vm_ip)
+    logging.info(f"IP Reassignment [{vm_ip}]: {log_message}")
+
+def reset_ip_reassignment_logs(vm_ip):
+    ip_reassignment_logs[vm_ip] = []
+    bump_version("ip_reassignment_logs", vm_ip)
+
+def update_migration_status(vm_name, status, progress=0, logs=""):
+    # This function now handles both preparation and migration statuses
+    if vm_name not in migration_statuses:
+        migration_statuses[vm_name] = {}
+
+    if status in ["success", "error", "running"]:
+        migration_statuses[vm_name]["status"] = status
+    
+    if logs:
+        # For running status, we want to show the latest line, not the full log.
+        if status == "running" and "\n" in logs:
+             migration_statuses[vm_name]["logs"] = logs.strip().split('\n')[-1]
+        else:
+             migration_statuses[vm_name]["logs"] = logs
+    
+    if progress is not None:
+         migration_statuses[vm_name]["progress"] = progress
+    bump_version("migration_statuses", vm_name)
+    logging.debug("Migration status [%s]: %s %s%%", vm_name, status, progress)
@@ -0,0 +1,21 @@
+"""Regression tests for the job executor (run from the backend directory: python -m pytest tests)."""
+import time
+
+from jobs import JobPool, Job
+
+def test_burst_starts_workers_while_one_is_idle():
+    pool = JobPool("conversion", 16, 500)
+    warm = Job("conversion", lambda: None, (), "normal", "warm")
+    pool.submit(warm)
+    warm.future.result(timeout=5)
+    time.sleep(0.05)  # let the warm worker go idle
+    assert pool.threads == 1 and pool.idle == 1
+
+    jobs = [Job("conversion", time.sleep, (0.5,), "normal", f"job-{i}") for i in range(8)]
+    started = time.perf_counter()
+    for job in jobs:
+        pool.submit(job)
+    for job in jobs:
+        job.future.result(timeout=10)
+    assert time.perf_counter() - started < 2
+    assert pool.threads == 8
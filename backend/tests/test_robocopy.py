@@ -0,0 +1,41 @@
+"""Tests for robocopy log parsing (run from the backend directory: python -m pytest tests)."""
+import os
+
+from robocopy import parse_robocopy_summaries
+
+CAPTURED_LOG = os.path.join(os.path.dirname(__file__), os.pardir, "robocopy_log.txt")
+
+def _captured_log():
+    with open(CAPTURED_LOG, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+def test_captured_log_keeps_each_drives_latest_summary():
+    summaries = parse_robocopy_summaries(_captured_log())
+
+    assert set(summaries) == {"C", "E"}
+    c_drive = summaries["C"]
+    # The log holds two runs of C:; the second one wins
+    assert c_drive["files"] == {"total": 23438, "copied": 52, "skipped": 23367, "mismatch": 0, "failed": 19, "extras": 6}
+    assert c_drive["dirs"]["failed"] == 42
+    assert c_drive["bytes"]["total"] == int(21.417 * 1024 ** 3)
+    assert c_drive["bytes"]["copied"] == int(95.45 * 1024 ** 2)
+    assert c_drive["bytes"]["mismatch"] == 0
+    assert c_drive["times"] == {"total": 157, "copied": 31, "failed": 23, "extras": 103}
+    assert c_drive["speedBytesPerSec"] == 3146646.0
+    # Header lines such as "Files : *.*" are not mistaken for summary rows
+    assert summaries["E"]["files"]["total"] == 2
+    assert summaries["E"]["bytes"] == {"total": 138, "copied": 0, "skipped": 138, "mismatch": 0, "failed": 0, "extras": 0}
+    assert "speedBytesPerSec" not in summaries["E"]
+
+def test_drive_prefixed_lines_from_parallel_runs():
+    output = "\n".join([
+        "[D:]    Dirs :         1         1         0         0         0         0",
+        "[E:]    Dirs :         2         0         2         0         0         0",
+        "[D:]   Files :         3         3         0         0         0         0",
+        "[D:]   Bytes :    1.50 k    1.50 k         0         0         0         0",
+    ])
+    summaries = parse_robocopy_summaries(output)
+
+    assert summaries["D"]["files"]["copied"] == 3
+    assert summaries["D"]["bytes"]["total"] == 1536
+    assert summaries["E"]["dirs"]["skipped"] == 2
@@ -0,0 +1,33 @@
+"""Tests for the manifest comparison behind /api/validation (run from the backend directory: python -m pytest tests)."""
+from routers.validation import diff_manifests
+
+def _records(*entries):
+    return iter(entries)
+
+def test_merge_reports_missing_extra_and_changed_files():
+    source = _records(("/a", 10, 100, None), ("/b", 20, 200, None), ("/d", 40, 400, None), ("/e", 50, 500, None))
+    target = _records(("/b", 21, 200, None), ("/c", 30, 300, None), ("/d", 40, 401, None), ("/e", 50, 500, None))
+    result = diff_manifests(source, target)
+
+    assert result["summary"] == {"sourceFiles": 4, "targetFiles": 4, "sourceBytes": 120, "targetBytes": 141,
+                                 "missingOnTarget": 1, "extraOnTarget": 1, "changed": 2}
+    differences = result["differences"]
+    assert [entry["path"] for entry in differences["missingOnTarget"]] == ["/a"]
+    assert [entry["path"] for entry in differences["extraOnTarget"]] == ["/c"]
+    assert [(entry["path"], entry["reasons"]) for entry in differences["changed"]] == [("/b", ["size"]), ("/d", ["mtime"])]
+
+def test_content_only_change_needs_both_hashes():
+    source = _records(("/same", 5, 1, "aaa"), ("/edited", 5, 1, "aaa"), ("/unhashed", 5, 1, "aaa"))
+    target = _records(("/same", 5, 1, "aaa"), ("/edited", 5, 1, "bbb"), ("/unhashed", 5, 1, None))
+    # The merge expects path-sorted streams, as LC_ALL=C sort on the hosts produces them
+    result = diff_manifests(iter(sorted(source)), iter(sorted(target)))
+
+    assert [(entry["path"], entry["reasons"]) for entry in result["differences"]["changed"]] == [("/edited", ["content"])]
+    assert result["summary"]["missingOnTarget"] == result["summary"]["extraOnTarget"] == 0
+
+def test_one_side_empty_and_difference_lists_capped():
+    result = diff_manifests(_records(*((f"/f{i:02}", 1, 0, None) for i in range(10))), _records(), max_differences=3)
+
+    assert result["summary"]["missingOnTarget"] == 10
+    assert [entry["path"] for entry in result["differences"]["missingOnTarget"]] == ["/f00", "/f01", "/f02"]
+    assert diff_manifests(_records(), _records(("/x", 1, 0, None)))["summary"]["extraOnTarget"] == 1
@@ -0,0 +1,148 @@
+"""vCenter session handling and the VM helpers shared by the routers."""
+import logging
+import ssl
+import time
+
+from fastapi import HTTPException
+
+from admission import admit
+from lazy_imports import connect, vim
+from models import Host
+from observability import VCENTER_CONNECT_SECONDS, retrieve_content, timed_span, trace_span
+
+# --- vCenter Connection Logic ---
+
+def smart_connect(vcenter, user, pwd):
+    """Log in to vCenter without certificate verification, timing the login."""
+    context = ssl._create_unverified_context()
+    with timed_span("vcenter.login", VCENTER_CONNECT_SECONDS.labels(vcenter=vcenter), vcenter=vcenter):
+        return connect.SmartConnect(host=vcenter, user=user, pwd=pwd, sslContext=context, port=443)
+
+def disconnect(si):
+    connect.Disconnect(si)
+
+def get_vcenter_connection(host_details: Host):
+    """Establishes a connection to vCenter and returns the service instance."""
+    try:
+        service_instance = smart_connect(host_details.ipAddress, host_details.username, host_details.password)
+        if service_instance:
+            return service_instance
+        else:
+            raise HTTPException(status_code=401, detail="Could not connect to vCenter. Check credentials or host address.")
+    except vim.fault.InvalidLogin as e:
+        if "Authentication failed" in str(e.msg):
+             raise HTTPException(status_code=401, detail="Authentication failed. Please check KVM host credentials.")
+        raise HTTPException(status_code=401, detail="Invalid vCenter credentials provided.")
+    except ConnectionRefusedError:
+        raise HTTPException(status_code=503, detail=f"Connection refused by vCenter host {host_details.ipAddress}.")
+    except Exception as e:
+        logging.error(f"Failed to connect to vCenter: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to connect to vCenter: {e}")
+
+def find_vm_by_name(si, vm_name):
+    with trace_span("vcenter.find_vm", vm=vm_name):
+        return _find_vm_by_name(si, vm_name)
+
+def _find_vm_by_name(si, vm_name):
+    content = retrieve_content(si)
+    vm_view = content.viewManager.CreateContainerView(content.rootFolder, [vim.VirtualMachine], True)
+    for vm in vm_view.view:
+        if vm.name == vm_name:
+            vm_view.Destroy()
+            return vm
+    vm_view.Destroy()
+    return None
+
+def find_existing_clone(si, base_vm_name):
+    content = retrieve_content(si)
+    vm_view = content.viewManager.CreateContainerView(content.rootFolder, [vim.VirtualMachine], True)
+    clone_prefix = f"{base_vm_name}-VME_Clone_"
+    for vm in vm_view.view:
+        if vm.name.startswith(clone_prefix):
+            vm_view.Destroy()
+            return vm
+    vm_view.Destroy()
+    return None
+
+# --- Logic from user-provided script ---
+def wait_for_task_with_logs(task, log_stream, timeout=600):
+    start_time = time.time()
+    while task.info.state in [vim.TaskInfo.State.queued, vim.TaskInfo.State.running]:
+        if time.time() - start_time > timeout:
+            raise Exception(f"Task timed out after {timeout} seconds.")
+        log_stream.write(f"Task state: {task.info.state} (elapsed: {int(time.time() - start_time)}s)\n")
+        time.sleep(2)
+
+    if task.info.state == vim.TaskInfo.State.success:
+        log_stream.write("Task completed successfully.\n")
+        return True
+    else:
+        error_msg = task.info.error.msg if task.info.error else "Unknown error."
+        raise Exception(f"Task failed: {error_msg}")
+
+def disable_nic_connect_at_power_on(vm, log_stream, scopes=None):
+    vm_config_spec = vim.vm.ConfigSpec()
+    device_changes = []
+    for device in vm.config.hardware.device:
+        if isinstance(device, vim.vm.device.VirtualEthernetCard):
+            nic_spec = vim.vm.device.VirtualDeviceSpec()
+            nic_spec.operation = vim.vm.device.VirtualDeviceSpec.Operation.edit
+            nic_spec.device = device
+            nic_spec.device.connectable.startConnected = False
+            device_changes.append(nic_spec)
+            log_stream.write(f"Prepared update for network adapter '{device.deviceInfo.label}' to disable 'Connect at Power On'.\n")
+
+    if not device_changes:
+        log_stream.write(f"No network adapters found to modify for VM '{vm.name}'.\n")
+        return False
+
+    vm_config_spec.deviceChange = device_changes
+    log_stream.write(f"Initiating reconfiguration for VM '{vm.name}'...\n")
+    with admit("provision", **(scopes or {})):
+        task = vm.ReconfigVM_Task(spec=vm_config_spec)
+        wait_for_task_with_logs(task, log_stream)
+    log_stream.write(f"Successfully disabled 'Connect at Power On' for all network adapters of VM '{vm.name}'.\n")
+    return True
+
+def power_on_vm_and_wait_for_tools(vm, log_stream, timeout=600, scopes=None):
+    if vm.runtime.powerState == vim.VirtualMachinePowerState.poweredOn:
+        log_stream.write(f"VM '{vm.name}' is already powered on.\n")
+        return True
+    
+    log_stream.write(f"Powering on VM '{vm.name}'...\n")
+    with admit("power", **(scopes or {})):
+        task = vm.PowerOnVM_Task()
+        wait_for_task_with_logs(task, log_stream)
+
+    log_stream.write(f"Waiting for VM '{vm.name}' to boot (VMware Tools running)...\n")
+    start_time = time.time()
+    while vm.guest.toolsRunningStatus != "guestToolsRunning":
+        if time.time() - start_time > timeout:
+            raise Exception(f"Timeout waiting for VMware Tools on '{vm.name}'.")
+        log_stream.write(f"VMware Tools status: {vm.guest.toolsRunningStatus} (elapsed: {int(time.time() - start_time)}s)\n")
+        time.sleep(5)
+    
+    log_stream.write(f"VM '{vm.name}' is powered on and VMware Tools is running.\n")
+    return True
+
+def shutdown_vm_gracefully(vm, log_stream, timeout=600, scopes=None):
+    if vm.runtime.powerState != vim.VirtualMachinePowerState.poweredOn:
+        log_stream.write(f"VM '{vm.name}' is not powered on. Cannot initiate shutdown.\n")
+        return False
+    if vm.guest.toolsRunningStatus != "guestToolsRunning":
+        log_stream.write(f"VMware Tools not running on '{vm.name}'. Cannot initiate graceful shutdown.\n")
+        return False
+    
+    log_stream.write(f"Initiating graceful shutdown of VM '{vm.name}'...\n")
+    with admit("power", **(scopes or {})):
+        vm.ShutdownGuest()
+
+    start_time = time.time()
+    while vm.runtime.powerState != vim.VirtualMachinePowerState.poweredOff:
+        if time.time() - start_time > timeout:
+            raise Exception(f"Timeout waiting for VM '{vm.name}' to power off.")
+        log_stream.write(f"Power state: {vm.runtime.powerState} (elapsed: {int(time.time() - start_time)}s)\n")
+        time.sleep(5)
+    
+    log_stream.write(f"VM '{vm.name}' has been gracefully shut down.\n")
+    return True
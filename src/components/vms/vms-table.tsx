@@ -175,8 +175,8 @@ export function VmsTable({ vms, isLoading }: VmsTableProps) {
                   <TableCell>{vm.powerState}</TableCell>
                   <TableCell>{vm.ipAddress}</TableCell>
                   <TableCell>{vm.hostname}</TableCell>
-                  <TableCell>{vm.cpuUsage.toLocaleString()}</TableCell>
-                  <TableCell>{vm.memoryUsage.toLocaleString()}</TableCell>
+                  <TableCell>{vm.cpuUsage?.toLocaleString() ?? "N/A"}</TableCell>
+                  <TableCell>{vm.memoryUsage?.toLocaleString() ?? "N/A"}</TableCell>
                   <TableCell>{vm.storageUsage.toLocaleString()}</TableCell>
                 </TableRow>
               ))
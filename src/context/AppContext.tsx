@@ -49,6 +49,23 @@ interface AppContextType {
 
 const AppContext = createContext<AppContextType | undefined>(undefined);
 
+// Browsers only revalidate GETs on their own, so the polled POST reads keep their last ETag and body here
+const postReadCache = new Map<string, { etag: string; data: any }>();
+
+async function postJsonCached(url: string, payload: unknown): Promise<{ ok: boolean; data: any }> {
+  const body = JSON.stringify(payload);
+  const key = `${url}\n${body}`;
+  const cached = postReadCache.get(key);
+  const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+  if (cached) headers['If-None-Match'] = cached.etag;
+  const response = await fetch(url, { method: 'POST', headers, body });
+  if (response.status === 304 && cached) return { ok: true, data: cached.data };
+  const data = await response.json();
+  const etag = response.headers.get('ETag');
+  if (response.ok && etag) postReadCache.set(key, { etag, data });
+  return { ok: response.ok, data };
+}
+
 export function AppProvider({ children }: { children: ReactNode }) {
   const [hosts, setHosts] = useState<HostWithPassword[]>([]);
   const [vmeHosts, setVmeHosts] = useState<HostWithPassword[]>([]);
@@ -224,20 +241,14 @@ export function AppProvider({ children }: { children: ReactNode }) {
     setIsFetchingVms(true);
     setVms([]);
     try {
-        const response = await fetch('http://localhost:8000/api/vms', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ id: host.id, ipAddress: host.ipAddress, username: host.username, password: host.password }),
-        });
+        const response = await postJsonCached('http://localhost:8000/api/vms',
+            { id: host.id, ipAddress: host.ipAddress, username: host.username, password: host.password });
 
         if (!response.ok) {
-            const errorData = await response.json();
-            throw new Error(errorData.detail || 'Failed to fetch VMs');
+            throw new Error(response.data.detail || 'Failed to fetch VMs');
         }
 
-        const data: VirtualMachine[] = await response.json();
+        const data: VirtualMachine[] = response.data;
         setVms(data);
         showToast(`Successfully fetched ${data.length} VMs from ${host.ipAddress}.`, { title: "VMs Fetched" });
     } catch (error: any) {
@@ -355,6 +366,9 @@ export function AppProvider({ children }: { children: ReactNode }) {
         
         if (result.status === 'already_exists') {
             updateVmState(waveId, vmId, { cloneTaskId: 'existing-clone', cloneProgress: 100, cloneStatus: 'success', cloneName: result.cloneName });
+        } else if (result.status === 'queued') {
+            // Waiting for a provisioning slot; the clone task id is fetched once it has been admitted
+            updateVmState(waveId, vmId, { cloneTaskId: 'queued-clone', cloneStatus: 'running', cloneProgress: 0, cloneName: result.cloneName });
         } else if (result.taskId) {
             updateVmState(waveId, vmId, { cloneTaskId: result.taskId, cloneStatus: 'running', cloneProgress: 0, cloneName: result.cloneName });
         }
@@ -524,7 +538,19 @@ export function AppProvider({ children }: { children: ReactNode }) {
       if(!vm) return;
 
       try {
-          if (vm.cloneStatus === 'running' && vm.cloneTaskId) {
+          if (vm.cloneStatus === 'running' && vm.cloneTaskId === 'queued-clone' && vm.cloneName) {
+                const response = await fetch(`http://localhost:8000/api/vms/clone-status/${vm.cloneName}`);
+                if (!response.ok) {
+                    updateVmState(waveId, vmId, { cloneStatus: 'error', cloneProgress: 0 }); return;
+                }
+                const data = await response.json();
+                if (data.status === 'error') {
+                    updateVmState(waveId, vmId, { cloneTaskId: 'error-clone', cloneStatus: 'error', cloneProgress: 0 });
+                } else if (data.taskId) {
+                    updateVmState(waveId, vmId, { cloneTaskId: data.taskId });
+                }
+          }
+          else if (vm.cloneStatus === 'running' && vm.cloneTaskId) {
                 const host = getHostWithPassword(vm.hostId);
                 if (!host || !host.password) return;
                 const response = await fetch(`http://localhost:8000/api/tasks/${vm.cloneTaskId}`, {
@@ -577,16 +603,12 @@ export function AppProvider({ children }: { children: ReactNode }) {
     }
 
     try {
-        const response = await fetch('http://localhost:8000/api/vms/replication/check-vms', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ host, vm_names: wave.vms.map(vm => vm.name) }),
-        });
+        const response = await postJsonCached('http://localhost:8000/api/vms/replication/check-vms',
+            { host, vm_names: wave.vms.map(vm => vm.name) });
         if (!response.ok) {
-            const error = await response.json();
-            throw new Error(error.detail || "Failed to check VM status");
+            throw new Error(response.data.detail || "Failed to check VM status");
         }
-        const results = await response.json();
+        const results = response.data;
         results.forEach((result: { name: string, powerState: VirtualMachine['powerState'], guestOs: string, osType: 'Windows' | 'Linux' | 'Unknown' }) => {
             const vmToUpdate = wave.vms.find(vm => vm.name === result.name);
             if(vmToUpdate) {